@@ -0,0 +1,227 @@
+"""
+Módulo do histórico local de contagens diárias (SQLite), para tendências de longo prazo
+"""
+
+import os
+import sqlite3
+from itertools import repeat
+from typing import List, Optional
+
+import pandas as pd
+
+from config import PASTA_EXPORTADOS, ARQUIVO_HISTORICO, HISTORICO_ATIVO, JANELA_TEMPORAL_DIAS
+from backends import DIMENSOES_DIARIO
+from fingerprint import impressao_entrada
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS origens (
+    origem TEXT PRIMARY KEY,
+    sequencia INTEGER NOT NULL,
+    primeiro TEXT NOT NULL,
+    ultimo TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contagens_origem (
+    origem TEXT NOT NULL,
+    data TEXT NOT NULL,
+    pa TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    motorista TEXT NOT NULL,
+    prefixo TEXT NOT NULL,
+    quantidade INTEGER NOT NULL,
+    PRIMARY KEY (origem, data, pa, tipo, motorista, prefixo)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_origem_data ON contagens_origem (data, origem);
+CREATE INDEX IF NOT EXISTS idx_origem_pa_data ON contagens_origem (pa, data);
+"""
+
+# Histórico do formato anterior (uma linha por chave, maior contagem vista): vira uma origem só
+ORIGEM_LEGADA = ""
+MIGRACAO = """
+INSERT INTO contagens_origem (origem, data, pa, tipo, motorista, prefixo, quantidade)
+SELECT ?, data, pa, tipo, motorista, prefixo, quantidade FROM contagens_diarias;
+"""
+
+# Exportação que fornece cada dia: as que trazem o dia por inteiro (nem o primeiro nem o
+# último dia delas, que podem estar cortados) vêm antes, e entre elas vale a mais recente;
+# sem nenhuma assim, vale a que tem mais alertas no dia
+DIAS_ESCOLHIDOS = """
+SELECT origem, data FROM (
+    SELECT c.origem, c.data,
+           ROW_NUMBER() OVER (
+               PARTITION BY c.data
+               ORDER BY (c.data > o.primeiro AND c.data < o.ultimo) DESC,
+                        CASE WHEN c.data > o.primeiro AND c.data < o.ultimo
+                             THEN o.sequencia ELSE SUM(c.quantidade) END DESC,
+                        o.sequencia DESC
+           ) AS ordem
+    FROM contagens_origem AS c JOIN origens AS o ON o.origem = c.origem
+    WHERE {filtros}
+    GROUP BY c.origem, c.data
+) WHERE ordem = 1
+"""
+
+
+class ArmazemAgregados:
+    """
+    Classe responsável pelo histórico de contagens diárias por PA/TIPO/MOTORISTA/PREFIXO
+
+    Cada execução grava o cubo diário (``agregados["diario"]``) da sua origem
+    (impressão do arquivo de entrada): reprocessar o mesmo arquivo substitui
+    as linhas dele. Exportações diferentes que se sobrepõem não são somadas:
+    as consultas tomam cada dia inteiro de uma exportação só (ver
+    ``DIAS_ESCOLHIDOS``), então um dia reexportado com mais alertas aparece
+    com a contagem nova, sem misturar chaves de exportações diferentes.
+    Valores ausentes são gravados como texto vazio (NULL nunca colide numa
+    chave primária do SQLite) e voltam como nulos nas consultas.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.executescript(ESQUEMA)
+        self._migrar()
+
+    def _migrar(self):
+        antiga = self.conexao.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                                      "AND name = 'contagens_diarias'").fetchone()
+        if antiga is None:
+            return
+        with self.conexao:
+            limites = self.conexao.execute("SELECT MIN(data), MAX(data) FROM contagens_diarias").fetchone()
+            if limites[0] is not None:
+                self.conexao.execute(MIGRACAO, (ORIGEM_LEGADA,))
+                self.conexao.execute("INSERT OR REPLACE INTO origens VALUES (?, 0, ?, ?)", (ORIGEM_LEGADA, *limites))
+            self.conexao.execute("DROP TABLE contagens_diarias")
+
+    def close(self):
+        self.conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def registrar(self, diario: pd.DataFrame, origem: str) -> int:
+        """
+        Grava o cubo diário de uma execução no lugar do que a mesma origem tinha gravado
+
+        Args:
+            diario: DataFrame com DATA, QUANTIDADE e as dimensões presentes
+            origem: Identificação do arquivo de entrada (impressão do conteúdo)
+
+        Returns:
+            Quantidade de linhas enviadas ao histórico
+        """
+        df = diario.reindex(columns=["DATA", *DIMENSOES_DIARIO, "QUANTIDADE"])
+        datas = pd.to_datetime(df["DATA"]).dt.strftime("%Y-%m-%d")
+        texto = df[DIMENSOES_DIARIO].astype(object)
+        texto = texto.where(texto.notna(), "").astype(str)
+        linhas = zip(repeat(origem), datas, *(texto[col] for col in DIMENSOES_DIARIO),
+                     df["QUANTIDADE"].astype("int64").tolist())
+        with self.conexao:
+            self.conexao.execute("DELETE FROM contagens_origem WHERE origem = ?", (origem,))
+            self.conexao.execute("DELETE FROM origens WHERE origem = ?", (origem,))
+            if len(df):
+                self.conexao.executemany("INSERT INTO contagens_origem VALUES (?, ?, ?, ?, ?, ?, ?)", linhas)
+                self.conexao.execute("INSERT INTO origens SELECT ?, COALESCE(MAX(sequencia), 0) + 1, ?, ? FROM origens",
+                                     (origem, datas.min(), datas.max()))
+        return len(df)
+
+    def ultima_data(self) -> Optional[str]:
+        return self.conexao.execute("SELECT MAX(ultimo) FROM origens").fetchone()[0]
+
+    def consultar(self, dimensoes: List[str], dias: Optional[int] = None, fim: Optional[str] = None,
+                  pas: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Contagens diárias somadas pelas dimensões pedidas numa janela do histórico
+
+        Args:
+            dimensoes: Subconjunto de PA/TIPO/MOTORISTA/PREFIXO
+            dias: Tamanho da janela em dias (None = todo o histórico)
+            fim: Último dia da janela, AAAA-MM-DD (padrão: o mais recente gravado)
+            pas: Restringe aos PAs indicados
+
+        Returns:
+            DataFrame com as dimensões, DATA e QUANTIDADE
+        """
+        invalidas = set(dimensoes) - set(DIMENSOES_DIARIO)
+        if invalidas:
+            raise ValueError(f"Dimensões inválidas: {', '.join(sorted(invalidas))}")
+
+        colunas = [*dimensoes, "DATA", "QUANTIDADE"]
+        fim = fim or self.ultima_data()
+        if fim is None:
+            return pd.DataFrame(columns=colunas)
+
+        periodo, parametros = ["c.data <= ?"], [fim]
+        if dias:
+            periodo.append("c.data > ?")
+            parametros.append((pd.Timestamp(fim) - pd.Timedelta(days=dias)).strftime("%Y-%m-%d"))
+        # A exportação de cada dia é escolhida com todos os PAs; o filtro de PA vem depois
+        filtros, parametros_pas = [], []
+        if pas:
+            filtros.append(f"c.pa IN ({', '.join('?' * len(pas))})")
+            parametros_pas.extend(pas)
+
+        grupo = ", ".join([*(f"c.{col.lower()}" for col in dimensoes), "c.data"])
+        escolhidos = DIAS_ESCOLHIDOS.format(filtros=" AND ".join(periodo))
+        sql = (f"SELECT {grupo}, SUM(c.quantidade) FROM contagens_origem AS c "
+               f"JOIN ({escolhidos}) AS e ON e.origem = c.origem AND e.data = c.data "
+               f"{'WHERE ' + ' AND '.join(filtros) if filtros else ''} GROUP BY {grupo} ORDER BY c.data")
+        df = pd.read_sql_query(sql, self.conexao, params=[*parametros, *parametros_pas])
+        df.columns = colunas
+
+        df["DATA"] = pd.to_datetime(df["DATA"])
+        df["QUANTIDADE"] = df["QUANTIDADE"].astype("int64")
+        for coluna in dimensoes:
+            df[coluna] = df[coluna].mask(df[coluna] == "")
+        return df
+
+    def consultar_temporal(self, dias: Optional[int] = None, fim: Optional[str] = None,
+                           pas: Optional[List[str]] = None) -> pd.DataFrame:
+        """Série diária por PA no formato de ``agregados["temporal"]``"""
+        return self.consultar(["PA"], dias, fim, pas)
+
+
+def abrir_armazem(filepath: str) -> ArmazemAgregados:
+    """Abre (ou cria) o histórico na pasta de exportados ao lado do arquivo de origem"""
+    pasta_exportados = os.path.join(os.path.dirname(filepath), PASTA_EXPORTADOS)
+    os.makedirs(pasta_exportados, exist_ok=True)
+    return ArmazemAgregados(os.path.join(pasta_exportados, ARQUIVO_HISTORICO))
+
+
+def atualizar_historico(filepath: str, agregados: Optional[dict],
+                        janela_dias: Optional[int] = JANELA_TEMPORAL_DIAS,
+                        registrar: bool = True) -> Optional[dict]:
+    """
+    Grava o cubo diário da execução no histórico e, com janela, troca o temporal
+    dos agregados pela série do histórico (painel temporal e tendências)
+
+    A janela termina no último dia do próprio arquivo, não no mais recente do
+    histórico: reprocessar uma exportação antiga mostra o período dela.
+    Execuções com filtro não gravam (o cubo delas não é o da exportação
+    inteira) e ficam com o temporal da execução.
+
+    Falhas no histórico não interrompem o processamento: os agregados da
+    execução seguem como estão.
+    """
+    if not HISTORICO_ATIVO or not agregados or agregados.get("diario") is None:
+        return agregados
+    if not registrar:
+        print("🗄️ Histórico não atualizado: execução com filtro")
+        return agregados
+    try:
+        with abrir_armazem(filepath) as armazem:
+            linhas = armazem.registrar(agregados["diario"], impressao_entrada(filepath))
+            print(f"🗄️ Histórico atualizado: {linhas} contagens diárias")
+            if janela_dias and len(agregados["diario"]):
+                pas = list(agregados["contagens"]["PA"].dropna().unique())
+                fim = pd.to_datetime(agregados["diario"]["DATA"]).max().strftime("%Y-%m-%d")
+                temporal = armazem.consultar_temporal(janela_dias, fim=fim, pas=pas)
+                if not temporal.empty:
+                    agregados = {**agregados, "temporal": temporal}
+    except sqlite3.Error as e:
+        print(f"⚠️ Erro ao atualizar o histórico: {e}")
+    return agregados
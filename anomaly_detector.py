@@ -0,0 +1,173 @@
+"""
+Módulo de detecção de anomalias nas séries diárias de motoristas e veículos
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import (ANOMALIA_DIMENSOES, ANOMALIA_JANELA_DIAS, ANOMALIA_LIMIAR, ANOMALIA_MINIMO_ALERTAS,
+                    ANOMALIA_HISTORICO_MINIMO, ANOMALIA_METODO, ANOMALIA_TOP, TIPOS_DESCONSIDERAR)
+
+
+def matriz_entidade_dia(diario: pd.DataFrame, dimensao: str) -> Tuple[pd.Index, pd.DatetimeIndex, np.ndarray]:
+    """
+    Monta a matriz densa (entidade × dia) de contagens com um único ``bincount``
+
+    Dias sem alerta de uma entidade ficam com zero; o eixo de dias é contínuo
+    do primeiro ao último dia do cubo.
+
+    Returns:
+        Tupla (entidades, dias, matriz float64 de forma entidades × dias)
+    """
+    df = diario.dropna(subset=[dimensao, "DATA"])
+    codigos, entidades = pd.factorize(df[dimensao], sort=True)
+    datas = pd.to_datetime(df["DATA"]).to_numpy().astype("datetime64[D]")
+    inicio = datas.min()
+    dias = pd.date_range(inicio, datas.max(), freq="D")
+    posicoes = (datas - inicio).astype("int64")
+
+    celulas = codigos.astype("int64") * len(dias) + posicoes
+    matriz = np.bincount(celulas, weights=df["QUANTIDADE"].to_numpy(dtype="float64"),
+                         minlength=len(entidades) * len(dias))
+    return pd.Index(entidades, name=dimensao), dias, matriz.reshape(len(entidades), len(dias))
+
+
+class DetectorAnomalias:
+    """
+    Classe responsável por marcar picos nas contagens diárias de milhares de séries
+
+    Todas as entidades são avaliadas de uma vez sobre a matriz (entidade × dia):
+
+    - ``zscore``: média e desvio da janela dos ``janela`` dias anteriores,
+      obtidos por somas acumuladas (sem laço por entidade nem por dia);
+    - ``ewma``: resíduo contra a média móvel exponencial do dia anterior,
+      normalizado pela variância exponencial dos resíduos (um passo
+      vetorizado por dia).
+
+    O desvio tem piso de ``sqrt(esperado)`` (ruído de Poisson, mínimo 1), para
+    que séries quase constantes não gerem escores enormes com um alerta a mais.
+    """
+
+    def __init__(self, janela: int = ANOMALIA_JANELA_DIAS, limiar: float = ANOMALIA_LIMIAR,
+                 minimo_alertas: int = ANOMALIA_MINIMO_ALERTAS,
+                 historico_minimo: int = ANOMALIA_HISTORICO_MINIMO, metodo: str = ANOMALIA_METODO):
+        if metodo not in ("zscore", "ewma"):
+            raise ValueError(f"Método de anomalia inválido: {metodo}")
+        self.janela = janela
+        self.limiar = limiar
+        self.minimo_alertas = minimo_alertas
+        self.historico_minimo = historico_minimo
+        self.metodo = metodo
+        self.total_marcados = 0  # dias marcados na última detecção, antes do corte em ``top``
+
+    def _esperado_zscore(self, matriz: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        n_dias = matriz.shape[1]
+        soma = np.zeros((matriz.shape[0], n_dias + 1))
+        soma_quadrados = np.zeros_like(soma)
+        np.cumsum(matriz, axis=1, out=soma[:, 1:])
+        np.cumsum(matriz * matriz, axis=1, out=soma_quadrados[:, 1:])
+
+        # Janela [t - janela, t): só dias anteriores ao avaliado. Soma acumulada até t menos
+        # a soma até t - janela, com fatias (sem índices avançados nem cópias intermediárias)
+        media = soma[:, :n_dias].copy()
+        variancia = soma_quadrados[:, :n_dias].copy()
+        if self.janela < n_dias:
+            media[:, self.janela:] -= soma[:, :n_dias - self.janela]
+            variancia[:, self.janela:] -= soma_quadrados[:, :n_dias - self.janela]
+        n = np.maximum(np.minimum(np.arange(n_dias), self.janela), 1)
+        media /= n
+        variancia /= n
+        variancia -= media * media
+        np.maximum(variancia, 0.0, out=variancia)
+        return media, np.sqrt(variancia, out=variancia)
+
+    def _esperado_ewma(self, matriz: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        alfa = 2.0 / (self.janela + 1)
+        media = np.zeros_like(matriz)
+        desvio = np.zeros_like(matriz)
+        m = matriz[:, 0].copy()
+        v = np.zeros(matriz.shape[0])
+        for t in range(1, matriz.shape[1]):
+            media[:, t] = m
+            desvio[:, t] = np.sqrt(v)
+            residuo = matriz[:, t] - m
+            m = m + alfa * residuo
+            v = (1 - alfa) * (v + alfa * residuo ** 2)
+        return media, desvio
+
+    def escores(self, matriz: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Tupla (esperado, escore), ambos entidade × dia; dias sem
+            histórico suficiente têm escore NaN
+        """
+        if self.metodo == "zscore":
+            esperado, desvio = self._esperado_zscore(matriz)
+        else:
+            esperado, desvio = self._esperado_ewma(matriz)
+        np.maximum(desvio, np.sqrt(np.maximum(esperado, 1.0)), out=desvio)
+        escore = matriz - esperado
+        escore /= desvio
+        escore[:, :self.historico_minimo] = np.nan
+        return esperado, escore
+
+    def detectar(self, diario: pd.DataFrame, dimensoes: Optional[List[str]] = None,
+                 top: int = ANOMALIA_TOP) -> pd.DataFrame:
+        """
+        Tabela das anomalias mais fortes
+
+        Args:
+            diario: Cubo diário dos agregados (``agregados["diario"]``)
+            dimensoes: Colunas avaliadas como entidade (padrão: config)
+            top: Quantidade máxima de linhas na tabela
+
+        Returns:
+            DataFrame com DIMENSAO, ENTIDADE, DATA, QUANTIDADE, ESPERADO e
+            ESCORE, do maior escore para o menor (o total sem o corte fica
+            em ``total_marcados``)
+        """
+        if "TIPO" in diario.columns:
+            diario = diario[~diario["TIPO"].isin(TIPOS_DESCONSIDERAR)]
+
+        tabelas = []
+        for dimensao in dimensoes or ANOMALIA_DIMENSOES:
+            if dimensao not in diario.columns or diario[dimensao].isna().all():
+                continue
+            entidades, dias, matriz = matriz_entidade_dia(diario, dimensao)
+            if len(dias) <= self.historico_minimo:
+                continue
+            esperado, escore = self.escores(matriz)
+
+            # Comparações com NaN (dias sem histórico) dão False
+            marcados = (escore >= self.limiar) & (matriz >= self.minimo_alertas)
+            linhas, colunas = np.nonzero(marcados)
+            tabelas.append(pd.DataFrame({
+                "DIMENSAO": dimensao,
+                "ENTIDADE": entidades[linhas],
+                "DATA": dias[colunas],
+                "QUANTIDADE": matriz[linhas, colunas].astype("int64"),
+                "ESPERADO": esperado[linhas, colunas].round(1),
+                "ESCORE": escore[linhas, colunas].round(2),
+            }))
+
+        colunas_tabela = ["DIMENSAO", "ENTIDADE", "DATA", "QUANTIDADE", "ESPERADO", "ESCORE"]
+        self.total_marcados = sum(len(tabela) for tabela in tabelas)
+        if not tabelas:
+            return pd.DataFrame(columns=colunas_tabela)
+        return pd.concat(tabelas, ignore_index=True).nlargest(top, "ESCORE").reset_index(drop=True)
+
+
+def anotar_anomalias(agregados: Optional[dict]) -> Optional[dict]:
+    """Acrescenta ``anomalias`` aos agregados quando há cubo diário"""
+    if not agregados or agregados.get("diario") is None:
+        return agregados
+    detector = DetectorAnomalias()
+    anomalias = detector.detectar(agregados["diario"])
+    if detector.total_marcados > len(anomalias):
+        print(f"🚨 Anomalias detectadas: {detector.total_marcados} "
+              f"(tabela limitada às {len(anomalias)} mais fortes)")
+    else:
+        print(f"🚨 Anomalias detectadas: {detector.total_marcados}")
+    return {**agregados, "anomalias": anomalias}
@@ -0,0 +1,630 @@
+"""
+Módulo com os backends de DataFrame (leitura → limpeza → partição → agregação)
+"""
+
+import csv
+import io
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (PREFIXOS, COLUNAS_REMOVER, ENCODING_CSV, TIPOS_DESCONSIDERAR, BACKEND_PADRAO,
+                    COLUNAS_CODIGO, COLUNAS_TEXTO, HISTORICO_ATIVO, MAPA_HORARIO, HOTSPOTS_ATIVO,
+                    HOTSPOT_COLUNAS, PIPELINE_TAMANHO_CHUNK)
+from source_reader import abrir_fonte, e_compactado
+from hotspots import contar_hotspots
+
+try:
+    import polars as pl
+except ImportError:  # Backend Polars é opcional
+    pl = None
+
+
+COLUNAS_DATA_POSSIVEIS = ['DATA', 'Date', 'data', 'DATA_OCORRENCIA', 'DATA_ALERTA']
+
+# Dimensões do cubo diário (``agregados["diario"]``) gravado no histórico
+DIMENSOES_DIARIO = ["PA", "TIPO", "MOTORISTA", "PREFIXO"]
+
+
+def detectar_coluna_data(colunas) -> Optional[str]:
+    """Retorna a primeira coluna de data reconhecida ou None"""
+    for col in COLUNAS_DATA_POSSIVEIS:
+        if col in colunas:
+            return col
+    return None
+
+
+def detectar_separador(filepath: str) -> str:
+    """Detecta o separador pela primeira linha, como o ``sep=None`` do pandas"""
+    with abrir_fonte(filepath) as fonte:
+        primeira_linha = io.TextIOWrapper(fonte.stream, encoding=ENCODING_CSV, newline="").readline()
+    return csv.Sniffer().sniff(primeira_linha).delimiter
+
+
+def colunas_normalizaveis(colunas):
+    """Pares (coluna, maiúsculas) das colunas de texto presentes que passam pela normalização"""
+    return ([(col, True) for col in COLUNAS_CODIGO if col in colunas] +
+            [(col, False) for col in COLUNAS_TEXTO if col in colunas])
+
+
+def normalizar_categorica(serie: pd.Series, maiusculas: bool) -> pd.Categorical:
+    """
+    Limpa uma coluna de texto operando só sobre os valores distintos
+
+    A coluna vira categórica e o trim/maiúsculas roda nas categorias; valores
+    que passam a coincidir (ex.: "BOCEJO " e "bocejo") são fundidos e vazios
+    viram nulos.
+    """
+    categorica = serie.astype("category")
+    categorias = pd.Series(categorica.cat.categories).astype(str).str.strip()
+    if maiusculas:
+        categorias = categorias.str.upper()
+    codigos_novos, limpas = pd.factorize(categorias.mask(categorias == ""))
+
+    codigos = categorica.cat.codes.to_numpy()
+    codigos = np.where(codigos >= 0, codigos_novos[codigos], -1)
+    return pd.Categorical.from_codes(codigos, categories=limpas)
+
+
+def consolidar_temporal(contagem_bruta: pd.DataFrame, chaves: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Converte contagens por (PA, valor bruto de data) em contagens diárias
+
+    As datas são interpretadas uma única vez por valor distinto, o que evita
+    chamar ``pd.to_datetime`` sobre a coluna inteira.
+
+    Args:
+        contagem_bruta: DataFrame com colunas PA, BRUTO e QUANTIDADE
+        chaves: Colunas mantidas além da data (padrão: só PA)
+
+    Returns:
+        DataFrame com as chaves, DATA e QUANTIDADE
+    """
+    chaves = chaves or ["PA"]
+    valores = pd.Series(contagem_bruta["BRUTO"].dropna().unique())
+    datas = pd.to_datetime(valores, errors='coerce').dt.normalize()
+    mapa = pd.Series(datas.values, index=valores.values)
+
+    df = contagem_bruta.assign(DATA=contagem_bruta["BRUTO"].map(mapa))
+    df = df.dropna(subset=["DATA"])
+    df_temporal = df.groupby([*chaves, "DATA"], dropna=False)["QUANTIDADE"].sum().reset_index()
+    df_temporal["DATA"] = pd.to_datetime(df_temporal["DATA"])
+    df_temporal["QUANTIDADE"] = df_temporal["QUANTIDADE"].astype("int64")
+    return df_temporal
+
+
+def contar_horarios(contagem_bruta: pd.DataFrame, exigir_horario: bool = True) -> Optional[pd.DataFrame]:
+    """
+    Contagens por PA, hora do dia e dia da semana
+
+    Cada valor bruto distinto é interpretado uma vez; hora e dia da semana
+    saem da aritmética inteira sobre os nanossegundos, e as contagens de
+    todos os PAs vêm de um único ``np.bincount`` em PA*168 + hora*7 + dia.
+
+    Args:
+        contagem_bruta: DataFrame com colunas PA, BRUTO e QUANTIDADE
+        exigir_horario: Com False a grade sai mesmo sem horário (contagem parcial
+            de um bloco; a checagem fica para ``combinar_parciais``)
+
+    Returns:
+        DataFrame com PA, HORA (0-23), DIA_SEMANA (0 = segunda) e QUANTIDADE,
+        ou None se as datas não tiverem horário (tudo à meia-noite)
+    """
+    codigos_brutos, valores = pd.factorize(contagem_bruta["BRUTO"])
+    if not len(valores):
+        return None
+    instantes = pd.to_datetime(pd.Series(valores), errors="coerce").to_numpy(dtype="datetime64[ns]")
+    validos = (codigos_brutos >= 0) & ~np.isnat(instantes)[codigos_brutos]
+    nanos = instantes.astype("int64")[codigos_brutos]
+    horas = (nanos // 3_600_000_000_000) % 24
+    if exigir_horario and not (horas[validos] != 0).any():
+        return None
+    # 01/01/1970 foi uma quinta-feira (dia 3 contando a segunda como 0)
+    dias_semana = (nanos // 86_400_000_000_000 + 3) % 7
+
+    horarias = pd.DataFrame({"PA": contagem_bruta["PA"].to_numpy()[validos], "HORA": horas[validos],
+                             "DIA_SEMANA": dias_semana[validos],
+                             "QUANTIDADE": contagem_bruta["QUANTIDADE"].to_numpy()[validos]})
+    return grade_horaria(horarias, pd.unique(contagem_bruta["PA"].dropna()))
+
+
+def horarios_por_dia(contagem: pd.DataFrame, pas) -> Optional[pd.DataFrame]:
+    """
+    Grade horária a partir de contagens já reduzidas a dia e hora no motor
+
+    Só os dias distintos são interpretados pelo pandas (dia da semana), como
+    em ``consolidar_temporal``; a hora já vem extraída do texto do carimbo.
+
+    Args:
+        contagem: DataFrame com PA, BRUTO (parte de data do texto), HORA e QUANTIDADE
+        pas: PAs da grade, na ordem de saída
+
+    Returns:
+        Grade de ``grade_horaria``, ou None se as datas não tiverem horário
+    """
+    dias = pd.Series(contagem["BRUTO"].dropna().unique())
+    semana = pd.Series(pd.to_datetime(dias, errors="coerce").dt.dayofweek.to_numpy(), index=dias.to_numpy())
+    contagem = contagem.assign(DIA_SEMANA=contagem["BRUTO"].map(semana))
+    contagem = contagem[contagem["DIA_SEMANA"].notna() & contagem["HORA"].between(0, 23)]
+    # Sem nenhum alerta fora da meia-noite as datas não têm horário: não há mapa
+    if not (contagem["HORA"] != 0).any():
+        return None
+    return grade_horaria(contagem, pas)
+
+
+def grade_horaria(contagem: pd.DataFrame, pas) -> pd.DataFrame:
+    """
+    Grade completa de 168 células (hora × dia da semana) por PA
+
+    As contagens de todos os PAs vêm de um único ``np.bincount`` em
+    PA*168 + hora*7 + dia; células sem alertas ficam com zero.
+
+    Args:
+        contagem: DataFrame com PA, HORA, DIA_SEMANA e QUANTIDADE (já somado ou não)
+        pas: PAs da grade, na ordem de saída
+
+    Returns:
+        DataFrame com PA, HORA (0-23), DIA_SEMANA (0 = segunda) e QUANTIDADE
+    """
+    pas = pd.Index(pas, dtype=object)
+    codigos = pas.get_indexer(contagem["PA"])
+    validos = codigos >= 0
+    celulas = (codigos[validos] * 168 + contagem["HORA"].to_numpy(dtype="int64")[validos] * 7
+               + contagem["DIA_SEMANA"].to_numpy(dtype="int64")[validos])
+    quantidades = np.bincount(celulas, weights=contagem["QUANTIDADE"].to_numpy()[validos],
+                              minlength=len(pas) * 168)
+
+    baldes = np.arange(168)
+    return pd.DataFrame({
+        "PA": np.repeat(pas.to_numpy(), 168),
+        "HORA": np.tile(baldes // 7, len(pas)),
+        "DIA_SEMANA": np.tile(baldes % 7, len(pas)),
+        "QUANTIDADE": quantidades.astype("int64"),
+    })
+
+
+def temporal_simulado(registros_por_pa: pd.Series) -> pd.DataFrame:
+    """
+    Cria dados temporais simulados (um dia por registro) quando não há coluna de data
+
+    Os registros ocupam dias consecutivos na ordem dos PAs em ``PREFIXOS``,
+    como no concat das partições, então basta a contagem de registros por PA.
+
+    Args:
+        registros_por_pa: Quantidade de registros de cada PA (Series indexada pelo PA)
+    """
+    print("⚠️ Nenhuma coluna de data encontrada. Criando dados temporais simulados...")
+    registros = registros_por_pa.groupby(level=0).sum()
+    ordem = [pa for pa in PREFIXOS if pa in registros.index]
+    ordem += [pa for pa in registros.index if pa not in PREFIXOS]
+    registros = registros.reindex(ordem).astype("int64")
+    registros = registros[registros > 0]
+
+    total = int(registros.sum())
+    data_inicio = pd.Timestamp(datetime.now() - timedelta(days=total)).normalize()
+    return pd.DataFrame({
+        "PA": np.repeat(registros.index.to_numpy(dtype=object), registros.to_numpy()),
+        "DATA": data_inicio + pd.to_timedelta(np.arange(total), unit="D"),
+        "QUANTIDADE": np.ones(total, dtype="int64"),
+    })
+
+
+def _somar(tabelas: List[pd.DataFrame]) -> pd.DataFrame:
+    """Soma QUANTIDADE de tabelas de contagem com as mesmas chaves (as demais colunas)"""
+    df = pd.concat(tabelas, ignore_index=True)
+    if len(tabelas) > 1:
+        chaves = [col for col in df.columns if col != "QUANTIDADE"]
+        df = df.groupby(chaves, dropna=False)["QUANTIDADE"].sum().reset_index()
+    df["QUANTIDADE"] = df["QUANTIDADE"].astype("int64")
+    return df
+
+
+class AcumuladorParciais:
+    """
+    Classe responsável por acumular os parciais dos blocos em totais correntes
+
+    Cada tabela (contagens, temporal, horário, diário) guarda o acumulado já
+    somado por chave e um lote de parciais pendentes; o lote só é somado ao
+    acumulado quando alcança o tamanho dele (ou ``MINIMO_LOTE`` linhas). Assim
+    o cubo acumulado é reagrupado uma quantidade logarítmica de vezes, não a
+    cada bloco, e a memória fica no tamanho do cubo. Sem coluna de data só a
+    quantidade de registros por PA é acumulada.
+    """
+
+    TABELAS = ("contagens", "temporal", "horario", "diario")
+    MINIMO_LOTE = 100_000  # linhas pendentes antes da primeira soma
+
+    def __init__(self):
+        self._acumulados: Dict[str, Optional[pd.DataFrame]] = dict.fromkeys(self.TABELAS)
+        self._pendentes: Dict[str, List[pd.DataFrame]] = {nome: [] for nome in self.TABELAS}
+        self._linhas_pendentes = dict.fromkeys(self.TABELAS, 0)
+        self.registros: Optional[pd.Series] = None
+        self.blocos = 0
+
+    def adicionar(self, parcial: Dict):
+        """Soma o parcial de um bloco (saída de ``PandasBackend.agregar_parcial``)"""
+        self.blocos += 1
+        for nome in self.TABELAS:
+            tabela = parcial.get(nome)
+            if tabela is None:
+                continue
+            self._pendentes[nome].append(tabela)
+            self._linhas_pendentes[nome] += len(tabela)
+            acumulado = self._acumulados[nome]
+            if self._linhas_pendentes[nome] >= max(self.MINIMO_LOTE, 0 if acumulado is None else len(acumulado)):
+                self._consolidar(nome)
+        if parcial.get("registros") is not None:
+            self.registros = (parcial["registros"] if self.registros is None
+                              else self.registros.add(parcial["registros"], fill_value=0))
+
+    def _consolidar(self, nome: str):
+        tabelas = self._pendentes[nome]
+        if self._acumulados[nome] is not None:
+            tabelas = [self._acumulados[nome], *tabelas]
+        self._acumulados[nome] = _somar(tabelas)
+        self._pendentes[nome] = []
+        self._linhas_pendentes[nome] = 0
+
+    def resultado(self) -> Dict:
+        """Parcial único com tudo o que foi acumulado, para ``combinar_parciais``"""
+        parcial = {}
+        for nome in self.TABELAS:
+            if self._pendentes[nome]:
+                self._consolidar(nome)
+            parcial[nome] = self._acumulados[nome]
+        parcial["registros"] = self.registros
+        return parcial
+
+
+def combinar_parciais(parciais: List[Dict]) -> Dict[str, pd.DataFrame]:
+    """
+    Soma agregados parciais (por bloco de leitura) nos agregados finais
+
+    Os parciais já estão no nível de dia (e de hora × dia da semana no mapa
+    horário), então aqui só há somas por chave.
+
+    Args:
+        parciais: Saídas de ``PandasBackend.agregar_parcial``
+
+    Returns:
+        Dict com ``contagens``, ``temporal`` e, se houver, ``diario``
+        (DATA/PA/TIPO/MOTORISTA/PREFIXO → QUANTIDADE, para o histórico) e
+        ``horario`` (PA/HORA/DIA_SEMANA → QUANTIDADE)
+    """
+    agregados = {"contagens": _somar([parcial["contagens"] for parcial in parciais])}
+
+    temporais = [parcial["temporal"] for parcial in parciais if parcial.get("temporal") is not None]
+    if temporais:
+        agregados["temporal"] = _somar(temporais)
+    else:
+        registros = [parcial["registros"] for parcial in parciais if parcial.get("registros") is not None]
+        agregados["temporal"] = temporal_simulado(pd.concat(registros))
+
+    horarios = [parcial["horario"] for parcial in parciais if parcial.get("horario") is not None]
+    if horarios:
+        horario = _somar(horarios)
+        # Sem nenhum alerta fora da meia-noite as datas não têm horário: não há mapa
+        if ((horario["HORA"] != 0) & (horario["QUANTIDADE"] > 0)).any():
+            agregados["horario"] = horario
+
+    diarios = [parcial["diario"] for parcial in parciais if parcial.get("diario") is not None]
+    if diarios:
+        agregados["diario"] = _somar(diarios)
+    return agregados
+
+
+class PandasBackend:
+    """Backend padrão: pandas eager em um núcleo"""
+
+    nome = "pandas"
+    registros_carregados = 0  # linhas lidas na última carga (depois do filtro da execução)
+
+    def carregar(self, filepath: str, filtro=None) -> pd.DataFrame:
+        if filtro is None or not filtro.ativo:
+            with abrir_fonte(filepath) as fonte:
+                df = pd.read_csv(fonte.stream, encoding=ENCODING_CSV, sep=None, engine="python")
+            self.registros_carregados = len(df)
+            return self.normalizar(df)
+
+        # Com filtro a leitura é em blocos: só as linhas que passam ficam na memória
+        separador = detectar_separador(filepath)
+        partes = []
+        with abrir_fonte(filepath) as fonte:
+            for chunk in pd.read_csv(fonte.stream, encoding=ENCODING_CSV, sep=separador,
+                                     chunksize=PIPELINE_TAMANHO_CHUNK):
+                partes.append(filtro.aplicar(self.normalizar(chunk)))
+        # Categorias diferentes entre blocos viram texto no concat: a normalização refaz as categóricas
+        df = self.normalizar(pd.concat(partes, ignore_index=True))
+        self.registros_carregados = len(df)
+        return df
+
+    def normalizar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Etapa única de limpeza de texto; o restante do fluxo conta com colunas limpas"""
+        for coluna, maiusculas in colunas_normalizaveis(df.columns):
+            df[coluna] = normalizar_categorica(df[coluna], maiusculas)
+        return df
+
+    def filtrar_por_prefixo(self, df: pd.DataFrame, prefixos: set, pa: str) -> pd.DataFrame:
+        df_filtrado = df[df["PREFIXO"].isin(prefixos)].copy()
+        if "TIPO" in df_filtrado.columns:
+            df_filtrado = df_filtrado[~df_filtrado["TIPO"].isin(TIPOS_DESCONSIDERAR)]
+
+        cols_para_remover = [col for col in COLUNAS_REMOVER if col in df_filtrado.columns]
+        if cols_para_remover:
+            df_filtrado.drop(columns=cols_para_remover, inplace=True)
+        df_filtrado.insert(0, "PA", pa)
+        return df_filtrado
+
+    def contar_hotspots(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """Contagens por célula de grade, antes de as coordenadas saírem na partição"""
+        return contar_hotspots(df)
+
+    def deduplicar(self, df: pd.DataFrame, deduplicador) -> pd.DataFrame:
+        return deduplicador.aplicar(df)
+
+    def excluir_tipos(self, df: pd.DataFrame, tipos) -> pd.DataFrame:
+        """Remove os TIPOs indicados (além dos de ``TIPOS_DESCONSIDERAR``), ex.: ao refazer o relatório"""
+        if not tipos or "TIPO" not in df.columns:
+            return df
+        return df[~df["TIPO"].isin(tipos)]
+
+    def para_pandas(self, particao: pd.DataFrame) -> pd.DataFrame:
+        return particao
+
+    def agregar(self, particoes: List[pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """
+        Calcula os agregados usados pelos gráficos
+
+        Args:
+            particoes: Partições por PA (já com a coluna PA)
+
+        Returns:
+            Dict com ``contagens`` (PA/TIPO/MOTORISTA → QUANTIDADE, nulos mantidos)
+            e ``temporal`` (PA/DATA → QUANTIDADE)
+        """
+        df_geral = pd.concat(particoes, ignore_index=True)
+
+        coluna_data = detectar_coluna_data(df_geral.columns)
+        if coluna_data is not None:
+            print(f"📅 Processando coluna de data: {coluna_data}")
+
+        return combinar_parciais([self.agregar_parcial(df_geral)])
+
+    def agregar_parcial(self, df: pd.DataFrame) -> Dict:
+        """
+        Contagens parciais de um bloco de partições, somáveis com ``combinar_parciais``
+
+        Args:
+            df: Partição (ou bloco de partição) com a coluna PA
+
+        Returns:
+            Dict com ``contagens``, ``temporal`` (PA/dia), ``horario`` (PA/hora/dia
+            da semana, com o mapa horário ativo), ``diario`` (PA/TIPO/MOTORISTA/
+            PREFIXO/dia, com o histórico ativo) e ``registros`` (registros por PA,
+            usado só quando não há coluna de data). Tudo já no nível de dia: o
+            tamanho de um parcial não cresce com o número de linhas do bloco.
+        """
+        chaves = [col for col in ("PA", "TIPO", "MOTORISTA") if col in df.columns]
+        contagens = df.groupby(chaves, dropna=False, observed=True).size().reset_index(name="QUANTIDADE")
+        for coluna in chaves:
+            # Agregados voltam a texto simples: categorias de blocos diferentes não se misturam
+            contagens[coluna] = contagens[coluna].astype(object)
+
+        coluna_data = detectar_coluna_data(df.columns)
+        if coluna_data is None:
+            registros = df["PA"].astype(object).value_counts()
+            return {"contagens": contagens, "temporal": None, "registros": registros}
+
+        if not HISTORICO_ATIVO:
+            contagem_bruta = (df.groupby(["PA", coluna_data], observed=True).size()
+                              .reset_index(name="QUANTIDADE")
+                              .rename(columns={coluna_data: "BRUTO"}))
+            parcial = {"contagens": contagens, "temporal": consolidar_temporal(contagem_bruta)}
+        else:
+            # Uma passada no nível do histórico; a contagem por PA/dia sai do cubo diário somada
+            dimensoes = [col for col in DIMENSOES_DIARIO if col in df.columns]
+            detalhado = (df.groupby([*dimensoes, coluna_data], dropna=False, observed=True).size()
+                         .reset_index(name="QUANTIDADE")
+                         .rename(columns={coluna_data: "BRUTO"}))
+            for coluna in dimensoes:
+                detalhado[coluna] = detalhado[coluna].astype(object)
+            diario = consolidar_temporal(detalhado, dimensoes)
+            temporal = diario.groupby(["PA", "DATA"])["QUANTIDADE"].sum().reset_index()
+            parcial = {"contagens": contagens, "temporal": temporal, "diario": diario}
+            contagem_bruta = detalhado.groupby(["PA", "BRUTO"])["QUANTIDADE"].sum().reset_index() if MAPA_HORARIO else None
+
+        if MAPA_HORARIO:
+            # Horário ainda no valor bruto, mas já reduzido à grade de 168 células por PA
+            parcial["horario"] = contar_horarios(contagem_bruta, exigir_horario=False)
+        return parcial
+
+
+class PolarsBackend:
+    """
+    Backend Polars: LazyFrame com pushdown de projeção/predicado e groupbys
+    multi-thread. Produz as mesmas partições e agregados do backend pandas.
+    """
+
+    nome = "polars"
+    registros_carregados = 0  # linhas lidas na última carga (depois do filtro, antes do roteamento)
+
+    def __init__(self):
+        if pl is None:
+            raise ImportError("Backend 'polars' requer o pacote polars instalado")
+
+    def _arquivo_utf8(self, filepath: str):
+        """
+        ``scan_csv`` só lê UTF-8 descompactado: transcodifica em blocos para um
+        temporário se preciso (descompactando no mesmo passo)
+        """
+        utf8 = ENCODING_CSV.lower().replace("-", "").replace("_", "") in ("utf8", "ascii")
+        if utf8 and not e_compactado(filepath):
+            return filepath, False
+
+        fd, destino = tempfile.mkstemp(suffix=".csv")
+        with abrir_fonte(filepath) as fonte, \
+                os.fdopen(fd, "w", encoding="utf-8", newline="") as saida:
+            origem = io.TextIOWrapper(fonte.stream, encoding=ENCODING_CSV, newline="")
+            shutil.copyfileobj(origem, saida, 1 << 20)
+        return destino, True
+
+    def carregar(self, filepath: str, filtro=None) -> "pl.DataFrame":
+        caminho, temporario = self._arquivo_utf8(filepath)
+        try:
+            lf = pl.scan_csv(caminho, separator=detectar_separador(filepath),
+                             infer_schema_length=None)
+            colunas = lf.collect_schema().names()
+            if "PREFIXO" not in colunas:
+                raise KeyError("PREFIXO")
+
+            # Projeção: descarta as colunas removidas antes de materializar
+            # (as coordenadas ficam até a partição quando os pontos críticos estão ativos)
+            manter = [col for col in colunas
+                      if col not in COLUNAS_REMOVER or (HOTSPOTS_ATIVO and col in HOTSPOT_COLUNAS)]
+
+            # Normalização antes do predicado, para o filtro enxergar os valores limpos
+            lf = lf.select(manter).with_columns(self._expressoes_normalizacao(manter))
+
+            if filtro is not None and filtro.ativo:
+                lf = lf.filter(self._expressao_filtro(filtro, manter))
+
+            # Predicado: só prefixos roteados e tipos considerados
+            todos_prefixos = sorted(set().union(*PREFIXOS.values()))
+            predicado = pl.col("PREFIXO").is_in(todos_prefixos)
+            if "TIPO" in manter:
+                predicado = predicado & (~pl.col("TIPO").is_in(sorted(TIPOS_DESCONSIDERAR))).fill_null(True)
+
+            # A contagem sai antes do roteamento, como no pandas (que só separa os PAs depois);
+            # as duas consultas compartilham a mesma leitura do arquivo
+            dados, total = pl.collect_all([lf.filter(predicado), lf.select(pl.len())])
+            self.registros_carregados = int(total.item())
+            return dados
+        finally:
+            if temporario:
+                os.remove(caminho)
+
+    def _expressao_filtro(self, filtro, colunas) -> "pl.Expr":
+        """Filtro da execução como predicado do scan (avaliado antes de materializar as linhas)"""
+        coluna_data = filtro.verificar(colunas)
+        expressao = pl.lit(True)
+        for coluna, valores, inclusao in filtro.listas():
+            if coluna not in colunas:
+                continue
+            presentes = pl.col(coluna).is_in(sorted(valores))
+            expressao = expressao & (presentes.fill_null(False) if inclusao else (~presentes).fill_null(True))
+        if coluna_data is not None:
+            # Datas interpretadas pelo pandas, valor distinto a valor distinto, como nos outros motores
+            expressao = expressao & pl.col(coluna_data).map_batches(
+                lambda serie: serie.is_in(pl.Series(values=filtro.dias_permitidos(serie.to_pandas()),
+                                                    dtype=serie.dtype).implode()),
+                return_dtype=pl.Boolean
+            )
+        return expressao
+
+    def _expressoes_normalizacao(self, colunas) -> list:
+        expressoes = []
+        for coluna, maiusculas in colunas_normalizaveis(colunas):
+            texto = pl.col(coluna).cast(pl.Utf8).str.strip_chars()
+            if maiusculas:
+                texto = texto.str.to_uppercase()
+            expressoes.append(pl.when(texto == "").then(None).otherwise(texto).alias(coluna))
+        return expressoes
+
+    def normalizar(self, df: "pl.DataFrame") -> "pl.DataFrame":
+        """Mesma limpeza do pandas; as colunas ficam como strings Arrow do próprio Polars"""
+        return df.with_columns(self._expressoes_normalizacao(df.columns))
+
+    def filtrar_por_prefixo(self, df: "pl.DataFrame", prefixos: set, pa: str) -> "pl.DataFrame":
+        return (df.filter(pl.col("PREFIXO").is_in(sorted(prefixos)))
+                  .select([pl.lit(pa).alias("PA"), pl.exclude(list(HOTSPOT_COLUNAS))]))
+
+    def contar_hotspots(self, df: "pl.DataFrame") -> Optional[pd.DataFrame]:
+        # Só as colunas usadas passam para o pandas
+        colunas = [col for col in ("PREFIXO", "TIPO", *HOTSPOT_COLUNAS) if col in df.columns]
+        return contar_hotspots(df.select(colunas).to_pandas())
+
+    def deduplicar(self, df: "pl.DataFrame", deduplicador) -> "pl.DataFrame":
+        # Só as colunas da chave passam pelo pandas, para os hashes baterem com o outro backend
+        chave = deduplicador.colunas_chave(df.columns)
+        if not chave:
+            return df
+        mascara = deduplicador.filtrar(df.select(chave).to_pandas())
+        return df.filter(pl.Series(mascara))
+
+    def excluir_tipos(self, df: "pl.DataFrame", tipos) -> "pl.DataFrame":
+        if not tipos or "TIPO" not in df.columns:
+            return df
+        return df.filter(~pl.col("TIPO").is_in(sorted(tipos)))
+
+    def para_pandas(self, particao: "pl.DataFrame") -> pd.DataFrame:
+        return particao.to_pandas()
+
+    def agregar(self, particoes: List["pl.DataFrame"]) -> Dict[str, pd.DataFrame]:
+        """Mesmo contrato de ``PandasBackend.agregar``, com groupbys em paralelo"""
+        lf = pl.concat(particoes, how="vertical").lazy()
+        colunas = lf.collect_schema().names()
+
+        chaves = [col for col in ("PA", "TIPO", "MOTORISTA") if col in colunas]
+        contagens = (lf.select(chaves)
+                       .group_by(chaves)
+                       .agg(pl.len().cast(pl.Int64).alias("QUANTIDADE"))
+                       .sort(chaves, nulls_last=True)
+                       .collect()
+                       .to_pandas())
+
+        coluna_data = detectar_coluna_data(colunas)
+        if coluna_data is None:
+            registros = lf.group_by("PA").agg(pl.len().alias("QUANTIDADE")).collect().to_pandas()
+            temporal = temporal_simulado(registros.set_index("PA")["QUANTIDADE"])
+        else:
+            print(f"📅 Processando coluna de data: {coluna_data}")
+            dimensoes = [col for col in DIMENSOES_DIARIO if col in colunas] if HISTORICO_ATIVO else ["PA"]
+            # Carimbos reduzidos a dia (e hora) no próprio Polars: só o cubo diário e
+            # as contagens PA/dia/hora chegam ao pandas, não um grupo por carimbo
+            texto = pl.col(coluna_data).cast(pl.Utf8).str.strip_chars()
+            dia = texto.str.split(" ").list.first().str.split("T").list.first().alias("BRUTO")
+            consultas = [lf.group_by([*dimensoes, dia]).agg(pl.len().cast(pl.Int64).alias("QUANTIDADE"))]
+            if MAPA_HORARIO:
+                horario = texto.str.replace_all("T", " ", literal=True).str.split(" ").list.get(1, null_on_oob=True)
+                hora = (pl.when(horario.is_null() | (horario == "")).then(0)
+                          .otherwise(horario.str.split(":").list.first().cast(pl.Int64, strict=False))
+                          .alias("HORA"))
+                consultas.append(lf.group_by(["PA", dia, hora]).agg(pl.len().cast(pl.Int64).alias("QUANTIDADE")))
+            resultados = [tabela.to_pandas() for tabela in pl.collect_all(consultas)]
+
+            contagem_bruta = resultados[0]
+            temporal = consolidar_temporal(contagem_bruta)
+            agregados = {"contagens": contagens, "temporal": temporal}
+            if HISTORICO_ATIVO:
+                agregados["diario"] = consolidar_temporal(contagem_bruta, dimensoes)
+            horario = horarios_por_dia(resultados[1], pd.unique(contagem_bruta["PA"].dropna())) if MAPA_HORARIO else None
+            if horario is not None:
+                agregados["horario"] = horario
+            return agregados
+
+        return {"contagens": contagens, "temporal": temporal}
+
+
+BACKENDS = {
+    PandasBackend.nome: PandasBackend,
+    PolarsBackend.nome: PolarsBackend,
+}
+
+
+def obter_backend(nome: Optional[str] = None):
+    """
+    Instancia o backend pelo nome (padrão: ``config.BACKEND_PADRAO``)
+
+    "auto" é resolvido por arquivo na verificação prévia; fora dela vale o pandas.
+    """
+    nome = nome or BACKEND_PADRAO
+    if nome == "auto":
+        nome = PandasBackend.nome
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {nome} (opções: {', '.join(BACKENDS)})")
+    return BACKENDS[nome]()
@@ -0,0 +1,43 @@
+"""
+Benchmark: um XLSX por PA x workbook único com uma aba por PA
+
+Uso: python benchmarks/bench_exportacao.py [linhas]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from dados_sinteticos import gerar_csv
+
+from data_processor import DataProcessor
+
+
+def medir(filepath: str, modo_exportacao: str, modo: str):
+    processor = DataProcessor()
+    inicio = time.perf_counter()
+    arquivos = processor.processar_arquivo(filepath, modo=modo, modo_exportacao=modo_exportacao)
+    duracao = time.perf_counter() - inicio
+    tamanho = sum(os.path.getsize(caminho) for caminho in arquivos)
+    return duracao, tamanho, len(arquivos)
+
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    resultados = []
+    for modo in ("memoria", "pipeline"):
+        for modo_exportacao in ("arquivos", "workbook_unico"):
+            with tempfile.TemporaryDirectory() as pasta:
+                filepath = gerar_csv(os.path.join(pasta, "alertas.csv"), linhas)
+                resultados.append((modo, modo_exportacao, *medir(filepath, modo_exportacao, modo)))
+
+    print(f"\n📏 {linhas} linhas")
+    print(f"{'execução':<10} {'exportação':<16} {'tempo (s)':>10} {'tamanho (MB)':>13} {'arquivos':>9}")
+    for modo, modo_exportacao, duracao, tamanho, quantidade in resultados:
+        print(f"{modo:<10} {modo_exportacao:<16} {duracao:>10.2f} {tamanho / 2**20:>13.2f} {quantidade:>9}")
+
+
+if __name__ == "__main__":
+    main()
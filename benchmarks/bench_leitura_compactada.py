@@ -0,0 +1,83 @@
+"""
+Benchmark: vazão de leitura do CSV simples x exportações compactadas
+
+Uso: python benchmarks/bench_leitura_compactada.py [linhas]
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+import pandas as pd
+
+from dados_sinteticos import gerar_csv
+
+from config import ENCODING_CSV
+from source_reader import abrir_fonte
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def compactar(origem: str, pasta: str) -> dict:
+    """Gera uma cópia do CSV em cada formato suportado"""
+    arquivos = {"csv": origem}
+    for formato, abrir in (("gz", gzip.open), ("bz2", bz2.open), ("xz", lzma.open)):
+        destino = os.path.join(pasta, f"alertas.csv.{formato}")
+        with open(origem, "rb") as entrada, abrir(destino, "wb") as saida:
+            shutil.copyfileobj(entrada, saida, 1 << 20)
+        arquivos[formato] = destino
+
+    if zstandard is not None:
+        destino = os.path.join(pasta, "alertas.csv.zst")
+        with open(origem, "rb") as entrada, open(destino, "wb") as saida:
+            zstandard.ZstdCompressor().copy_stream(entrada, saida)
+        arquivos["zst"] = destino
+
+    # Zip com a exportação dividida em dois membros (mesmo cabeçalho)
+    df = pd.read_csv(origem, encoding=ENCODING_CSV, sep=";")
+    metade = len(df) // 2
+    destino = os.path.join(pasta, "alertas.zip")
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for i, parte in enumerate((df.iloc[:metade], df.iloc[metade:]), start=1):
+            texto = parte.to_csv(sep=";", index=False)
+            arquivo_zip.writestr(f"alertas_parte{i}.csv", texto.encode(ENCODING_CSV))
+    arquivos["zip"] = destino
+    return arquivos
+
+
+def medir(filepath: str, tamanho_chunk: int = 100_000):
+    inicio = time.perf_counter()
+    linhas = 0
+    with abrir_fonte(filepath) as fonte:
+        for chunk in pd.read_csv(fonte.stream, encoding=ENCODING_CSV, sep=";", chunksize=tamanho_chunk):
+            linhas += len(chunk)
+    return time.perf_counter() - inicio, linhas
+
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+
+    with tempfile.TemporaryDirectory() as pasta:
+        origem = gerar_csv(os.path.join(pasta, "alertas.csv"), linhas)
+        tamanho_csv = os.path.getsize(origem)
+        arquivos = compactar(origem, pasta)
+
+        print(f"\n📏 {linhas} linhas, CSV de {tamanho_csv / 2**20:.1f} MB")
+        print(f"{'formato':<8} {'disco (MB)':>11} {'tempo (s)':>10} {'MB/s':>8} {'linhas/s':>12}")
+        for formato, caminho in arquivos.items():
+            duracao, lidas = medir(caminho)
+            print(f"{formato:<8} {os.path.getsize(caminho) / 2**20:>11.1f} {duracao:>10.2f} "
+                  f"{tamanho_csv / 2**20 / duracao:>8.1f} {lidas / duracao:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
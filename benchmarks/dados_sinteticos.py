@@ -0,0 +1,43 @@
+"""
+Geração de exportações sintéticas de alertas para os benchmarks
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PREFIXOS, ENCODING_CSV, TIPOS_DESCONSIDERAR
+
+TIPOS = ["EXCESSO_VELOCIDADE", "FREADA_BRUSCA", "ACELERACAO_BRUSCA", "CURVA_FECHADA",
+         "FADIGA", "CELULAR", *sorted(TIPOS_DESCONSIDERAR)]
+
+
+def gerar_dataframe(linhas: int, seed: int = 42) -> pd.DataFrame:
+    """Monta um DataFrame com o layout do portal de telemetria"""
+    rng = np.random.default_rng(seed)
+    prefixos = sorted(set().union(*PREFIXOS.values())) + ["XX999", "YY123"]
+    motoristas = [f"MOTORISTA {i:04d}" for i in range(400)]
+    inicio = np.datetime64("2024-01-01T00:00:00")
+    segundos = rng.integers(0, 90 * 86400, linhas)
+
+    return pd.DataFrame({
+        "PREFIXO": rng.choice(prefixos, linhas),
+        "TIPO": rng.choice(TIPOS, linhas),
+        "MOTORISTA": rng.choice(motoristas, linhas),
+        "DATA": pd.to_datetime(inicio + segundos.astype("timedelta64[s]")).strftime("%Y-%m-%d %H:%M:%S"),
+        "VELOCIDADE": rng.integers(0, 120, linhas),
+        "CIDADE": "SAO LUIS",
+        "ESTADO": "MA",
+        "LATITUDE": -2.53 + rng.normal(0, 0.05, linhas),
+        "LONGITUDE": -44.30 + rng.normal(0, 0.05, linhas),
+    })
+
+
+def gerar_csv(caminho: str, linhas: int, seed: int = 42) -> str:
+    """Grava a exportação sintética no encoding/separador esperados pelo processador"""
+    gerar_dataframe(linhas, seed).to_csv(caminho, index=False, sep=";", encoding=ENCODING_CSV)
+    return caminho
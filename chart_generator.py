@@ -2,6 +2,7 @@
 Módulo para geração de gráficos - Versão Ultra Profissional com Análise Temporal
 """
 
+import io
 import os
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -9,26 +10,103 @@ import matplotlib.dates as mdates
 import matplotlib
 import seaborn as sns
 from matplotlib.patches import Rectangle, FancyBboxPatch
-from datetime import datetime, timedelta
-from typing import List, Optional
+from matplotlib.colors import LogNorm
+from matplotlib.transforms import Bbox
+from matplotlib.backends.backend_pdf import PdfPages
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 import subprocess
 import platform
+import threading
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
 
 from styles import MATPLOTLIB_CONFIG, CORES_TIPO, CORES_PA, GRAFICO_CONFIG, THEME_COLORS, MESES_PT
-from config import TOP_MOTORISTAS, TIPOS_DESCONSIDERAR
+from config import (TOP_MOTORISTAS, TIPOS_DESCONSIDERAR, ABA_RESUMO, PREVIA_DPI, RENDERIZACAO_PARALELA,
+                    RENDERIZACAO_WORKERS, FORMATO_RELATORIO, PDF_TAMANHO_PAGINA, PDF_DPI_RASTER,
+                    PDF_LIMITE_VETORIAL, HOTSPOT_RESOLUCAO, REAPROVEITAR_SAIDAS)
+from backends import PandasBackend
+from duckdb_aggregator import DuckDBAggregator
+from driver_ranking import ranking_motoristas
+from preview import AmostradorPrevia
+from run_manifest import caminho_temporario, publicar
+from fingerprint import (CONFIG_RELATORIO, MODULOS_RELATORIO, impressao_agregados, registrar_saida, resumir,
+                         saida_reaproveitavel, valores_config, versao_codigo)
 
 # Configurar matplotlib para não usar GUI quando necessário
 matplotlib.use('Agg')
 
+# Painéis do relatório e sua célula no layout (linha, coluna) da figura
+PAINEIS_RELATORIO = {
+    "header": (0, slice(None)),
+    "tipos": (1, 0),
+    "pizza": (1, 1),
+    "motoristas": (2, 0),
+    "tipos_motoristas": (2, 1),
+    "temporal": (3, slice(None)),
+}
+
+# Painéis que só existem com os dados correspondentes nos agregados (páginas extras no PDF)
+PAINEIS_ADICIONAIS = ("anomalias", "horario", "hotspots")
+
+# Adicionais que também entram na figura do relatório (PNG e visão geral do PDF), em linhas
+# abaixo dos painéis fixos; só os que têm dados ocupam espaço e um sozinho na linha usa a largura toda
+LINHAS_ADICIONAIS_FIGURA = (("anomalias",), ("horario", "hotspots"))
+PAINEIS_ADICIONAIS_FIGURA = tuple(painel for linha in LINHAS_ADICIONAIS_FIGURA for painel in linha)
+ALTURA_LINHA_FIGURA = 1.8  # proporção de cada linha extra (a mesma das linhas de gráficos)
+
+DIAS_SEMANA_PT = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+
+# Página de um PA no PDF: sem a pizza (um PA só), gráfico 4 ocupa a largura toda
+PAINEIS_PAGINA_PA = {
+    "header": (0, slice(None)),
+    "tipos": (1, 0),
+    "motoristas": (1, 1),
+    "tipos_motoristas": (2, slice(None)),
+    "temporal": (3, slice(None)),
+}
+
+# TrueType embutido (type 42): o texto do PDF continua selecionável e só os glifos usados entram
+PDF_CONFIG = {
+    "pdf.fonttype": 42,
+    "pdf.compression": 9,
+}
+
+# Margem do bbox_inches='tight' em volta do relatório
+MARGEM_RELATORIO = 0.3
+
 # Configurar Seaborn para design ultra profissional
 sns.set_style("whitegrid")
 
 
+def layout_relatorio(agregados: dict) -> Tuple[Dict[str, tuple], int]:
+    """
+    Células de cada painel na figura do relatório
+
+    Returns:
+        Tupla (painel → célula (linha, coluna), linhas extras além das 4 fixas)
+    """
+    celulas = dict(PAINEIS_RELATORIO)
+    fixas = linha = len(set(celula[0] for celula in PAINEIS_RELATORIO.values()))
+    for paineis in LINHAS_ADICIONAIS_FIGURA:
+        presentes = [painel for painel in paineis if agregados.get(painel) is not None]
+        for coluna, painel in enumerate(presentes):
+            celulas[painel] = (linha, slice(None) if len(presentes) == 1 else coluna)
+        linha += bool(presentes)
+    return celulas, linha - fixas
+
+
 class ChartGenerator:
     """Classe responsável pela geração de gráficos ultra profissionais com análise temporal"""
     
-    def __init__(self):
+    def __init__(self, top_motoristas: int = TOP_MOTORISTAS, paralelo: bool = RENDERIZACAO_PARALELA,
+                 formato: str = FORMATO_RELATORIO):
+        self.top_motoristas = top_motoristas
+        self.paralelo = paralelo
+        self.formato = formato
+        # pyplot não é thread-safe: prévia e relatório completo desenham um de cada vez
+        self._lock_renderizacao = threading.Lock()
         self._configurar_matplotlib()
         self._configurar_seaborn()
     
@@ -125,50 +203,6 @@ class ChartGenerator:
         except Exception as e:
             print(f"⚠️ Não foi possível abrir o gráfico automaticamente: {e}")
     
-    def _processar_dados_temporais(self, df_geral: pd.DataFrame):
-        """
-        Processa dados temporais para análise de tendências
-        
-        Args:
-            df_geral: DataFrame com todos os dados
-            
-        Returns:
-            DataFrame processado com análise temporal
-        """
-        try:
-            # Verificar se existe coluna DATA
-            colunas_data_possiveis = ['DATA', 'Date', 'data', 'DATA_OCORRENCIA', 'DATA_ALERTA']
-            coluna_data = None
-            
-            for col in colunas_data_possiveis:
-                if col in df_geral.columns:
-                    coluna_data = col
-                    break
-            
-            if coluna_data is None:
-                print("⚠️ Nenhuma coluna de data encontrada. Criando dados temporais simulados...")
-                # Criar datas simuladas baseadas no índice
-                data_inicio = datetime.now() - timedelta(days=len(df_geral))
-                df_geral['DATA_PROCESSADA'] = [data_inicio + timedelta(days=i) for i in range(len(df_geral))]
-            else:
-                # Processar coluna de data existente
-                print(f"📅 Processando coluna de data: {coluna_data}")
-                df_geral['DATA_PROCESSADA'] = pd.to_datetime(df_geral[coluna_data], errors='coerce')
-                
-                # Remover registros com data inválida
-                df_geral = df_geral.dropna(subset=['DATA_PROCESSADA'])
-            
-            # Agrupar por PA e data
-            df_temporal = df_geral.groupby(['PA', df_geral['DATA_PROCESSADA'].dt.date]).size().reset_index()
-            df_temporal.columns = ['PA', 'DATA', 'QUANTIDADE']
-            df_temporal['DATA'] = pd.to_datetime(df_temporal['DATA'])
-            
-            return df_temporal
-            
-        except Exception as e:
-            print(f"⚠️ Erro no processamento temporal: {e}")
-            return pd.DataFrame()
-    
     def _calcular_tendencias(self, df_temporal: pd.DataFrame):
         """
         Calcula tendências de aumento/diminuição para cada PA
@@ -237,12 +271,9 @@ class ChartGenerator:
         
         return tendencias
     
-    def _criar_grafico_temporal_ultra_profissional(self, fig, ax5, df_geral: pd.DataFrame):
-        """Cria gráfico de análise temporal ultra profissional"""
+    def _criar_grafico_temporal_ultra_profissional(self, fig, ax5, df_temporal: pd.DataFrame):
+        """Cria gráfico de análise temporal ultra profissional a partir das contagens diárias por PA"""
         try:
-            # Processar dados temporais
-            df_temporal = self._processar_dados_temporais(df_geral)
-            
             if df_temporal.empty:
                 self._criar_grafico_vazio(ax5, "ANÁLISE TEMPORAL - SEM DADOS", 
                                         "Sem dados temporais válidos")
@@ -345,7 +376,7 @@ class ChartGenerator:
             self._criar_grafico_vazio(ax5, "ANÁLISE TEMPORAL - ERRO", 
                                     f"Erro no processamento: {str(e)}")
     
-    def _criar_header_com_subtitulo_estatisticas(self, fig, ax_header, df_geral: pd.DataFrame, data_atual: datetime):
+    def _criar_header_com_subtitulo_estatisticas(self, fig, ax_header, agregados: dict, data_atual: datetime):
         """Cria o cabeçalho ultra profissional com estatísticas como subtítulo"""
         ax_header.axis('off')
         
@@ -363,25 +394,24 @@ class ChartGenerator:
                       color='#64748b', transform=ax_header.transAxes, 
                       fontweight='medium')
     
-    def _criar_grafico_tipos_ultra_profissional(self, fig, ax1, df_geral: pd.DataFrame):
+    def _criar_grafico_tipos_ultra_profissional(self, fig, ax1, contagens: pd.DataFrame):
         """Cria gráfico de distribuição por tipos ultra profissional com detalhes premium"""
-        if "TIPO" not in df_geral.columns:
+        if "TIPO" not in contagens.columns:
             self._criar_grafico_vazio(ax1, "DISTRIBUIÇÃO DE ALERTAS - COLUNA TIPO NÃO ENCONTRADA", 
                                     "Coluna TIPO não encontrada nos dados")
             return
         
         try:
-            # Limpar e filtrar dados de TIPO
-            df_geral["TIPO"] = df_geral["TIPO"].astype(str).str.strip()
-            df_geral = df_geral[df_geral["TIPO"] != "nan"]
-            df_geral = df_geral[~df_geral["TIPO"].isin(TIPOS_DESCONSIDERAR)]
+            # Filtrar tipos válidos (a limpeza já foi feita na agregação)
+            df_tipos = contagens.dropna(subset=["TIPO"])
+            df_tipos = df_tipos[~df_tipos["TIPO"].isin(TIPOS_DESCONSIDERAR)]
             
-            if df_geral.empty:
+            if df_tipos.empty:
                 self._criar_grafico_vazio(ax1, "DISTRIBUIÇÃO DE ALERTAS - SEM DADOS VÁLIDOS", 
                                         "Sem dados válidos após filtros")
                 return
             
-            tipo_contagem = df_geral.groupby(["PA", "TIPO"]).size().unstack(fill_value=0)
+            tipo_contagem = df_tipos.groupby(["PA", "TIPO"])["QUANTIDADE"].sum().unstack(fill_value=0)
             if tipo_contagem.empty:
                 self._criar_grafico_vazio(ax1, "DISTRIBUIÇÃO DE ALERTAS - SEM CATEGORIAS", 
                                         "Sem dados de categoria válidos")
@@ -441,10 +471,10 @@ class ChartGenerator:
             self._criar_grafico_vazio(ax1, "DISTRIBUIÇÃO DE ALERTAS - ERRO", 
                                     f"Erro no processamento: {str(e)}")
     
-    def _criar_grafico_pizza_ultra_profissional(self, fig, ax2, df_geral: pd.DataFrame):
+    def _criar_grafico_pizza_ultra_profissional(self, fig, ax2, contagens: pd.DataFrame):
         """Cria gráfico de pizza ultra profissional com detalhes premium"""
         try:
-            pa_contagem = df_geral.groupby("PA").size().sort_values(ascending=False)
+            pa_contagem = contagens.groupby("PA")["QUANTIDADE"].sum().sort_values(ascending=False)
             if pa_contagem.empty:
                 self._criar_grafico_vazio(ax2, "VOLUME TOTAL DE ALERTAS - SEM DADOS", 
                                         "Sem dados válidos para análise")
@@ -494,26 +524,16 @@ class ChartGenerator:
             self._criar_grafico_vazio(ax2, "VOLUME TOTAL DE ALERTAS - ERRO", 
                                     f"Erro no processamento: {str(e)}")
     
-    def _criar_grafico_motoristas_ultra_profissional(self, fig, ax3, df_geral: pd.DataFrame):
+    def _criar_grafico_motoristas_ultra_profissional(self, fig, ax3, ranking: Optional[dict]):
         """Cria gráfico dos top motoristas ultra profissional com barras horizontais"""
         try:
-            if "MOTORISTA" not in df_geral.columns:
+            if ranking is None:
                 self._criar_grafico_vazio(ax3, "TOP MOTORISTAS - COLUNA NÃO ENCONTRADA", 
                                         "Coluna MOTORISTA não encontrada")
                 return
         
-            # Limpar dados de motorista
-            df_geral["MOTORISTA"] = df_geral["MOTORISTA"].astype(str).str.strip()
-            df_motoristas = df_geral[df_geral["MOTORISTA"] != "nan"]
-            df_motoristas = df_motoristas[df_motoristas["MOTORISTA"] != ""]
-        
-            if df_motoristas.empty:
-                self._criar_grafico_vazio(ax3, "TOP MOTORISTAS - SEM DADOS", 
-                                        "Sem dados válidos de motoristas")
-                return
-        
-            # Contar alertas por motorista e pegar os top 7
-            motorista_contagem = df_motoristas.groupby("MOTORISTA").size().sort_values(ascending=False).head(TOP_MOTORISTAS)
+            # Top K já calculado pelo motor de ranking
+            motorista_contagem = ranking["global"]
         
             if motorista_contagem.empty:
                 self._criar_grafico_vazio(ax3, "TOP MOTORISTAS - SEM DADOS", 
@@ -521,7 +541,7 @@ class ChartGenerator:
                 return
         
             # Preparar dados para Seaborn
-            df_motoristas_plot = motorista_contagem.reset_index()
+            df_motoristas_plot = motorista_contagem[["MOTORISTA", "QUANTIDADE"]].copy()
             df_motoristas_plot.columns = ['Motorista', 'Alertas']
             df_motoristas_plot = df_motoristas_plot.sort_values('Alertas', ascending=True)
         
@@ -540,7 +560,7 @@ class ChartGenerator:
             ax3.set_yticklabels(labels, fontsize=9)
         
             # Título ultra profissional SEM caixa
-            ax3.set_title('🚗 TOP 7 MOTORISTAS COM MAIS ALERTAS', 
+            ax3.set_title(f'🚗 TOP {len(df_motoristas_plot)} MOTORISTAS COM MAIS ALERTAS', 
                         fontsize=16, fontweight='bold', pad=25, color='black')
         
             # Labels dos eixos ultra profissionais
@@ -582,32 +602,30 @@ class ChartGenerator:
             self._criar_grafico_vazio(ax3, "TOP MOTORISTAS - ERRO", 
                                     f"Erro no processamento: {str(e)}")
     
-    def _criar_grafico_tipos_motoristas_ultra_profissional(self, fig, ax4, df_geral: pd.DataFrame):
+    def _criar_grafico_tipos_motoristas_ultra_profissional(self, fig, ax4, contagens: pd.DataFrame,
+                                                           ranking: Optional[dict]):
         """Cria gráfico dos tipos de alertas dos top motoristas ultra profissional com detalhes premium"""
         try:
-            if "MOTORISTA" not in df_geral.columns or "TIPO" not in df_geral.columns:
+            if ranking is None or "TIPO" not in contagens.columns:
                 self._criar_grafico_vazio(ax4, "TIPOS POR MOTORISTA - COLUNAS NÃO ENCONTRADAS", 
                                         "Colunas MOTORISTA ou TIPO não encontradas")
                 return
             
-            # Limpar dados
-            df_clean = df_geral.copy()
-            df_clean["MOTORISTA"] = df_clean["MOTORISTA"].astype(str).str.strip()
-            df_clean["TIPO"] = df_clean["TIPO"].astype(str).str.strip()
-            df_clean = df_clean[(df_clean["MOTORISTA"] != "nan") & (df_clean["MOTORISTA"] != "")]
-            df_clean = df_clean[(df_clean["TIPO"] != "nan") & (~df_clean["TIPO"].isin(TIPOS_DESCONSIDERAR))]
+            # Combinações válidas de motorista e tipo
+            df_clean = contagens.dropna(subset=["MOTORISTA", "TIPO"])
+            df_clean = df_clean[~df_clean["TIPO"].isin(TIPOS_DESCONSIDERAR)]
             
             if df_clean.empty:
                 self._criar_grafico_vazio(ax4, "TIPOS POR MOTORISTA - SEM DADOS", 
                                         "Sem dados válidos")
                 return
             
-            # Pegar top 7 motoristas
-            top_motoristas = df_clean.groupby("MOTORISTA").size().sort_values(ascending=False).head(TOP_MOTORISTAS).index
+            # Top motoristas do motor de ranking (mesmos do painel de motoristas)
+            top_motoristas = ranking["global"]["MOTORISTA"]
             df_top = df_clean[df_clean["MOTORISTA"].isin(top_motoristas)]
             
             # Contar tipos por motorista
-            tipo_motorista = df_top.groupby(["MOTORISTA", "TIPO"]).size().unstack(fill_value=0)
+            tipo_motorista = df_top.groupby(["MOTORISTA", "TIPO"])["QUANTIDADE"].sum().unstack(fill_value=0)
             
             if tipo_motorista.empty:
                 self._criar_grafico_vazio(ax4, "TIPOS POR MOTORISTA - SEM DADOS", 
@@ -674,6 +692,149 @@ class ChartGenerator:
             self._criar_grafico_vazio(ax4, "TIPOS POR MOTORISTA - ERRO", 
                                     f"Erro no processamento: {str(e)}")
     
+    def _criar_grafico_anomalias(self, fig, ax, anomalias: Optional[pd.DataFrame], limite: int = 15):
+        """Cria o ranking das anomalias (dia de pico de um motorista/veículo) por escore"""
+        try:
+            if anomalias is None or anomalias.empty:
+                self._criar_grafico_vazio(ax, "ANOMALIAS - SEM PICOS", 
+                                        "Nenhuma série com pico acima do limiar")
+                return
+            
+            df_plot = anomalias.head(limite).iloc[::-1].reset_index(drop=True)
+            rotulos = [f"{str(entidade)[:20]} · {data:%d/%m/%Y}"
+                       for entidade, data in zip(df_plot["ENTIDADE"], df_plot["DATA"])]
+            cores = ['#dc2626' if dimensao == "MOTORISTA" else '#f59e0b' for dimensao in df_plot["DIMENSAO"]]
+            
+            ax.barh(range(len(df_plot)), df_plot["ESCORE"], height=0.5, color=cores, 
+                    edgecolor='white', linewidth=2)
+            ax.set_yticks(range(len(df_plot)))
+            ax.set_yticklabels(rotulos, fontsize=9)
+            
+            ax.set_title(f'🚨 TOP {len(df_plot)} ANOMALIAS DE MOTORISTAS E VEÍCULOS', 
+                        fontsize=16, fontweight='bold', pad=25, color='black')
+            ax.set_xlabel('Escore (desvios acima do esperado)', fontsize=12, fontweight='bold', 
+                          color='black', labelpad=8)
+            
+            # Observado x esperado ao lado de cada barra
+            deslocamento = df_plot["ESCORE"].max() * 0.02
+            for i, linha in df_plot.iterrows():
+                ax.text(linha["ESCORE"] + deslocamento, i, 
+                       f'{linha["QUANTIDADE"]} alertas (esperado {linha["ESPERADO"]:.1f})', 
+                       ha='left', va='center', fontsize=9, fontweight='bold', color='#1e40af')
+            
+            ax.grid(axis="x", linestyle="--", alpha=0.25, color='#e2e8f0', linewidth=1)
+            ax.set_axisbelow(True)
+            ax.set_facecolor('#fefefe')
+            ax.spines['top'].set_visible(False)
+            ax.spines['right'].set_visible(False)
+            ax.spines['left'].set_color('#cbd5e1')
+            ax.spines['bottom'].set_color('#cbd5e1')
+            
+            legenda = [Rectangle((0, 0), 1, 1, color='#dc2626'), Rectangle((0, 0), 1, 1, color='#f59e0b')]
+            ax.legend(legenda, ['Motorista', 'Veículo (prefixo)'], bbox_to_anchor=(1.02, 1), 
+                      loc='upper left', fontsize=10, frameon=True)
+        
+        except Exception as e:
+            print(f"⚠️ Erro no gráfico de anomalias: {e}")
+            self._criar_grafico_vazio(ax, "ANOMALIAS - ERRO", 
+                                    f"Erro no processamento: {str(e)}")
+    
+    def _desenhar_mapa_horario(self, ax, matriz: np.ndarray, titulo: str, rotulos: bool = True):
+        """Mapa de calor de uma matriz 7 (dias da semana) × 24 (horas)"""
+        imagem = ax.imshow(matriz, aspect='auto', cmap='YlOrRd', interpolation='nearest')
+        ax.set_title(titulo, fontsize=12 if rotulos else 10, fontweight='bold', color='black', pad=8)
+        ax.set_yticks(range(7))
+        ax.set_yticklabels(DIAS_SEMANA_PT if rotulos else [d[0] for d in DIAS_SEMANA_PT], fontsize=8)
+        ax.set_xticks(range(0, 24, 3 if rotulos else 6))
+        ax.tick_params(axis='x', labelsize=8, colors='black')
+        ax.grid(False)
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+        return imagem
+    
+    def _criar_grafico_horario(self, fig, ax, horario: Optional[pd.DataFrame]):
+        """Cria o mapa de calor hora × dia da semana: geral em cima e um por PA embaixo"""
+        try:
+            if horario is None or horario.empty:
+                self._criar_grafico_vazio(ax, "ALERTAS POR HORÁRIO - SEM HORÁRIO", 
+                                        "A coluna de data não traz a hora do alerta")
+                return
+            
+            ax.axis('off')
+            ax.set_title('🕒 ALERTAS POR HORA DO DIA E DIA DA SEMANA', 
+                        fontsize=16, fontweight='bold', pad=25, color='black')
+            
+            # Linhas = dia da semana, colunas = hora (baldes hora*7 + dia)
+            def matriz(df):
+                valores = df.groupby(["HORA", "DIA_SEMANA"])["QUANTIDADE"].sum()
+                return valores.reindex(pd.MultiIndex.from_product([range(24), range(7)]),
+                                       fill_value=0).to_numpy().reshape(24, 7).T
+            
+            ax_geral = ax.inset_axes([0.0, 0.45, 0.92, 0.55])
+            imagem = self._desenhar_mapa_horario(ax_geral, matriz(horario), 'Todos os PAs')
+            ax_geral.set_xlabel('Hora do dia', fontsize=10, fontweight='bold', color='black')
+            fig.colorbar(imagem, ax=ax_geral, fraction=0.03, pad=0.01)
+            
+            pas = [pa for pa in horario["PA"].dropna().unique()
+                   if horario.loc[horario["PA"] == pa, "QUANTIDADE"].sum() > 0]
+            largura = 0.92 / max(len(pas), 1)
+            for i, pa in enumerate(pas):
+                ax_pa = ax.inset_axes([i * largura, 0.0, largura * 0.85, 0.30])
+                self._desenhar_mapa_horario(ax_pa, matriz(horario[horario["PA"] == pa]), pa, rotulos=False)
+        
+        except Exception as e:
+            print(f"⚠️ Erro no mapa de horários: {e}")
+            self._criar_grafico_vazio(ax, "ALERTAS POR HORÁRIO - ERRO", 
+                                    f"Erro no processamento: {str(e)}")
+    
+    def _criar_grafico_hotspots(self, fig, ax, hotspots: Optional[pd.DataFrame], destaques: int = 10,
+                                max_bins: int = 200):
+        """Cria o mapa de densidade dos alertas com os pontos críticos numerados"""
+        try:
+            if hotspots is None or hotspots.empty:
+                self._criar_grafico_vazio(ax, "PONTOS CRÍTICOS - SEM COORDENADAS", 
+                                        "Arquivo sem LATITUDE/LONGITUDE válidas")
+                return
+            
+            # Células já agregadas voltam para uma grade de exibição (no máximo max_bins por eixo)
+            celulas = hotspots.groupby(["LATITUDE", "LONGITUDE"])["QUANTIDADE"].sum().reset_index()
+            resolucao = HOTSPOT_RESOLUCAO
+            bins = [int(min(max((celulas[col].max() - celulas[col].min()) / resolucao + 1, 1), max_bins))
+                    for col in ("LONGITUDE", "LATITUDE")]
+            densidade, bordas_lon, bordas_lat = np.histogram2d(
+                celulas["LONGITUDE"], celulas["LATITUDE"], bins=bins, weights=celulas["QUANTIDADE"])
+            densidade = np.ma.masked_equal(densidade.T, 0)
+            
+            imagem = ax.imshow(densidade, origin='lower', aspect='auto', cmap='inferno_r',
+                               norm=LogNorm(vmin=1, vmax=max(densidade.max(), 1)),
+                               extent=[bordas_lon[0], bordas_lon[-1], bordas_lat[0], bordas_lat[-1]])
+            fig.colorbar(imagem, ax=ax, fraction=0.03, pad=0.01, label='Alertas')
+            
+            # Pontos críticos: células com mais alertas, com o PA e o tipo predominantes
+            top = celulas.nlargest(destaques, "QUANTIDADE")
+            for i, (_, celula) in enumerate(top.iterrows(), start=1):
+                grupo = hotspots[(hotspots["LATITUDE"] == celula["LATITUDE"]) &
+                                 (hotspots["LONGITUDE"] == celula["LONGITUDE"])]
+                dominante = grupo.loc[grupo["QUANTIDADE"].idxmax()]
+                tipo = dominante["TIPO"] if pd.notna(dominante["TIPO"]) else "-"
+                ax.annotate(f'{i}. {dominante["PA"]} · {tipo} ({int(celula["QUANTIDADE"])})',
+                            (celula["LONGITUDE"], celula["LATITUDE"]), xytext=(8, 8),
+                            textcoords='offset points', fontsize=9, fontweight='bold', color='#1e40af',
+                            bbox=dict(boxstyle="round,pad=0.3", facecolor='white', 
+                                     edgecolor='#1e40af', alpha=0.9, linewidth=1))
+            
+            ax.set_title('📍 PONTOS CRÍTICOS DE ALERTAS', 
+                        fontsize=16, fontweight='bold', pad=25, color='black')
+            ax.set_xlabel('Longitude', fontsize=12, fontweight='bold', color='black', labelpad=8)
+            ax.set_ylabel('Latitude', fontsize=12, fontweight='bold', color='black', labelpad=8)
+            ax.grid(False)
+            ax.tick_params(axis='both', labelsize=9, colors='black')
+        
+        except Exception as e:
+            print(f"⚠️ Erro no mapa de pontos críticos: {e}")
+            self._criar_grafico_vazio(ax, "PONTOS CRÍTICOS - ERRO", 
+                                    f"Erro no processamento: {str(e)}")
+    
     def _criar_grafico_vazio(self, ax, titulo: str, mensagem: str):
         """Cria um gráfico vazio com mensagem ultra profissional"""
         ax.text(0.5, 0.5, mensagem, 
@@ -690,92 +851,433 @@ class ChartGenerator:
         ax.set_xticks([])
         ax.set_yticks([])
     
-    def gerar_graficos(self, arquivos_filtrados: List[str]) -> Optional[str]:
+    def gerar_graficos(self, arquivos_filtrados: List[str], agregados: Optional[dict] = None,
+                       pasta_saida: Optional[str] = None, abrir: bool = True,
+                       forcar: bool = False) -> Optional[str]:
         """
         Gera gráficos de análise dos dados ultra profissionais com análise temporal
         
         Args:
             arquivos_filtrados: Lista de caminhos dos arquivos Excel filtrados
+            agregados: Agregados já calculados pelo backend (evita reler os arquivos)
+            pasta_saida: Pasta do relatório (padrão: Downloads do usuário)
+            abrir: Abre o relatório no visualizador do sistema ao final
+            forcar: Redesenha mesmo se o relatório dos mesmos agregados já existe
             
         Returns:
             Caminho do arquivo de gráfico gerado ou None se houver erro
         """
         try:
-            # Concatenar todos os DataFrames
-            df_list = []
-            for path in arquivos_filtrados:
-                try:
-                    df_temp = pd.read_excel(path)
-                    df_list.append(df_temp)
-                except Exception as e:
-                    print(f"⚠️ Erro ao ler {os.path.basename(path)}: {e}")
-                    continue
+            if agregados is None:
+                agregados = self._agregar_arquivos(arquivos_filtrados)
+                if agregados is None:
+                    return None
             
-            if not df_list:
-                print("❌ Nenhum arquivo válido encontrado para gerar gráficos")
-                return None
-                
-            df_geral = pd.concat(df_list, ignore_index=True)
-            print(f"📊 Dados carregados para gráficos: {len(df_geral)} registros")
+            with self._lock_renderizacao:
+                return self._gerar_relatorio(agregados, pasta_saida, abrir, forcar)
             
-            if df_geral.empty:
-                print("❌ Nenhum dado válido encontrado")
-                return None
+        except Exception as e:
+            print(f"❌ Erro geral ao gerar gráficos: {e}")
+            return None
+    
+    def gerar_graficos_do_arquivo(self, filepath: str, pasta_saida: Optional[str] = None,
+                                  abrir: bool = True, forcar: bool = False, filtro=None) -> Optional[str]:
+        """
+        Gera os gráficos agregando direto sobre o arquivo de origem com DuckDB
+        
+        Args:
+            filepath: Caminho do CSV exportado (ou de um cache .parquet)
+            pasta_saida: Pasta do relatório (padrão: Downloads do usuário)
+            abrir: Abre o relatório no visualizador do sistema ao final
+            forcar: Redesenha mesmo se o relatório dos mesmos agregados já existe
+            filtro: Filtro da execução (padrão: o da configuração)
             
-            # Configurar figura ultra profissional com 5 gráficos
-            fig = plt.figure(figsize=(24, 20), facecolor='white')
+        Returns:
+            Caminho do arquivo de gráfico gerado ou None se houver erro
+        """
+        try:
+            agregados = DuckDBAggregator().agregar_arquivo(filepath, filtro)
+            with self._lock_renderizacao:
+                return self._gerar_relatorio(agregados, pasta_saida, abrir, forcar)
             
-            # Layout ultra profissional com espaçamento para 5 gráficos
-            gs = fig.add_gridspec(4, 2, height_ratios=[0.4, 1.8, 1.8, 2.0], width_ratios=[1, 1], 
-                                hspace=0.5, wspace=0.4, 
-                                left=0.06, right=0.82, top=0.94, bottom=0.06)
+        except Exception as e:
+            print(f"❌ Erro geral ao gerar gráficos com DuckDB: {e}")
+            return None
+    
+    def gerar_previa(self, filepath: str, pasta_saida: Optional[str] = None) -> Optional[str]:
+        """
+        Gera uma prévia em baixa resolução a partir de uma única leitura amostrada
+        
+        Args:
+            filepath: Caminho do CSV exportado
+            pasta_saida: Pasta da prévia (padrão: Downloads do usuário)
             
-            data_atual = datetime.now()
+        Returns:
+            Caminho do PNG da prévia ou None se houver erro
+        """
+        try:
+            agregados = AmostradorPrevia().coletar(filepath)
+            previa = agregados["previa"]
+            aviso = (f"PRÉVIA · amostra de {previa['amostra']:,} de {previa['registros']:,} registros "
+                     f"(PA/TIPO exatos, motoristas e datas estimados)").replace(",", ".")
+            with self._lock_renderizacao:
+                return self._renderizar_relatorio(agregados, pasta_saida, abrir=False, dpi=PREVIA_DPI,
+                                                  nome_arquivo="previa_relatorio_alertas.png", aviso=aviso)
             
-            # Header ultra profissional com estatísticas como subtítulo
-            ax_header = fig.add_subplot(gs[0, :])
-            self._criar_header_com_subtitulo_estatisticas(fig, ax_header, df_geral, data_atual)
+        except Exception as e:
+            print(f"❌ Erro ao gerar prévia: {e}")
+            return None
+    
+    def _agregar_arquivos(self, arquivos_filtrados: List[str]) -> Optional[dict]:
+        """Relê os arquivos Excel filtrados e calcula os agregados com o backend pandas"""
+        # Concatenar todos os DataFrames
+        df_list = []
+        for path in arquivos_filtrados:
+            try:
+                # Workbook único: uma aba por PA, ignorando a aba de resumo
+                abas = pd.read_excel(path, sheet_name=None)
+                df_list.extend(df_temp for nome, df_temp in abas.items() if nome != ABA_RESUMO)
+            except Exception as e:
+                print(f"⚠️ Erro ao ler {os.path.basename(path)}: {e}")
+                continue
+        
+        if not df_list:
+            print("❌ Nenhum arquivo válido encontrado para gerar gráficos")
+            return None
             
-            # Gráfico 1: Distribuição por tipos (esquerda superior)
-            ax1 = fig.add_subplot(gs[1, 0])
-            self._criar_grafico_tipos_ultra_profissional(fig, ax1, df_geral)
+        df_geral = pd.concat(df_list, ignore_index=True)
+        print(f"📊 Dados carregados para gráficos: {len(df_geral)} registros")
+        
+        if df_geral.empty:
+            print("❌ Nenhum dado válido encontrado")
+            return None
+        
+        backend = PandasBackend()
+        return backend.agregar([backend.normalizar(df_geral)])
+    
+    def _gerar_relatorio(self, agregados: dict, pasta_saida: Optional[str], abrir: bool,
+                         forcar: bool = False) -> Optional[str]:
+        """
+        Gera o relatório nos formatos configurados; devolve o PNG ou, só com PDF, o PDF
+        
+        Um formato cujo arquivo já foi desenhado com a mesma impressão (agregados,
+        configuração do relatório e código) é reaproveitado, salvo com ``forcar``.
+        """
+        impressao = self._impressao_relatorio(agregados) if REAPROVEITAR_SAIDAS and not forcar else None
+        caminho = None
+        if self.formato in ("png", "ambos"):
+            caminho = self._gerar_formato(self._renderizar_relatorio, agregados, pasta_saida,
+                                          abrir and self.formato == "png",
+                                          "relatorio_alertas_com_analise_temporal.png", impressao)
+        if self.formato in ("pdf", "ambos"):
+            caminho_pdf = self._gerar_formato(self._renderizar_pdf, agregados, pasta_saida, abrir,
+                                              "relatorio_alertas_com_analise_temporal.pdf", impressao)
+            caminho = caminho or caminho_pdf
+        return caminho
+    
+    def _impressao_relatorio(self, agregados: dict) -> Optional[str]:
+        """Impressão do conteúdo do relatório; o esboço do ranking entra pelo ranking calculado"""
+        try:
+            conteudo = {nome: valor for nome, valor in agregados.items() if nome != "ranking"}
+            conteudo["ranking"] = ranking_motoristas(agregados, self.top_motoristas)
+            return resumir(impressao_agregados(conteudo), self.top_motoristas, valores_config(CONFIG_RELATORIO),
+                           versao_codigo(MODULOS_RELATORIO))
+        except Exception as e:
+            print(f"⚠️ Impressão do relatório indisponível ({e}): o relatório será redesenhado")
+            return None
+    
+    def _gerar_formato(self, renderizar, agregados: dict, pasta_saida: Optional[str], abrir: bool,
+                       nome_arquivo: str, impressao: Optional[str]) -> Optional[str]:
+        """Reaproveita o arquivo do formato se a impressão confere; senão desenha e registra"""
+        caminho_saida = self._caminho_saida(pasta_saida, nome_arquivo)
+        if impressao and saida_reaproveitavel(caminho_saida, impressao):
+            print(f"⏭️ Relatório inalterado, reaproveitando: {caminho_saida}")
+            if abrir:
+                self._abrir_arquivo(caminho_saida)
+            return caminho_saida
+        
+        caminho = renderizar(agregados, pasta_saida, abrir, nome_arquivo=nome_arquivo)
+        if caminho and impressao:
+            registrar_saida(caminho, impressao)
+        return caminho
+    
+    def _caminho_saida(self, pasta_saida: Optional[str], nome_arquivo: str) -> str:
+        # Salvar na pasta Downloads (ou na pasta pedida)
+        downloads_path = pasta_saida or os.path.join(os.path.expanduser("~"), "Downloads")
+        return os.path.join(downloads_path, nome_arquivo)
+    
+    def _renderizar_relatorio(self, agregados: dict, pasta_saida: Optional[str] = None,
+                              abrir: bool = True, dpi: int = 300,
+                              nome_arquivo: str = "relatorio_alertas_com_analise_temporal.png",
+                              aviso: Optional[str] = None) -> Optional[str]:
+        """
+        Desenha o cabeçalho e os cinco painéis (mais os adicionais com dados) e salva o PNG
+        
+        Args:
+            agregados: Dict com ``contagens`` e ``temporal`` (ver ``backends``)
+            pasta_saida: Pasta do relatório (padrão: Downloads do usuário)
+            abrir: Abre o relatório no visualizador do sistema ao final
+            dpi: Resolução do PNG (a prévia usa uma resolução baixa)
+            nome_arquivo: Nome do PNG gerado
+            aviso: Faixa de texto no topo da figura (ex.: identificação da prévia)
             
+        Returns:
+            Caminho do arquivo de gráfico gerado ou None se não houver dados
+        """
+        contagens = agregados["contagens"]
+        if contagens.empty:
+            print("❌ Nenhum dado válido encontrado")
+            return None
+        
+        data_atual = datetime.now()
+        
+        # Ranking de motoristas compartilhado pelos gráficos 3 e 4
+        ranking = ranking_motoristas(agregados, self.top_motoristas)
+        
+        caminho_saida = self._caminho_saida(pasta_saida, nome_arquivo)
+        
+        # Desenha num temporário: um relatório interrompido nunca fica com o nome final
+        temporario = caminho_temporario(caminho_saida)
+        workers = min(RENDERIZACAO_WORKERS or len(layout_relatorio(agregados)[0]), os.cpu_count() or 1)
+        renderizado = False
+        if self.paralelo and aviso is None and workers > 1:
+            try:
+                self._renderizar_em_paralelo(agregados, ranking, data_atual, temporario, dpi, workers)
+                renderizado = True
+            except Exception as e:
+                print(f"⚠️ Renderização paralela falhou ({e}), desenhando em uma única figura")
+        
+        if not renderizado:
+            self._renderizar_figura_unica(agregados, ranking, data_atual, temporario, dpi, aviso)
+        publicar(temporario, caminho_saida)
+        
+        print(f"✅ Gráficos ultra profissionais com análise temporal salvos em: {caminho_saida}")
+        
+        if abrir:
+            self._abrir_arquivo(caminho_saida)
+        
+        return caminho_saida
+    
+    def _criar_figura(self, linhas_extras: int = 0):
+        """
+        Figura e grade do relatório (a mesma para a renderização única e a paralela)
+        
+        ``linhas_extras`` acrescenta linhas para os painéis adicionais
+        (ver ``layout_relatorio``), com a figura crescendo na mesma proporção.
+        """
+        alturas = [0.4, 1.8, 1.8, 2.0] + [ALTURA_LINHA_FIGURA] * linhas_extras
+        
+        # Configurar figura ultra profissional com 5 gráficos (mais os adicionais)
+        fig = plt.figure(figsize=(24, 20 * sum(alturas) / 6.0), facecolor='white')
+        
+        # Layout ultra profissional com espaçamento para 5 gráficos
+        gs = fig.add_gridspec(len(alturas), 2, height_ratios=alturas, width_ratios=[1, 1], 
+                            hspace=0.5, wspace=0.4, 
+                            left=0.06, right=0.82, top=0.94, bottom=0.06)
+        
+        return fig, gs
+    
+    def _desenhar_painel(self, fig, celula, painel: str, agregados: dict, ranking: Optional[dict],
+                         data_atual: datetime):
+        """Desenha um painel do relatório na célula da grade indicada e devolve o eixo"""
+        contagens = agregados["contagens"]
+        ax = fig.add_subplot(celula)
+        
+        if painel == "header":
+            # Header ultra profissional com estatísticas como subtítulo
+            self._criar_header_com_subtitulo_estatisticas(fig, ax, agregados, data_atual)
+        elif painel == "tipos":
+            # Gráfico 1: Distribuição por tipos (esquerda superior)
+            self._criar_grafico_tipos_ultra_profissional(fig, ax, contagens)
+        elif painel == "pizza":
             # Gráfico 2: Pizza por PA (direita superior)
-            ax2 = fig.add_subplot(gs[1, 1])
-            self._criar_grafico_pizza_ultra_profissional(fig, ax2, df_geral)
-            
+            self._criar_grafico_pizza_ultra_profissional(fig, ax, contagens)
+        elif painel == "motoristas":
             # Gráfico 3: Top motoristas (esquerda meio)
-            ax3 = fig.add_subplot(gs[2, 0])
-            self._criar_grafico_motoristas_ultra_profissional(fig, ax3, df_geral)
-            
+            self._criar_grafico_motoristas_ultra_profissional(fig, ax, ranking)
+        elif painel == "tipos_motoristas":
             # Gráfico 4: Tipos por motorista (direita meio)
-            ax4 = fig.add_subplot(gs[2, 1])
-            self._criar_grafico_tipos_motoristas_ultra_profissional(fig, ax4, df_geral)
-            
+            self._criar_grafico_tipos_motoristas_ultra_profissional(fig, ax, contagens, ranking)
+        elif painel == "temporal":
             # NOVO GRÁFICO 5: Análise temporal (parte inferior - ocupando toda a largura)
-            ax5 = fig.add_subplot(gs[3, :])
-            self._criar_grafico_temporal_ultra_profissional(fig, ax5, df_geral)
-            
-            # Salvar na pasta Downloads
-            downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
-            caminho_saida = os.path.join(downloads_path, "relatorio_alertas_com_analise_temporal.png")
-            
-            # Salvar com qualidade ultra alta
-            plt.savefig(caminho_saida, 
-                       dpi=300, 
-                       bbox_inches='tight', 
-                       facecolor='white', 
-                       edgecolor='none', 
-                       format='png',
-                       pad_inches=0.3)
-            plt.close()
-            
-            print(f"✅ Gráficos ultra profissionais com análise temporal salvos em: {caminho_saida}")
-            
+            self._criar_grafico_temporal_ultra_profissional(fig, ax, agregados["temporal"])
+        elif painel == "anomalias":
+            self._criar_grafico_anomalias(fig, ax, agregados.get("anomalias"))
+        elif painel == "horario":
+            self._criar_grafico_horario(fig, ax, agregados.get("horario"))
+        elif painel == "hotspots":
+            self._criar_grafico_hotspots(fig, ax, agregados.get("hotspots"))
+        return ax
+    
+    def _renderizar_figura_unica(self, agregados: dict, ranking: Optional[dict], data_atual: datetime,
+                                 caminho_saida: str, dpi: int, aviso: Optional[str]):
+        """Desenha todos os painéis em uma só figura, em sequência"""
+        celulas, linhas_extras = layout_relatorio(agregados)
+        fig, gs = self._criar_figura(linhas_extras)
+        for painel, celula in celulas.items():
+            self._desenhar_painel(fig, gs[celula], painel, agregados, ranking, data_atual)
+        
+        if aviso:
+            fig.text(0.5, 0.985, aviso, ha='center', va='top', fontsize=14, fontweight='bold',
+                     color='#b45309', bbox=dict(boxstyle="round,pad=0.4", facecolor='#fef3c7',
+                                                edgecolor='#f59e0b', linewidth=1.5))
+        
+        # Salvar com qualidade ultra alta
+        fig.savefig(caminho_saida, 
+                   dpi=dpi, 
+                   bbox_inches='tight', 
+                   facecolor='white', 
+                   edgecolor='none', 
+                   format='png',
+                   pad_inches=MARGEM_RELATORIO)
+        plt.close(fig)
+    
+    def _renderizar_em_paralelo(self, agregados: dict, ranking: Optional[dict], data_atual: datetime,
+                                caminho_saida: str, dpi: int, workers: int):
+        """
+        Desenha cada painel em um processo e monta o PNG final
+        
+        Cada processo recria a figura com a mesma grade, desenha só o seu painel
+        e salva apenas a área ocupada por ele (fundo transparente). Os recortes
+        são colados na posição original, e a área total reproduz o
+        ``bbox_inches='tight'`` da figura única.
+        """
+        celulas, linhas_extras = layout_relatorio(agregados)
+        # Só o que os painéis usam vai para os processos (o cubo diário do histórico fica)
+        agregados = {nome: agregados[nome] for nome in ("contagens", "temporal", *PAINEIS_ADICIONAIS_FIGURA)
+                     if agregados.get(nome) is not None}
+        args = (agregados, ranking, self.top_motoristas, dpi, data_atual, linhas_extras)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_renderizar_painel, painel, celula, *args) for painel, celula in celulas.items()]
+            recortes = [future.result() for future in futures]
+        
+        # União das áreas ocupadas (polegadas, origem no canto inferior esquerdo)
+        x0 = min(regiao[0] for _, regiao in recortes) - MARGEM_RELATORIO
+        y0 = min(regiao[1] for _, regiao in recortes) - MARGEM_RELATORIO
+        x1 = max(regiao[2] for _, regiao in recortes) + MARGEM_RELATORIO
+        y1 = max(regiao[3] for _, regiao in recortes) + MARGEM_RELATORIO
+        
+        tamanho = (int(round((x1 - x0) * dpi)), int(round((y1 - y0) * dpi)))
+        imagem = Image.new("RGBA", tamanho, (255, 255, 255, 255))
+        for png, regiao in recortes:
+            with Image.open(io.BytesIO(png)) as recorte:
+                destino = (max(int(round((regiao[0] - x0) * dpi)), 0),
+                           max(int(round((y1 - regiao[3]) * dpi)), 0))
+                imagem.alpha_composite(recorte.convert("RGBA"), dest=destino)
+        imagem.convert("RGB").save(caminho_saida, format="PNG", dpi=(dpi, dpi))
+    
+    def _renderizar_pdf(self, agregados: dict, pasta_saida: Optional[str] = None, abrir: bool = True,
+                        nome_arquivo: str = "relatorio_alertas_com_analise_temporal.pdf") -> Optional[str]:
+        """
+        Gera o relatório em PDF vetorial com várias páginas
+        
+        Páginas: visão geral (mesmo layout do PNG), um painel por página e uma
+        página por PA. Cada página é gravada assim que fica pronta e a figura é
+        fechada em seguida, então a memória não cresce com o número de páginas.
+        
+        Returns:
+            Caminho do PDF gerado ou None se não houver dados
+        """
+        contagens = agregados["contagens"]
+        if contagens.empty:
+            print("❌ Nenhum dado válido encontrado")
+            return None
+        
+        data_atual = datetime.now()
+        ranking = ranking_motoristas(agregados, self.top_motoristas)
+        
+        caminho_saida = self._caminho_saida(pasta_saida, nome_arquivo)
+        metadados = {"Title": "Relatório Executivo de Análise de Alertas", "CreationDate": data_atual}
+        
+        paginas = 0
+        temporario = caminho_temporario(caminho_saida)
+        with plt.rc_context(PDF_CONFIG), PdfPages(temporario, metadata=metadados) as pdf:
+            # Visão geral
+            celulas, linhas_extras = layout_relatorio(agregados)
+            fig, gs = self._criar_figura(linhas_extras)
+            for painel, celula in celulas.items():
+                self._desenhar_painel(fig, gs[celula], painel, agregados, ranking, data_atual)
+            self._salvar_pagina_pdf(pdf, fig)
+            paginas += 1
+            
+            # Um painel por página, em tamanho legível
+            for painel in [*PAINEIS_RELATORIO, *PAINEIS_ADICIONAIS]:
+                if painel == "header" or (painel in PAINEIS_ADICIONAIS and agregados.get(painel) is None):
+                    continue
+                fig = plt.figure(figsize=PDF_TAMANHO_PAGINA, facecolor='white')
+                gs = fig.add_gridspec(1, 1, left=0.08, right=0.80, top=0.88, bottom=0.12)
+                self._desenhar_painel(fig, gs[0, 0], painel, agregados, ranking, data_atual)
+                self._salvar_pagina_pdf(pdf, fig)
+                paginas += 1
+            
+            # Uma página por PA
+            for pa in contagens["PA"].dropna().unique():
+                agregados_pa = self.agregados_do_pa(agregados, pa)
+                ranking_pa = ranking_motoristas(agregados_pa, self.top_motoristas)
+                fig, gs = self._criar_figura()
+                for painel, celula in PAINEIS_PAGINA_PA.items():
+                    ax = self._desenhar_painel(fig, gs[celula], painel, agregados_pa, ranking_pa, data_atual)
+                    if painel == "header":
+                        ax.text(0.5, 0.0, f'POSTO {pa}', ha='center', va='center', fontsize=18,
+                                fontweight='bold', color=CORES_PA.get(pa, '#1f538d'),
+                                transform=ax.transAxes)
+                self._salvar_pagina_pdf(pdf, fig)
+                paginas += 1
+        
+        publicar(temporario, caminho_saida)
+        print(f"✅ Relatório PDF com {paginas} páginas salvo em: {caminho_saida}")
+        
+        if abrir:
             self._abrir_arquivo(caminho_saida)
-            
-            return caminho_saida
-            
-        except Exception as e:
-            print(f"❌ Erro geral ao gerar gráficos: {e}")
-            return None  ###
\ No newline at end of file
+        
+        return caminho_saida
+    
+    def agregados_do_pa(self, agregados: dict, pa: str) -> dict:
+        """Contagens e temporal de um único PA (páginas e abas por PA)"""
+        contagens = agregados["contagens"]
+        temporal = agregados["temporal"]
+        return {
+            "contagens": contagens[contagens["PA"] == pa],
+            "temporal": temporal[temporal["PA"] == pa],
+        }
+    
+    def _salvar_pagina_pdf(self, pdf, fig):
+        """Rasteriza só os artistas densos, grava a página e libera a figura"""
+        for ax in fig.axes:
+            for linha in ax.get_lines():
+                if len(linha.get_xdata()) > PDF_LIMITE_VETORIAL:
+                    linha.set_rasterized(True)
+            for colecao in ax.collections:
+                if len(colecao.get_offsets()) > PDF_LIMITE_VETORIAL:
+                    colecao.set_rasterized(True)
+            if len(ax.patches) > PDF_LIMITE_VETORIAL:
+                for patch in ax.patches:
+                    patch.set_rasterized(True)
+        
+        pdf.savefig(fig, dpi=PDF_DPI_RASTER, facecolor='white', edgecolor='none',
+                    bbox_inches='tight', pad_inches=MARGEM_RELATORIO)
+        plt.close(fig)
+
+
+def _renderizar_painel(painel: str, celula: tuple, agregados: dict, ranking: Optional[dict],
+                       top_motoristas: int, dpi: int, data_atual: datetime, linhas_extras: int = 0):
+    """
+    Executado no processo de renderização: desenha um painel e recorta a área dele
+    
+    Returns:
+        Tupla (PNG com fundo transparente, região (x0, y0, x1, y1) em polegadas na figura)
+    """
+    gerador = ChartGenerator(top_motoristas, paralelo=False)
+    fig, gs = gerador._criar_figura(linhas_extras)
+    gerador._desenhar_painel(fig, gs[celula], painel, agregados, ranking, data_atual)
+    
+    # Mesma área que o bbox_inches='tight' consideraria para este painel (título, legenda, rótulos
+    # e eixos criados por ele, como a barra de cores, que fica fora do eixo principal)
+    renderer = fig.canvas.get_renderer()
+    regiao = Bbox.union([eixo.get_tightbbox(renderer) for eixo in fig.axes if eixo.get_visible()])
+    regiao = regiao.transformed(fig.dpi_scale_trans.inverted())
+    buffer = io.BytesIO()
+    fig.savefig(buffer, dpi=dpi, bbox_inches=regiao, pad_inches=0, facecolor=(1, 1, 1, 0),
+                edgecolor='none', format='png')
+    plt.close(fig)
+    return buffer.getvalue(), tuple(regiao.extents)
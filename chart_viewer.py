@@ -0,0 +1,206 @@
+"""
+Módulo do visualizador embutido: painéis do relatório desenhados sob demanda na resolução da tela
+"""
+
+import multiprocessing
+import os
+import threading
+import tkinter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+import customtkinter as ctk
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+from config import VISUALIZADOR_TAMANHO
+from chart_generator import ChartGenerator, PAINEIS_RELATORIO, PAINEIS_ADICIONAIS
+from driver_ranking import ranking_motoristas
+from styles import CORES_PA
+
+# Nome da aba de cada painel (o cabeçalho vira a barra superior da janela)
+TITULOS_PAINEIS = {
+    "tipos": "Tipos por PA",
+    "pizza": "Distribuição",
+    "motoristas": "Motoristas",
+    "tipos_motoristas": "Tipos × Motoristas",
+    "temporal": "Temporal",
+    "anomalias": "Anomalias",
+    "horario": "Horários",
+    "hotspots": "Pontos Críticos",
+}
+
+# Aba de um PA: grade 2 × 2 (linha, coluna)
+PAINEIS_ABA_PA = {
+    "tipos": (0, 0),
+    "motoristas": (0, 1),
+    "tipos_motoristas": (1, 0),
+    "temporal": (1, 1),
+}
+
+
+def _exportar_em_processo(top_motoristas: int, paralelo: bool, formato: str, agregados: dict) -> Optional[str]:
+    """Relatório completo num processo à parte: o pyplot dele não divide estado com as abas do Tk"""
+    gerador = ChartGenerator(top_motoristas=top_motoristas, paralelo=paralelo, formato=formato)
+    return gerador.gerar_graficos([], agregados=agregados, abrir=False)
+
+
+class VisualizadorGraficos(ctk.CTkToplevel):
+    """
+    Classe responsável pela janela de visualização do relatório dentro do app
+
+    Uma aba por painel e uma por PA. Cada aba só é desenhada na primeira vez
+    que é aberta, numa figura do tamanho da aba e no DPI da tela, a partir
+    dos agregados já calculados (nada é relido). A barra do matplotlib dá
+    zoom e deslocamento; o relatório em alta resolução para impressão só é
+    gerado pelo botão de exportação.
+    """
+
+    def __init__(self, parent, agregados: dict, gerador: Optional[ChartGenerator] = None, titulo: str = ""):
+        super().__init__(parent)
+        self.agregados = agregados
+        self.gerador = gerador or ChartGenerator()
+        self.data_atual = datetime.now()
+        self.ranking = ranking_motoristas(agregados, self.gerador.top_motoristas)
+        self.dpi = self.winfo_fpixels("1i")
+        self._abas = {}
+        self._desenhadas = set()
+
+        self.title(f"Relatório · {titulo}" if titulo else "Relatório")
+        self.geometry(VISUALIZADOR_TAMANHO)
+        self.configure(fg_color="white")
+        self.protocol("WM_DELETE_WINDOW", self.fechar)
+
+        self._criar_barra_superior()
+
+        self.tabview = ctk.CTkTabview(self, fg_color="white", command=self._ao_trocar_aba)
+        self.tabview.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
+        for painel in PAINEIS_RELATORIO:
+            if painel != "header":
+                self._adicionar_aba(TITULOS_PAINEIS[painel], self._desenhar_painel, painel)
+        for painel in PAINEIS_ADICIONAIS:
+            if agregados.get(painel) is not None:
+                self._adicionar_aba(TITULOS_PAINEIS[painel], self._desenhar_painel, painel)
+        for pa in sorted(agregados["contagens"]["PA"].dropna().unique()):
+            self._adicionar_aba(str(pa), self._desenhar_pa, pa)
+
+        # Primeira aba só depois que a janela tem tamanho definido
+        self.after(100, self._ao_trocar_aba)
+
+    def _criar_barra_superior(self):
+        contagens = self.agregados["contagens"]
+        total = f"{int(contagens['QUANTIDADE'].sum()):,}".replace(",", ".")
+        pas = contagens["PA"].nunique()
+
+        barra = ctk.CTkFrame(self, fg_color="#f8f9fa", corner_radius=10)
+        barra.pack(fill="x", padx=10, pady=10)
+
+        resumo = ctk.CTkLabel(
+            barra,
+            text=f"📊 {total} alertas · {pas} PAs · {self.data_atual.strftime('%d/%m/%Y %H:%M')}",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            text_color="#1f538d"
+        )
+        resumo.pack(side="left", padx=15, pady=10)
+
+        self.export_button = ctk.CTkButton(
+            barra,
+            text="💾 Exportar Relatório",
+            command=self.exportar,
+            width=180,
+            fg_color="#198754",
+            hover_color="#157347"
+        )
+        self.export_button.pack(side="right", padx=15, pady=10)
+
+        self.status_label = ctk.CTkLabel(barra, text="", font=ctk.CTkFont(size=12), text_color="#6c757d")
+        self.status_label.pack(side="right", padx=10)
+
+    def _adicionar_aba(self, nome: str, desenhar, alvo):
+        self.tabview.add(nome)
+        self._abas[nome] = (desenhar, alvo)
+
+    def _ao_trocar_aba(self):
+        nome = self.tabview.get()
+        if not nome or nome in self._desenhadas:
+            return
+        self._desenhadas.add(nome)
+
+        frame = self.tabview.tab(nome)
+        frame.update_idletasks()
+        largura = max(frame.winfo_width(), 800)
+        altura = max(frame.winfo_height() - 40, 500)  # espaço da barra de navegação
+        fig = Figure(figsize=(largura / self.dpi, altura / self.dpi), dpi=self.dpi, facecolor="white")
+
+        desenhar, alvo = self._abas[nome]
+        try:
+            desenhar(fig, alvo)
+        except Exception as e:
+            print(f"⚠️ Erro ao desenhar a aba {nome}: {e}")
+            fig.clear()
+            fig.text(0.5, 0.5, f"Erro ao desenhar: {e}", ha="center", va="center", fontsize=12)
+
+        canvas = FigureCanvasTkAgg(fig, master=frame)
+        barra = NavigationToolbar2Tk(canvas, frame, pack_toolbar=False)
+        barra.update()
+        barra.pack(side="bottom", fill="x")
+        canvas.get_tk_widget().pack(fill="both", expand=True)
+        canvas.draw_idle()
+
+    def _desenhar_painel(self, fig: Figure, painel: str):
+        # Legendas ficam à direita do eixo, como nas páginas de painel do PDF
+        gs = fig.add_gridspec(1, 1, left=0.08, right=0.80, top=0.88, bottom=0.14)
+        self.gerador._desenhar_painel(fig, gs[0, 0], painel, self.agregados, self.ranking, self.data_atual)
+
+    def _desenhar_pa(self, fig: Figure, pa: str):
+        agregados_pa = self.gerador.agregados_do_pa(self.agregados, pa)
+        ranking_pa = ranking_motoristas(agregados_pa, self.gerador.top_motoristas)
+        gs = fig.add_gridspec(2, 2, hspace=0.6, wspace=0.5, left=0.07, right=0.86, top=0.9, bottom=0.1)
+        for painel, celula in PAINEIS_ABA_PA.items():
+            self.gerador._desenhar_painel(fig, gs[celula], painel, agregados_pa, ranking_pa, self.data_atual)
+        fig.suptitle(f"POSTO {pa}", fontsize=16, fontweight="bold", color=CORES_PA.get(pa, "#1f538d"))
+
+    def exportar(self):
+        """
+        Relatório em alta resolução (formatos da configuração), gerado em segundo plano
+
+        O ``gerar_graficos`` usa pyplot e ``rc_context``, que não são
+        thread-safe: numa thread ele disputaria com o desenho das abas no Tk.
+        Por isso roda num processo separado (spawn, sem herdar o Tk); a thread
+        só espera o resultado.
+        """
+        self.export_button.configure(state="disabled", text="⏳ Exportando...")
+        self.status_label.configure(text="")
+        argumentos = (self.gerador.top_motoristas, self.gerador.paralelo, self.gerador.formato, self.agregados)
+
+        def exportar_thread():
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    caminho = pool.submit(_exportar_em_processo, *argumentos).result()
+            except Exception as e:
+                print(f"❌ Erro na exportação: {e}")
+                caminho = None
+
+            def concluir():
+                if not self.winfo_exists():
+                    return
+                self.export_button.configure(state="normal", text="💾 Exportar Relatório")
+                if caminho:
+                    self.status_label.configure(text=f"✅ {os.path.basename(caminho)}", text_color="#198754")
+                else:
+                    self.status_label.configure(text="❌ Erro na exportação", text_color="#dc3545")
+            try:
+                self.after(0, concluir)
+            except tkinter.TclError:
+                pass  # Janela fechada durante a exportação; o arquivo foi gerado mesmo assim
+
+        thread = threading.Thread(target=exportar_thread)
+        thread.daemon = True
+        thread.start()
+
+    def fechar(self):
+        # As figuras não são do pyplot: basta destruir a janela para liberá-las
+        self._abas.clear()
+        self.destroy()
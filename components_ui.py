@@ -73,7 +73,7 @@ class UIComponents:
         
         secondary_label = ctk.CTkLabel(
             self.parent.upload_frame,
-            text="Formatos suportados: .csv",
+            text="Formatos suportados: .csv, .csv.gz, .csv.bz2, .csv.xz, .csv.zst, .zip",
             font=ctk.CTkFont(size=12),
             text_color="#6c757d"
         )
@@ -90,8 +90,22 @@ class UIComponents:
             fg_color="#0d6efd",
             hover_color="#0b5ed7"
         )
-        self.parent.select_button.pack(pady=(0, 30))
+        self.parent.select_button.pack(pady=(0, 10))
         self.parent.select_button.pack_propagate(False)
+        
+        self.parent.redo_button = ctk.CTkButton(
+            self.parent.upload_frame,
+            text="🔁 Refazer Relatório",
+            command=self.parent.refazer_relatorio,
+            width=200,
+            height=30,
+            corner_radius=15,
+            font=ctk.CTkFont(size=12),
+            fg_color="#6c757d",
+            hover_color="#5c636a",
+            state="disabled"
+        )
+        self.parent.redo_button.pack(pady=(0, 20))
     
     def create_progress_area(self):
         self.parent.progress_frame = ctk.CTkFrame(
@@ -28,16 +28,143 @@ COLUNAS_REMOVER = [
 # Adicionar configuração para tipos a serem desconsiderados
 TIPOS_DESCONSIDERAR = {"EXCESSO_RPM", "BOCEJO"}
 
+# Normalização feita uma única vez, logo após a leitura: remove espaços, vazios
+# viram nulos e códigos ficam em maiúsculas (colunas categóricas no pandas)
+COLUNAS_CODIGO = ["PREFIXO", "TIPO"]
+COLUNAS_TEXTO = ["MOTORISTA"]
+
 # Configurações de arquivo
 ENCODING_CSV = "latin1"
 PASTA_EXPORTADOS = "exportados"
 
+# Backend de processamento de DataFrames: "pandas", "polars" ou "auto" (a verificação prévia
+# escolhe o polars, se instalado, para arquivos grandes processados em memória)
+BACKEND_PADRAO = "auto"
+
+# Motor de agregação do relatório: "pandas" (agregados do processamento) ou
+# "duckdb" (SQL direto sobre o CSV, memória constante em arquivos grandes)
+MOTOR_RELATORIO = "pandas"
+DUCKDB_MEMORY_LIMIT = "2GB"
+
+# Modo de execução: "memoria" (lê tudo e exporta PA a PA), "pipeline"
+# (estágios em threads com filas limitadas, leitura em blocos) ou "auto"
+# (escolhido pela verificação prévia conforme o tamanho do arquivo e a RAM livre)
+MODO_EXECUCAO_PADRAO = "auto"
+PIPELINE_TAMANHO_CHUNK = 100_000  # linhas por bloco de leitura
+PIPELINE_FILA_MAXIMA = 4  # blocos em espera entre dois estágios
+PIPELINE_INTERVALO_AMOSTRAGEM = 0.05  # segundos entre amostras das filas
+PREFLIGHT_LINHAS_AMOSTRA = 5_000  # linhas lidas na verificação prévia
+PREFLIGHT_FRACAO_MEMORIA = 0.5  # parcela da RAM livre que o modo em memória pode ocupar
+PREFLIGHT_FATOR_MEMORIA = 3.0  # cópias do DataFrame vivas ao mesmo tempo no modo em memória
+PREFLIGHT_LINHAS_POLARS = 500_000  # a partir daqui o backend "auto" usa o polars no modo em memória
+
+# Exportação: "arquivos" (um XLSX por PA) ou "workbook_unico" (uma aba por PA). Os dois usam o
+# mesmo escritor em streaming; em benchmarks/bench_exportacao.py (300 mil linhas) tempo e tamanho
+# ficaram a menos de 3% um do outro nos dois modos de execução: a escolha é só de organização
+MODO_EXPORTACAO_PADRAO = "arquivos"
+INCLUIR_ABA_RESUMO = True  # aba de contagens no início do workbook único
+ABA_RESUMO = "RESUMO"
+LIMITE_LINHAS_ABA = 1_048_575  # linhas de dados por aba (máximo do XLSX, sem o cabeçalho)
+FRAGMENTACAO_EXCEL = "abas"  # partições acima do limite seguem em novas "abas" ou novos "arquivos"
+# Saídas com a mesma impressão digital (conteúdo da entrada + configuração + código) não são
+# refeitas: os nomes levam a impressão no lugar do carimbo de hora (--forcar refaz tudo)
+REAPROVEITAR_SAIDAS = True
+
+# Filtros da execução, aplicados já na leitura (bloco a bloco no pipeline, no predicado do
+# Polars e na consulta do DuckDB): valem igualmente para exportados, agregados e relatório.
+# None = sem filtro; listas aceitam valores separados por vírgula
+FILTRO_DATA_INICIO = None  # "AAAA-MM-DD", inclusivo
+FILTRO_DATA_FIM = None  # "AAAA-MM-DD", inclusivo
+FILTRO_ULTIMOS_DIAS = None  # sem data de início: hoje e os N - 1 dias anteriores
+FILTRO_TIPOS_INCLUIR = None  # só estes TIPOs
+FILTRO_TIPOS_EXCLUIR = None  # além de TIPOS_DESCONSIDERAR
+FILTRO_PREFIXOS = None  # só estes prefixos (dentro dos roteados em PREFIXOS)
+FILTRO_MOTORISTAS = None  # só estes motoristas
+
+# Deduplicação de alertas repetidos em exportações sobrepostas. Desligada por padrão: quando
+# ligada descarta linhas dos XLSX exportados, não só dos agregados
+DEDUPLICAR = False
+CHAVE_DEDUPLICACAO = ["PREFIXO", "TIPO", "DATA", "MOTORISTA"]  # colunas ausentes são ignoradas
+DEDUPLICAR_ENTRE_EXECUCOES = False  # consulta o índice de hashes das execuções anteriores (de outras entradas)
+ARQUIVO_INDICE_DEDUPLICACAO = "indice_deduplicacao.npz"  # gravado na pasta de exportados
+
+# Histórico local de contagens diárias (SQLite na pasta de exportados, atualizado a cada execução)
+HISTORICO_ATIVO = True
+ARQUIVO_HISTORICO = "historico_alertas.sqlite"
+JANELA_TEMPORAL_DIAS = 90  # painel temporal e tendências: últimos N dias do histórico (None = só a execução)
+
+# Detecção de anomalias nas séries diárias (entidade × dia) do cubo diário
+ANOMALIA_DIMENSOES = ["MOTORISTA", "PREFIXO"]
+ANOMALIA_METODO = "zscore"  # zscore (janela móvel) ou ewma
+ANOMALIA_JANELA_DIAS = 28  # dias anteriores usados como referência
+ANOMALIA_LIMIAR = 3.0  # escore mínimo para marcar o dia como anômalo
+ANOMALIA_MINIMO_ALERTAS = 3  # ignora picos com menos alertas que isso no dia
+ANOMALIA_HISTORICO_MINIMO = 7  # dias iniciais sem escore (referência curta demais)
+ANOMALIA_TOP = 50  # linhas da tabela de anomalias
+
+# Mapa de calor hora do dia × dia da semana (só quando a coluna de data traz horário)
+MAPA_HORARIO = True
+
+# Pontos críticos: LATITUDE/LONGITUDE ficam só para a agregação (os exportados continuam sem elas)
+HOTSPOTS_ATIVO = True  # sem LATITUDE/LONGITUDE no arquivo o painel simplesmente não aparece
+HOTSPOT_COLUNAS = ("LATITUDE", "LONGITUDE")
+HOTSPOT_RESOLUCAO = 0.01  # lado da célula em graus (~1,1 km)
+
+# Modo serviço HTTP local (python main.py --servico)
+SERVICO_HOST = "127.0.0.1"
+SERVICO_PORTA = 8765
+SERVICO_WORKERS = 2
+SERVICO_FILA_MAXIMA = 8  # jobs recebendo + na fila + em execução
+SERVICO_PASTA_JOBS = "servico_jobs"
+SERVICO_TAMANHO_BLOCO = 1 << 20  # 1 MiB por leitura/escrita de upload e download
+SERVICO_EXPIRACAO_JOBS = 3600  # segundos que um job finalizado (e seus arquivos) fica disponível
+
+# Modo observador de pastas (python main.py --observar PASTA [PASTA ...])
+OBSERVAR_WORKERS = 2
+OBSERVAR_INTERVALO = 2.0  # segundos entre varreduras (e entre checagens de estabilidade)
+OBSERVAR_ESTABILIDADE = 5.0  # segundos com tamanho/mtime parados antes de processar
+OBSERVAR_REGISTRO = "observador_registro.json"  # na pasta de exportados de cada pasta observada
+
+# Cache da sessão da interface: datasets lidos e agregados dos últimos arquivos, para refazer
+# o relatório com outras opções sem reler o arquivo (os usados há mais tempo saem primeiro)
+CACHE_SESSAO_LIMITE_MB = 2048
+
+# Visualizador embutido: após o processamento os painéis abrem numa janela do app, desenhados
+# sob demanda na resolução da tela (o relatório em alta resolução só é gerado pelo botão Exportar)
+VISUALIZADOR_EMBUTIDO = True
+VISUALIZADOR_TAMANHO = "1200x800"
+
 # Configurações de interface melhoradas
 WINDOW_TITLE = "🚛 Processador de Dados de Alertas - Sistema Avançado"
 WINDOW_SIZE = "800x600"
 
 # Configurações de gráficos
 TOP_MOTORISTAS = 7
+RANKING_CAPACIDADE_ESBOCO = 1000  # contadores do esboço Space-Saving (só para agregados sem o cubo de contagens)
+
+# Prévia rápida do relatório (amostra de reservatório + contagens exatas por PA/TIPO)
+PREVIA_AUTOMATICA = True  # mostra a prévia na interface enquanto o processamento completo roda
+PREVIA_TAMANHO_AMOSTRA = 20_000
+PREVIA_DPI = 40
+
+# Renderização do relatório: cada painel desenhado em um processo e montado na imagem final
+RENDERIZACAO_PARALELA = True
+RENDERIZACAO_WORKERS = None  # None = um por painel, limitado pelos núcleos da máquina
+
+# Formato do relatório: "png" (imagem única), "pdf" (vetorial, várias páginas) ou "ambos"
+FORMATO_RELATORIO = "png"
+PDF_TAMANHO_PAGINA = (16.54, 11.69)  # A3 paisagem, em polegadas (páginas de painel)
+PDF_DPI_RASTER = 200  # resolução só dos artistas densos, que viram imagem dentro do PDF
+PDF_LIMITE_VETORIAL = 2_000  # acima disso (pontos, barras, marcadores) o artista é rasterizado
+
+# Relatórios individuais em lote (python main.py --relatorios-entidade ARQUIVO)
+RELATORIO_ENTIDADE_DIMENSAO = "MOTORISTA"  # MOTORISTA, PREFIXO ou PA
+RELATORIO_ENTIDADE_SAIDA = "pdf_indexado"  # "pdf_indexado" (um PDF com índice) ou "arquivos" (um PNG por entidade)
+RELATORIO_ENTIDADE_MINIMO_ALERTAS = 1  # entidades com menos alertas ficam de fora
+RELATORIO_ENTIDADE_TOP = 10  # barras do detalhamento (prefixos do motorista, motoristas do prefixo/PA)
+RELATORIO_ENTIDADE_WORKERS = None  # None = um processo por núcleo
+RELATORIO_ENTIDADE_LOTE = 16  # páginas por tarefa enviada a um processo
+RELATORIO_ENTIDADE_DPI = 120  # resolução dos PNGs do modo "arquivos"
 
 # Configurações CustomTkinter
 CTK_THEME = "blue"  # blue, green, dark-blue
@@ -5,65 +5,186 @@ Módulo para processamento de dados
 import os
 import pandas as pd
 import time
-from datetime import datetime
 from typing import List, Callable, Optional
 
-from config import PREFIXOS, COLUNAS_REMOVER, ENCODING_CSV, PASTA_EXPORTADOS, TIPOS_DESCONSIDERAR
-from excel_formatter import ExcelFormatter
+from config import (PREFIXOS, PASTA_EXPORTADOS, MODO_EXECUCAO_PADRAO, MODO_EXPORTACAO_PADRAO,
+                    INCLUIR_ABA_RESUMO, ABA_RESUMO, DEDUPLICAR, HOTSPOTS_ATIVO,
+                    REAPROVEITAR_SAIDAS, JANELA_TEMPORAL_DIAS, BACKEND_PADRAO)
+from excel_writer import StreamingExcelWriter, montar_resumo
+from backends import PandasBackend, obter_backend
+from resultado import ResultadoProcessamento
+from deduplicator import criar_deduplicador
+from aggregate_store import atualizar_historico
+from anomaly_detector import anotar_anomalias
+from hotspots import finalizar_hotspots
+from run_manifest import abrir_manifesto
+from fingerprint import ImpressaoExecucao
+from preflight import verificar_arquivo, resumo_verificacao
+from pipeline import PipelineProcessor
+from run_filters import FiltroExecucao
 
 
 class DataProcessor:
     
-    def __init__(self):
-        self.formatter = ExcelFormatter()
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = obter_backend(backend)
+        # Com "auto" o backend de cada arquivo sai da verificação prévia
+        self._backend_automatico = backend is None and BACKEND_PADRAO == "auto"
     
     def filtrar_dataframe_por_prefixo(self, df: pd.DataFrame, prefixos: set, pa: str) -> pd.DataFrame:
-        df_filtrado = df[df["PREFIXO"].isin(prefixos)].copy()
-        if "TIPO" in df_filtrado.columns:
-            df_filtrado = df_filtrado[~df_filtrado["TIPO"].isin(TIPOS_DESCONSIDERAR)]
-
-        cols_para_remover = [col for col in COLUNAS_REMOVER if col in df_filtrado.columns]
-        if cols_para_remover:
-            df_filtrado.drop(columns=cols_para_remover, inplace=True)
-        df_filtrado.insert(0, "PA", pa)
-        return df_filtrado
+        return PandasBackend().filtrar_por_prefixo(df, prefixos, pa)
     
-    def processar_arquivo(self, filepath: str, progress_callback: Optional[Callable] = None) -> List[str]:
+    def processar_arquivo(self, filepath: str, progress_callback: Optional[Callable] = None,
+                          backend: Optional[str] = None, modo: Optional[str] = None,
+                          modo_exportacao: Optional[str] = None, deduplicar: Optional[bool] = None,
+                          entre_execucoes: Optional[bool] = None, retomar: bool = False,
+                          forcar: bool = False, sessao=None,
+                          filtro: Optional[FiltroExecucao] = None) -> List[str]:
+        """
+        Exporta as partições por PA e calcula os agregados do relatório
+
+        Returns:
+            ResultadoProcessamento; vazio (falso) se o processamento falhar
+            depois de começar a ler os dados
+
+        Raises:
+            ErroEsquema: Arquivo vazio, sem PREFIXO ou sem as colunas usadas
+                pelo filtro. Vem da verificação prévia, antes de qualquer
+                leitura pesada ou saída gravada; quem chama decide como avisar
+        """
+        modo_exportacao = modo_exportacao or MODO_EXPORTACAO_PADRAO
+        deduplicar = DEDUPLICAR if deduplicar is None else deduplicar
+        filtro = filtro if filtro is not None else FiltroExecucao.da_configuracao()
+        
+        # Fora do try: problema de esquema chega a quem chamou antes de qualquer leitura pesada
+        verificacao = verificar_arquivo(filepath)
+        print(resumo_verificacao(verificacao))
+        for aviso in verificacao["avisos"]:
+            print(f"⚠️ {aviso}")
+        filtro.verificar(verificacao["colunas"])
+        if filtro.ativo:
+            print(f"🔎 Filtro da execução: {filtro.descricao()}")
+        # Com filtro, o temporal fica o da execução (a série do histórico traria as linhas filtradas)
+        # e o histórico não é gravado (o cubo filtrado não é o da exportação inteira)
+        janela_historico = None if filtro.ativo else JANELA_TEMPORAL_DIAS
+        
+        # Manifesto da execução: o que já foi exportado com a mesma impressão (e confere) não é refeito
+        impressao = ImpressaoExecucao(filepath, modo_exportacao, deduplicar, entre_execucoes, filtro)
+        reaproveitar = not forcar and (retomar or REAPROVEITAR_SAIDAS)
+        execucao = abrir_manifesto(filepath, reaproveitar, impressao.entrada)
+        if reaproveitar:
+            resultado = execucao.resultado_concluido(impressao.execucao)
+            if resultado is not None:
+                print("⏭️ Entrada, configuração e código inalterados: arquivos e agregados reaproveitados")
+                if sessao is not None:
+                    sessao.guardar_resultado(filepath, resultado)
+                return resultado
+        # No workbook único todas as abas vão para o mesmo arquivo: não há PA para pular
+        concluidos = {}
+        if reaproveitar and modo_exportacao != "workbook_unico":
+            concluidos = execucao.particoes_validas(impressao.particoes)
+        
+        modo = modo or MODO_EXECUCAO_PADRAO
+        if modo == "auto":
+            modo = verificacao["modo"]
+        if modo == "pipeline":
+            deduplicador = criar_deduplicador(filepath, entre_execucoes) if deduplicar else None
+            resultado = PipelineProcessor(tamanho_chunk=verificacao["tamanho_chunk"],
+                                          modo_exportacao=modo_exportacao,
+                                          deduplicador=deduplicador, execucao=execucao,
+                                          concluidos=concluidos, impressao=impressao,
+                                          filtro=filtro).processar_arquivo(filepath, progress_callback)
+            resultado.estatisticas = {**(resultado.estatisticas or {}), "verificacao": verificacao}
+            resultado.agregados = anotar_anomalias(atualizar_historico(filepath, resultado.agregados,
+                                                                       janela_historico, not filtro.ativo))
+            if resultado:
+                self._concluir_execucao(execucao, resultado, impressao)
+                if sessao is not None:
+                    sessao.guardar_resultado(filepath, resultado)
+            return resultado
         
         try:
             print(f"📂 Processando arquivo: {os.path.basename(filepath)}")
             
             
-            df = pd.read_csv(filepath, encoding=ENCODING_CSV, sep=None, engine="python")
-            print(f"📊 Dados carregados: {len(df)} registros")
+            if backend or self._backend_automatico:
+                backend_execucao = obter_backend(backend or verificacao["backend"])
+            else:
+                backend_execucao = self.backend
+            dados = backend_execucao.carregar(filepath, filtro)
+            print(f"📊 Dados carregados: {backend_execucao.registros_carregados} registros (backend {backend_execucao.nome})")
+            
+            deduplicador = None
+            if deduplicar:
+                deduplicador = criar_deduplicador(filepath, entre_execucoes)
+                dados = backend_execucao.deduplicar(dados, deduplicador)
+                print(f"🧹 Duplicados removidos: {deduplicador.removidos}")
+            
+            # Cache da sessão (interface): refazer o relatório com outras opções sem reler o arquivo
+            if sessao is not None:
+                sessao.guardar_dados(filepath, dados, backend_execucao.nome)
+            
+            # Coordenadas só viram contagens por célula; as partições exportadas saem sem elas
+            hotspots = finalizar_hotspots(backend_execucao.contar_hotspots(dados)) if HOTSPOTS_ATIVO else None
             
             
             pasta_exportados = os.path.join(os.path.dirname(filepath), PASTA_EXPORTADOS)
             os.makedirs(pasta_exportados, exist_ok=True)
 
             arquivos_gerados = []
+            manifesto = []
+            particoes = []
+            registros_por_pa = {}
             total_grupos = len(PREFIXOS)
 
+            workbook_unico = None
+            if modo_exportacao == "workbook_unico":
+                caminho_workbook = os.path.join(pasta_exportados, impressao.nome_workbook())
+                execucao.iniciar_saida(caminho_workbook)
+                workbook_unico = StreamingExcelWriter(caminho_workbook)
+                if INCLUIR_ABA_RESUMO:
+                    workbook_unico.reservar_aba(ABA_RESUMO)
+
             
             for i, (pa, prefixos) in enumerate(PREFIXOS.items(), start=1):
                 try:
                     print(f"🔄 Processando {pa}... ({i}/{total_grupos})")
                     
                     
-                    df_filtrado = self.filtrar_dataframe_por_prefixo(df, prefixos, pa)
+                    particao = backend_execucao.filtrar_por_prefixo(dados, prefixos, pa)
                     
-                    if df_filtrado.empty:
+                    if len(particao) == 0:
                         continue
                     
+                    fragmentos = concluidos.get(pa)
+                    if fragmentos:
+                        # Exportado por uma execução anterior: entra só nos agregados
+                        arquivos_gerados.extend(dict.fromkeys(fragmento["arquivo"] for fragmento in fragmentos))
+                        manifesto.extend(fragmentos)
+                        particoes.append(particao)
+                        registros_por_pa[pa] = sum(fragmento["linhas"] for fragmento in fragmentos)
+                        print(f"⏭️ {pa}: inalterado, reaproveitando {os.path.basename(fragmentos[0]['arquivo'])}")
+                        continue
                     
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:21]
-                    nome_arquivo = f"veiculos_{pa.lower()}_filtrado_{timestamp}.xlsx"
-                    caminho_saida = os.path.join(pasta_exportados, nome_arquivo)
-
+                    df_filtrado = backend_execucao.para_pandas(particao)
                     
-                    df_filtrado.to_excel(caminho_saida, index=False)
-                    self.formatter.formatar_arquivo(caminho_saida)
-                    arquivos_gerados.append(caminho_saida)
+                    if workbook_unico is not None:
+                        workbook_unico.escrever(df_filtrado, aba=pa)
+                    else:
+                        caminho_saida = os.path.join(pasta_exportados, impressao.nome_particao(pa))
+                        execucao.iniciar_saida(caminho_saida)
+
+                        # Mesmo escritor em streaming do workbook único e do pipeline: já sai
+                        # formatado (sem reabrir o arquivo) e divide partições acima do limite do XLSX
+                        escritor = StreamingExcelWriter(caminho_saida)
+                        escritor.escrever(df_filtrado, particao=pa)
+                        escritor.fechar()
+                        arquivos_gerados.extend(escritor.arquivos)
+                        fragmentos = escritor.manifesto
+                        manifesto.extend(fragmentos)
+                        execucao.registrar_particao(pa, fragmentos, impressao.particoes[pa])
+                    particoes.append(particao)
+                    registros_por_pa[pa] = len(df_filtrado)
                     
                     print(f"✅ {pa}: {len(df_filtrado)} registros salvos")
 
@@ -80,9 +201,51 @@ class DataProcessor:
                     print(f"❌ Erro ao processar {pa}: {pa_error}")
                     continue
 
+            agregados = None
+            if particoes:
+                try:
+                    agregados = backend_execucao.agregar(particoes)
+                except Exception as agg_error:
+                    print(f"⚠️ Erro ao calcular agregados: {agg_error}")
+                agregados = anotar_anomalias(atualizar_historico(filepath, agregados, janela_historico,
+                                                                 not filtro.ativo))
+                if agregados is not None and hotspots is not None:
+                    agregados["hotspots"] = hotspots
+
+            if workbook_unico is not None and registros_por_pa:
+                if INCLUIR_ABA_RESUMO:
+                    contagens = agregados["contagens"] if agregados else None
+                    workbook_unico.escrever(montar_resumo(registros_por_pa, contagens), aba=ABA_RESUMO)
+                workbook_unico.fechar()
+                arquivos_gerados.extend(workbook_unico.arquivos)
+                manifesto.extend(workbook_unico.manifesto)
+                execucao.registrar_fragmentos(workbook_unico.manifesto, impressao.workbook)
+
+            estatisticas = {"verificacao": verificacao}
+            if deduplicador is not None:
+                deduplicador.salvar()
+                estatisticas["duplicados_removidos"] = deduplicador.removidos
+
             print(f"🎉 Processamento concluído! {len(arquivos_gerados)} arquivos gerados")
-            return arquivos_gerados
+            resultado = ResultadoProcessamento(arquivos_gerados, agregados, estatisticas, manifesto)
+            if resultado:
+                self._concluir_execucao(execucao, resultado, impressao)
+                if sessao is not None:
+                    sessao.guardar_resultado(filepath, resultado)
+            return resultado
             
         except Exception as e:
             print(f"❌ Erro geral no processamento: {e}")
-            return []
+            return ResultadoProcessamento()
+    
+    def _concluir_execucao(self, execucao, resultado: ResultadoProcessamento, impressao: ImpressaoExecucao):
+        """Checkpoint dos agregados e marca de exportação concluída no manifesto da execução"""
+        try:
+            execucao.salvar_agregados(resultado.agregados)
+            particoes = list(dict.fromkeys(fragmento["particao"] for fragmento in resultado.manifesto))
+            estatisticas = {chave: valor for chave, valor in (resultado.estatisticas or {}).items()
+                            if chave in ("duplicados_removidos", "registros_lidos", "registros_filtrados")}
+            execucao.concluir_etapa("exportacao", particoes=particoes, estatisticas=estatisticas,
+                                    impressao=impressao.execucao)
+        except Exception as e:
+            print(f"⚠️ Erro ao registrar a execução no manifesto: {e}")
@@ -0,0 +1,175 @@
+"""
+Módulo para deduplicação de alertas por hash (dentro de uma execução e entre execuções)
+"""
+
+import os
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (CHAVE_DEDUPLICACAO, DEDUPLICAR_ENTRE_EXECUCOES, ARQUIVO_INDICE_DEDUPLICACAO,
+                    PASTA_EXPORTADOS)
+from backends import detectar_coluna_data
+from fingerprint import impressao_entrada
+
+
+class _IndiceHashes:
+    """
+    Conjunto de hashes uint64 guardado em níveis ordenados
+
+    Cada bloco novo vira um nível ordenado; níveis de tamanho parecido são
+    fundidos (como numa LSM-tree), então inserir n hashes custa O(n log n) no
+    total e a consulta é um ``searchsorted`` por nível.
+    """
+
+    def __init__(self, base: Optional[np.ndarray] = None):
+        self.niveis: List[np.ndarray] = [base] if base is not None and len(base) else []
+
+    def __len__(self):
+        return sum(len(nivel) for nivel in self.niveis)
+
+    def contem(self, hashes: np.ndarray) -> np.ndarray:
+        encontrados = np.zeros(len(hashes), dtype=bool)
+        for nivel in self.niveis:
+            posicoes = np.searchsorted(nivel, hashes)
+            posicoes[posicoes == len(nivel)] = len(nivel) - 1
+            encontrados |= nivel[posicoes] == hashes
+        return encontrados
+
+    def adicionar(self, hashes: np.ndarray):
+        if not len(hashes):
+            return
+        self.niveis.append(np.unique(hashes))
+        while len(self.niveis) > 1 and len(self.niveis[-2]) <= 2 * len(self.niveis[-1]):
+            ultimo = self.niveis.pop()
+            self.niveis[-1] = np.union1d(self.niveis[-1], ultimo)
+
+    def compactar(self) -> np.ndarray:
+        if not self.niveis:
+            return np.empty(0, dtype=np.uint64)
+        while len(self.niveis) > 1:
+            ultimo = self.niveis.pop()
+            self.niveis[-1] = np.union1d(self.niveis[-1], ultimo)
+        return self.niveis[0]
+
+
+class Deduplicador:
+    """
+    Classe responsável por descartar alertas repetidos
+
+    A chave de cada registro (``config.CHAVE_DEDUPLICACAO``) é reduzida a um
+    hash uint64 com ``pd.util.hash_pandas_object``, de forma vetorizada. Um
+    registro é descartado se repetir um hash do mesmo bloco, de um bloco
+    anterior da execução ou, com ``caminho_indice``, de uma execução anterior.
+
+    O índice persistido guarda a origem (impressão da entrada) de cada hash.
+    Os hashes da própria entrada são deixados de fora da consulta e
+    substituídos ao salvar: reprocessar o mesmo arquivo (``--forcar``,
+    retomada) exporta as mesmas linhas em vez de descartá-las todas.
+    """
+
+    def __init__(self, colunas: Optional[List[str]] = None, caminho_indice: Optional[str] = None,
+                 origem: Optional[str] = None):
+        self.colunas = list(colunas or CHAVE_DEDUPLICACAO)
+        self.caminho_indice = caminho_indice
+        self.origem = _codigo_origem(origem)
+        self.removidos = 0
+
+        # Hashes de outras entradas (só consulta) e os desta execução (consulta e gravação)
+        self._hashes_anteriores = np.empty(0, dtype=np.uint64)
+        self._origens_anteriores = np.empty(0, dtype=np.uint64)
+        if caminho_indice and os.path.exists(caminho_indice):
+            with np.load(caminho_indice) as salvo:
+                hashes, origens = salvo["hashes"], salvo["origens"]
+            outras = origens != self.origem
+            self._hashes_anteriores, self._origens_anteriores = hashes[outras], origens[outras]
+            print(f"🧾 Índice de deduplicação: {int(outras.sum())} alertas já exportados por outras entradas"
+                  f" ({int((~outras).sum())} desta entrada desconsiderados)")
+        self.anteriores = _IndiceHashes(np.sort(self._hashes_anteriores))
+        self.indice = _IndiceHashes()
+
+    def colunas_chave(self, colunas) -> List[str]:
+        """Colunas da chave presentes no arquivo ("DATA" vale pela coluna de data detectada)"""
+        coluna_data = detectar_coluna_data(colunas)
+        chave = []
+        for coluna in self.colunas:
+            if coluna == "DATA" and coluna_data is not None:
+                coluna = coluna_data
+            if coluna in colunas and coluna not in chave:
+                chave.append(coluna)
+        return chave
+
+    def calcular_hashes(self, df: pd.DataFrame) -> np.ndarray:
+        chave = self.colunas_chave(df.columns)
+        valores = df[chave]
+        # Texto normalizado: o mesmo alerta gera o mesmo hash em qualquer arquivo
+        texto = valores.astype(str).mask(valores.isna(), "")
+        return pd.util.hash_pandas_object(texto, index=False).to_numpy()
+
+    def filtrar(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Máscara dos registros inéditos do bloco (que passam a contar como vistos)
+
+        Args:
+            df: Bloco de registros com as colunas da chave
+
+        Returns:
+            Array booleano, True para os registros mantidos
+        """
+        if not self.colunas_chave(df.columns):
+            return np.ones(len(df), dtype=bool)
+
+        hashes = self.calcular_hashes(df)
+        repetidos = (pd.Series(hashes).duplicated().to_numpy() | self.indice.contem(hashes)
+                     | self.anteriores.contem(hashes))
+        novos = ~repetidos
+        self.indice.adicionar(hashes[novos])
+        self.removidos += int(repetidos.sum())
+        return novos
+
+    def aplicar(self, df: pd.DataFrame) -> pd.DataFrame:
+        mascara = self.filtrar(df)
+        return df if mascara.all() else df[mascara]
+
+    def salvar(self):
+        """Grava o índice de hashes (escrita atômica) para as próximas execuções"""
+        if not self.caminho_indice:
+            return
+        desta_execucao = self.indice.compactar()
+        hashes = np.concatenate([self._hashes_anteriores, desta_execucao])
+        origens = np.concatenate([self._origens_anteriores,
+                                  np.full(len(desta_execucao), self.origem, dtype=np.uint64)])
+        temporario = f"{self.caminho_indice}.tmp"
+        with open(temporario, "wb") as arquivo:
+            np.savez(arquivo, hashes=hashes, origens=origens)
+        os.replace(temporario, self.caminho_indice)
+
+
+def _codigo_origem(origem: Optional[str]) -> np.uint64:
+    """Impressão hexadecimal da entrada reduzida a uint64 (0 = origem desconhecida)"""
+    return np.uint64(int(origem[:16], 16)) if origem else np.uint64(0)
+
+
+def criar_deduplicador(filepath: str, entre_execucoes: Optional[bool] = None) -> Deduplicador:
+    """
+    Cria o deduplicador de uma execução
+
+    Args:
+        filepath: Arquivo de origem (o índice fica na pasta de exportados ao lado dele;
+            os hashes do próprio arquivo não contam como já exportados)
+        entre_execucoes: Consulta e atualiza o índice persistido (padrão: config)
+
+    Returns:
+        Deduplicador pronto para uso
+    """
+    if entre_execucoes is None:
+        entre_execucoes = DEDUPLICAR_ENTRE_EXECUCOES
+
+    caminho_indice = origem = None
+    if entre_execucoes:
+        pasta_exportados = os.path.join(os.path.dirname(filepath), PASTA_EXPORTADOS)
+        os.makedirs(pasta_exportados, exist_ok=True)
+        caminho_indice = os.path.join(pasta_exportados, ARQUIVO_INDICE_DEDUPLICACAO)
+        origem = impressao_entrada(filepath)
+    return Deduplicador(caminho_indice=caminho_indice, origem=origem)
@@ -0,0 +1,171 @@
+"""
+Módulo de ranking de motoristas (top-K global, por PA e por TIPO)
+"""
+
+from typing import Dict, Optional
+
+import pandas as pd
+
+from config import TOP_MOTORISTAS, TIPOS_DESCONSIDERAR, RANKING_CAPACIDADE_ESBOCO
+
+
+def _top_k_por_grupo(serie: pd.Series, grupo: str, k: int) -> pd.DataFrame:
+    """Top-K de uma série indexada por (grupo, MOTORISTA), sem ordenar cada grupo inteiro"""
+    top = serie.groupby(level=grupo, group_keys=False).nlargest(k)
+    return top.reset_index(name="QUANTIDADE")
+
+
+class RankingMotoristas:
+    """
+    Classe responsável pelo ranking exato a partir do cubo de contagens
+
+    O cubo é reduzido uma vez para (PA, TIPO, MOTORISTA) e os três rankings
+    saem dessa redução com ``nlargest`` (seleção parcial, sem ``sort_values``
+    sobre todos os motoristas).
+    """
+
+    def __init__(self, k: int = TOP_MOTORISTAS):
+        self.k = k
+
+    def calcular(self, contagens: pd.DataFrame) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        Args:
+            contagens: Cubo de contagens dos agregados (ver ``backends``)
+
+        Returns:
+            Dict com ``global`` (MOTORISTA/QUANTIDADE), ``por_pa`` e ``por_tipo``,
+            ou None se não houver coluna MOTORISTA
+        """
+        if "MOTORISTA" not in contagens.columns:
+            return None
+
+        df = contagens.dropna(subset=["MOTORISTA"])
+        if "TIPO" in df.columns:
+            df = df[~df["TIPO"].isin(TIPOS_DESCONSIDERAR)]
+        chaves = [col for col in ("PA", "TIPO", "MOTORISTA") if col in df.columns]
+        cubo = df.groupby(chaves, dropna=False)["QUANTIDADE"].sum()
+
+        por_motorista = cubo.groupby(level="MOTORISTA").sum()
+        ranking = {
+            "global": por_motorista.nlargest(self.k).reset_index(name="QUANTIDADE"),
+            "por_pa": _top_k_por_grupo(cubo.groupby(level=["PA", "MOTORISTA"]).sum(), "PA", self.k),
+        }
+        if "TIPO" in chaves:
+            por_tipo = cubo.groupby(level=["TIPO", "MOTORISTA"]).sum()
+            ranking["por_tipo"] = _top_k_por_grupo(por_tipo, "TIPO", self.k)
+        return ranking
+
+
+class EsbocoSpaceSaving:
+    """
+    Esboço Space-Saving de motoristas frequentes com memória limitada
+
+    Guarda no máximo ``capacidade`` contadores. Cada bloco chega já contado
+    (motorista → alertas no bloco) e é fundido de forma vetorizada: quem já é
+    monitorado soma, quem é novo entra com o menor contador atual como erro,
+    e só os ``capacidade`` maiores ficam. A contagem estimada nunca fica abaixo
+    da real e passa dela em no máximo ``ERRO`` (≤ total / capacidade).
+    """
+
+    def __init__(self, capacidade: int = RANKING_CAPACIDADE_ESBOCO):
+        self.capacidade = capacidade
+        self.contagens = pd.Series(dtype="int64")
+        self.erros = pd.Series(dtype="int64")
+        self.total = 0
+
+    def atualizar(self, pesos: pd.Series):
+        """Funde as contagens de um bloco (índice = motorista)"""
+        if pesos.empty:
+            return
+        self.total += int(pesos.sum())
+
+        minimo = int(self.contagens.min()) if len(self.contagens) >= self.capacidade else 0
+        novos = pesos.index.difference(self.contagens.index)
+
+        contagens = self.contagens.add(pesos, fill_value=0).astype("int64")
+        erros = self.erros.reindex(contagens.index, fill_value=0).astype("int64")
+        if minimo:
+            contagens.loc[novos] += minimo
+            erros.loc[novos] = minimo
+
+        if len(contagens) > self.capacidade:
+            contagens = contagens.nlargest(self.capacidade)
+            erros = erros.loc[contagens.index]
+        self.contagens, self.erros = contagens, erros
+
+    @property
+    def erro_maximo(self) -> float:
+        return self.total / self.capacidade
+
+    def top(self, k: int) -> pd.DataFrame:
+        """
+        Top-K estimado
+
+        Returns:
+            DataFrame com MOTORISTA, QUANTIDADE (estimada), ERRO e GARANTIDO
+            (True quando a contagem mínima garante o motorista no top-K real)
+        """
+        maiores = self.contagens.nlargest(k + 1)
+        top = maiores.iloc[:k]
+        proximo = int(maiores.iloc[k]) if len(maiores) > k else 0
+        erros = self.erros.loc[top.index]
+        return pd.DataFrame({
+            "MOTORISTA": top.index,
+            "QUANTIDADE": top.values,
+            "ERRO": erros.values,
+            "GARANTIDO": (top - erros).values >= proximo,
+        })
+
+
+class RankingStreaming:
+    """Rankings global, por PA e por TIPO acumulados bloco a bloco em esboços Space-Saving"""
+
+    def __init__(self, capacidade: int = RANKING_CAPACIDADE_ESBOCO):
+        self.capacidade = capacidade
+        self.geral = EsbocoSpaceSaving(capacidade)
+        self.por_pa: Dict[str, EsbocoSpaceSaving] = {}
+        self.por_tipo: Dict[str, EsbocoSpaceSaving] = {}
+        self.com_motorista = False
+
+    def atualizar(self, contagens: pd.DataFrame):
+        """Acumula o cubo parcial de um bloco (saída de ``agregar_parcial``)"""
+        if "MOTORISTA" not in contagens.columns:
+            return
+        self.com_motorista = True
+        df = contagens.dropna(subset=["MOTORISTA"])
+        if "TIPO" in df.columns:
+            df = df[~df["TIPO"].isin(TIPOS_DESCONSIDERAR)]
+
+        self.geral.atualizar(df.groupby("MOTORISTA")["QUANTIDADE"].sum())
+        for coluna, esbocos in (("PA", self.por_pa), ("TIPO", self.por_tipo)):
+            if coluna not in df.columns:
+                continue
+            for valor, grupo in df.dropna(subset=[coluna]).groupby(coluna):
+                esboco = esbocos.setdefault(valor, EsbocoSpaceSaving(self.capacidade))
+                esboco.atualizar(grupo.groupby("MOTORISTA")["QUANTIDADE"].sum())
+
+    def calcular(self, k: int = TOP_MOTORISTAS) -> Optional[Dict[str, pd.DataFrame]]:
+        """Mesmo formato de ``RankingMotoristas.calcular``, com as colunas ERRO e GARANTIDO"""
+        if not self.com_motorista:
+            return None
+        ranking = {"global": self.geral.top(k)}
+        for nome, coluna, esbocos in (("por_pa", "PA", self.por_pa), ("por_tipo", "TIPO", self.por_tipo)):
+            if esbocos:
+                ranking[nome] = pd.concat([esboco.top(k).assign(**{coluna: valor})
+                                           for valor, esboco in esbocos.items()], ignore_index=True)
+        return ranking
+
+
+def ranking_motoristas(agregados: dict, k: int = TOP_MOTORISTAS) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Ranking de motoristas dos agregados de uma execução
+
+    O ranking é o exato sempre que o cubo de contagens existir (todos os
+    motores o produzem); o esboço (``agregados["ranking"]``) só vale para
+    agregados sem cubo.
+    """
+    contagens = agregados.get("contagens")
+    if contagens is not None:
+        return RankingMotoristas(k).calcular(contagens)
+    ranking = agregados.get("ranking")
+    return ranking.calcular(k) if ranking is not None else None
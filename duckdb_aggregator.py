@@ -0,0 +1,282 @@
+"""
+Módulo de agregação do relatório em SQL (DuckDB embarcado) direto sobre o CSV
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional
+
+import pandas as pd
+
+from config import (PREFIXOS, ENCODING_CSV, TIPOS_DESCONSIDERAR, DUCKDB_MEMORY_LIMIT, DEDUPLICAR,
+                    HISTORICO_ATIVO, MAPA_HORARIO)
+from backends import (DIMENSOES_DIARIO, detectar_coluna_data, detectar_separador, consolidar_temporal,
+                      grade_horaria, temporal_simulado, colunas_normalizaveis)
+from source_reader import abrir_fonte
+from deduplicator import Deduplicador
+from run_filters import FiltroExecucao
+
+try:
+    import duckdb
+except ImportError:  # Motor DuckDB é opcional
+    duckdb = None
+
+
+def _literal(valor: str) -> str:
+    """Escapa um valor como literal SQL"""
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def _coluna(nome: str) -> str:
+    """Escapa um nome de coluna como identificador SQL"""
+    return '"' + nome.replace('"', '""') + '"'
+
+
+def _texto_dia(coluna: str) -> str:
+    """Parte de data do texto ("dd/mm/aaaa hh:mm" ou ISO) de uma coluna de data"""
+    return f"split_part(split_part(trim(CAST({_coluna(coluna)} AS VARCHAR)), ' ', 1), 'T', 1)"
+
+
+def _texto_hora(coluna: str) -> str:
+    """Hora (0-23) do texto de uma coluna de data; sem parte de horário vale meia-noite"""
+    horario = f"split_part(replace(trim(CAST({_coluna(coluna)} AS VARCHAR)), 'T', ' '), ' ', 2)"
+    return f"CASE WHEN {horario} = '' THEN 0 ELSE try_cast(split_part({horario}, ':', 1) AS INTEGER) END"
+
+
+class DuckDBAggregator:
+    """
+    Classe responsável por calcular os agregados do relatório com DuckDB
+
+    A leitura é feita em streaming pelo próprio DuckDB (CSV ou Parquet), o
+    mapeamento PA é um JOIN contra a tabela de roteamento e só os agregados
+    (PA/TIPO/MOTORISTA, PA/dia, cubo diário e PA/horário) chegam ao pandas,
+    então a memória não cresce com o número de linhas do arquivo.
+    """
+
+    def __init__(self, memory_limit: str = DUCKDB_MEMORY_LIMIT):
+        if duckdb is None:
+            raise ImportError("Motor 'duckdb' requer o pacote duckdb instalado")
+        self.memory_limit = memory_limit
+
+    def _conectar(self):
+        con = duckdb.connect(database=":memory:")
+        con.execute(f"SET memory_limit = {_literal(self.memory_limit)}")
+        # Sem ordem de inserção o DuckDB agrega em streaming sem bufferizar linhas
+        con.execute("SET preserve_insertion_order = false")
+
+        roteamento = pd.DataFrame(
+            [(pa, prefixo) for pa, prefixos in PREFIXOS.items() for prefixo in sorted(prefixos)],
+            columns=["PA", "PREFIXO"]
+        )
+        con.register("roteamento_df", roteamento)
+        con.execute("CREATE TEMP TABLE roteamento AS SELECT * FROM roteamento_df")
+        con.unregister("roteamento_df")
+        return con
+
+    def _arquivo_legivel(self, filepath: str):
+        """Descompacta para um temporário os formatos que o DuckDB não lê direto (zip, bz2, xz)"""
+        if not filepath.lower().endswith((".zip", ".bz2", ".xz")):
+            return filepath, False
+
+        fd, destino = tempfile.mkstemp(suffix=".csv")
+        with abrir_fonte(filepath) as fonte, os.fdopen(fd, "wb") as saida:
+            shutil.copyfileobj(fonte.stream, saida, 1 << 20)
+        return destino, True
+
+    def _fonte_sql(self, filepath: str) -> str:
+        """Expressão de tabela para o arquivo de origem (CSV, CSV .gz/.zst ou cache Parquet)"""
+        if filepath.lower().endswith(".parquet"):
+            return f"read_parquet({_literal(filepath)})"
+
+        encoding = "latin-1" if ENCODING_CSV.lower().replace("-", "") in ("latin1", "iso88591") else "utf-8"
+        return (f"read_csv({_literal(filepath)}, delim={_literal(detectar_separador(filepath))}, "
+                f"header=true, all_varchar=true, encoding={_literal(encoding)})")
+
+    def _esquema(self, con, fonte: str) -> Dict[str, str]:
+        """Coluna → tipo DuckDB (no CSV tudo é VARCHAR; no Parquet vale o tipo gravado)"""
+        return {linha[0]: linha[1] for linha in con.execute(f"DESCRIBE SELECT * FROM {fonte}").fetchall()}
+
+    def _filtro_periodo(self, con, fonte: str, filtro: FiltroExecucao, coluna_data: str, tipo: str) -> str:
+        """
+        Condição do período sobre a coluna de data da origem
+
+        Coluna DATE/TIMESTAMP (cache Parquet): comparação direta no scan, que o
+        DuckDB empurra para o leitor e usa o mínimo/máximo de cada row group
+        para nem ler os grupos fora do período. Coluna de texto: os valores
+        distintos do dia são interpretados pelo pandas, como nos backends, e
+        viram uma tabela de dias permitidos.
+        """
+        coluna = _coluna(coluna_data)
+        if tipo.startswith(("DATE", "TIMESTAMP")):
+            literal = "DATE" if tipo == "DATE" else "TIMESTAMP"
+            condicoes = []
+            if filtro.data_inicio is not None:
+                condicoes.append(f"{coluna} >= {literal} {_literal(filtro.data_inicio.strftime('%Y-%m-%d'))}")
+            if filtro.data_fim is not None:
+                fim = filtro.data_fim + pd.Timedelta(days=1)
+                condicoes.append(f"{coluna} < {literal} {_literal(fim.strftime('%Y-%m-%d'))}")
+            return " AND ".join(condicoes)
+
+        dia = _texto_dia(coluna_data)
+        distintos = con.execute(f"SELECT DISTINCT {dia} AS BRUTO FROM {fonte} WHERE {coluna} IS NOT NULL").df()
+        con.execute("CREATE TEMP TABLE dias_filtro (BRUTO VARCHAR)")
+        permitidos = filtro.dias_permitidos(distintos["BRUTO"])
+        if len(permitidos):
+            con.executemany("INSERT INTO dias_filtro VALUES (?)", [(str(valor),) for valor in permitidos])
+        return f"{dia} IN (SELECT BRUTO FROM dias_filtro)"
+
+    def _contar_horarios(self, con, coluna_data: str, contagem_bruta: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """
+        Grade PA × hora × dia da semana agrupada no próprio DuckDB
+
+        Só as contagens por PA/hora/dia da semana (no máximo 168 linhas por PA)
+        chegam ao pandas. A hora sai do texto do carimbo; o dia da semana, de
+        uma tabela dia → dia da semana montada com os dias distintos já
+        contados em ``contagem_bruta`` e interpretados pelo pandas, como em
+        ``consolidar_temporal``.
+        """
+        dias = pd.Series(contagem_bruta["BRUTO"].dropna().unique())
+        datas = pd.to_datetime(dias, errors="coerce")
+        semana = pd.DataFrame({"BRUTO": dias.astype(str), "DIA_SEMANA": datas.dt.dayofweek})
+        semana = semana.dropna().astype({"DIA_SEMANA": "int64"})
+        con.register("semana_df", semana)
+        con.execute("CREATE TEMP TABLE dias_semana AS SELECT * FROM semana_df")
+        con.unregister("semana_df")
+
+        contagem = con.execute(f"""
+            SELECT b.PA, b.HORA, s.DIA_SEMANA, count(*) AS QUANTIDADE
+            FROM (
+                SELECT PA, {_texto_dia(coluna_data)} AS BRUTO, {_texto_hora(coluna_data)} AS HORA
+                FROM base
+                WHERE {_coluna(coluna_data)} IS NOT NULL
+            ) AS b
+            JOIN dias_semana AS s ON b.BRUTO = s.BRUTO
+            WHERE b.HORA BETWEEN 0 AND 23
+            GROUP BY ALL
+        """).df()
+        # Sem nenhum alerta fora da meia-noite as datas não têm horário: não há mapa
+        if not (contagem["HORA"] != 0).any():
+            return None
+        return grade_horaria(contagem, pd.unique(contagem_bruta["PA"]))
+
+    def agregar_arquivo(self, filepath: str, filtro: Optional[FiltroExecucao] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Calcula os agregados do relatório direto sobre o arquivo de origem
+
+        Args:
+            filepath: Caminho do CSV exportado (ou de um cache .parquet)
+            filtro: Filtro da execução (padrão: o da configuração)
+
+        Returns:
+            Dict com ``contagens``, ``temporal`` e, se houver, ``diario`` e
+            ``horario``, no mesmo formato de ``combinar_parciais``
+        """
+        print(f"🦆 Agregando com DuckDB: {os.path.basename(filepath)}")
+        filtro = filtro if filtro is not None else FiltroExecucao.da_configuracao()
+        caminho, temporario = self._arquivo_legivel(filepath)
+        con = self._conectar()
+        try:
+            fonte = self._fonte_sql(caminho)
+            esquema = self._esquema(con, fonte)
+            colunas = list(esquema)
+            if "PREFIXO" not in colunas:
+                raise KeyError("PREFIXO")
+            coluna_data_filtro = filtro.verificar(colunas)
+
+            # Mesma normalização da leitura dos backends, feita uma vez numa view
+            limpezas = []
+            for coluna, maiusculas in colunas_normalizaveis(colunas):
+                texto = f"trim(CAST({_coluna(coluna)} AS VARCHAR))"
+                if maiusculas:
+                    texto = f"upper({texto})"
+                limpezas.append(f"NULLIF({texto}, '') AS {_coluna(coluna)}")
+            # O período fica no próprio scan da origem (poda de row groups no Parquet)
+            periodo = ""
+            if coluna_data_filtro is not None:
+                periodo = "WHERE " + self._filtro_periodo(con, fonte, filtro, coluna_data_filtro,
+                                                          esquema[coluna_data_filtro])
+            con.execute(f"""
+                CREATE TEMP VIEW normalizado AS
+                SELECT * REPLACE ({", ".join(limpezas)}) FROM {fonte} {periodo}
+            """)
+
+            condicoes = []
+            if "TIPO" in colunas and TIPOS_DESCONSIDERAR:
+                excluidos = ", ".join(_literal(tipo) for tipo in sorted(TIPOS_DESCONSIDERAR))
+                condicoes.append(f"a.TIPO IS NULL OR a.TIPO NOT IN ({excluidos})")
+            for coluna, valores, inclusao in filtro.listas():
+                if coluna not in colunas:
+                    continue
+                lista = ", ".join(_literal(valor) for valor in sorted(valores))
+                if inclusao:
+                    condicoes.append(f"a.{_coluna(coluna)} IN ({lista})")
+                else:
+                    condicoes.append(f"a.{_coluna(coluna)} IS NULL OR a.{_coluna(coluna)} NOT IN ({lista})")
+            filtro_linhas = ("WHERE " + " AND ".join(f"({condicao})" for condicao in condicoes)) if condicoes else ""
+
+            origem = "normalizado"
+            chave = Deduplicador().colunas_chave(colunas) if DEDUPLICAR else []
+            if chave:
+                # Alertas repetidos no arquivo contam uma vez, como no processamento
+                origem = f"(SELECT DISTINCT ON ({', '.join(_coluna(col) for col in chave)}) * FROM normalizado)"
+
+            # Mesmo recorte das partições: um registro entra em todo PA que roteia seu prefixo
+            con.execute(f"""
+                CREATE TEMP VIEW base AS
+                SELECT r.PA, a.*
+                FROM {origem} AS a
+                JOIN roteamento AS r ON a.PREFIXO = r.PREFIXO
+                {filtro_linhas}
+            """)
+
+            selecao = ["PA"] + [col for col in ("TIPO", "MOTORISTA") if col in colunas]
+            chaves = ", ".join(f"{i + 1}" for i in range(len(selecao)))
+            ordem = ", ".join(f"{i + 1} NULLS LAST" for i in range(len(selecao)))
+
+            contagens = con.execute(f"""
+                SELECT {", ".join(selecao)}, count(*) AS QUANTIDADE
+                FROM base
+                GROUP BY {chaves}
+                ORDER BY {ordem}
+            """).df()
+            contagens["QUANTIDADE"] = contagens["QUANTIDADE"].astype("int64")
+
+            agregados = {"contagens": contagens}
+            coluna_data = detectar_coluna_data(colunas)
+            if coluna_data is None:
+                # Só a quantidade de registros por PA sai do DuckDB
+                registros = con.execute("SELECT PA, count(*) AS QUANTIDADE FROM base GROUP BY 1").df()
+                agregados["temporal"] = temporal_simulado(registros.set_index("PA")["QUANTIDADE"])
+            else:
+                # Agrupa só pela parte de data do texto ("dd/mm/aaaa hh:mm" ou ISO):
+                # a cardinalidade fica em dias, não em carimbos de tempo
+                data_texto = _texto_dia(coluna_data)
+                dimensoes = ([col for col in DIMENSOES_DIARIO if col == "PA" or col in colunas]
+                             if HISTORICO_ATIVO else ["PA"])
+                contagem_bruta = con.execute(f"""
+                    SELECT {", ".join(dimensoes)}, {data_texto} AS BRUTO, count(*) AS QUANTIDADE
+                    FROM base
+                    WHERE {_coluna(coluna_data)} IS NOT NULL
+                    GROUP BY ALL
+                """).df()
+                for coluna in dimensoes:
+                    contagem_bruta[coluna] = contagem_bruta[coluna].astype(object)
+                if HISTORICO_ATIVO:
+                    diario = consolidar_temporal(contagem_bruta, dimensoes)
+                    agregados["diario"] = diario
+                    agregados["temporal"] = diario.groupby(["PA", "DATA"])["QUANTIDADE"].sum().reset_index()
+                else:
+                    agregados["temporal"] = consolidar_temporal(contagem_bruta)
+
+                if MAPA_HORARIO:
+                    horario = self._contar_horarios(con, coluna_data, contagem_bruta)
+                    if horario is not None:
+                        agregados["horario"] = horario
+
+            print(f"✅ Agregados DuckDB: {int(contagens['QUANTIDADE'].sum())} registros considerados")
+            return agregados
+        finally:
+            con.close()
+            if temporario:
+                os.remove(caminho)
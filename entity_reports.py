@@ -0,0 +1,425 @@
+"""
+Módulo de relatórios individuais em lote: uma página por motorista, prefixo ou PA
+"""
+
+import io
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import matplotlib
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_pdf import PdfPages
+
+from config import (TIPOS_DESCONSIDERAR, RELATORIO_ENTIDADE_DIMENSAO, RELATORIO_ENTIDADE_SAIDA,
+                    RELATORIO_ENTIDADE_MINIMO_ALERTAS, RELATORIO_ENTIDADE_TOP, RELATORIO_ENTIDADE_WORKERS,
+                    RELATORIO_ENTIDADE_LOTE, RELATORIO_ENTIDADE_DPI)
+from styles import MATPLOTLIB_CONFIG, CORES_TIPO, CORES_PA
+from run_manifest import caminho_temporario, publicar
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # Sem pypdf o PDF indexado é desenhado num processo só (índice sem marcadores)
+    PdfReader = PdfWriter = None
+
+matplotlib.use('Agg')
+
+DIMENSOES_ENTIDADE = ("MOTORISTA", "PREFIXO", "PA")
+
+# Detalhamento de cada página: quem (ou qual veículo) gerou os alertas da entidade
+DETALHE_ENTIDADE = {"MOTORISTA": "PREFIXO", "PREFIXO": "MOTORISTA", "PA": "MOTORISTA"}
+
+TAMANHO_PAGINA_ENTIDADE = (11.69, 8.27)  # A4 paisagem, em polegadas
+LINHAS_INDICE = 40  # entradas por coluna da página de índice (duas colunas)
+COR_NEUTRA = "#64748B"
+
+# Figura reaproveitada por todas as páginas desenhadas no mesmo processo
+_modelo = None
+
+
+def preparar_entidades(agregados: dict, dimensao: str,
+                       minimo_alertas: int = RELATORIO_ENTIDADE_MINIMO_ALERTAS,
+                       top: int = RELATORIO_ENTIDADE_TOP) -> List[Dict]:
+    """
+    Dados de todas as páginas a partir de uma única agregação do cubo
+
+    Usa o cubo diário (``agregados["diario"]``) quando existe; sem ele, as
+    contagens (sem série diária nem PREFIXO). Cada entidade vira um dict
+    pequeno, com listas simples, barato de enviar aos processos.
+
+    Returns:
+        Lista de páginas, da entidade com mais alertas para a com menos
+    """
+    base = agregados.get("diario")
+    if base is None or dimensao not in base.columns:
+        base = agregados["contagens"]
+    if dimensao not in base.columns:
+        raise ValueError(f"Coluna {dimensao} não existe nos agregados desta execução")
+    if "TIPO" in base.columns:
+        base = base[~base["TIPO"].isin(TIPOS_DESCONSIDERAR)]
+
+    detalhe = DETALHE_ENTIDADE[dimensao]
+    chaves = list(dict.fromkeys(col for col in (dimensao, "PA", "TIPO", detalhe, "DATA") if col in base.columns))
+    cubo = (base.dropna(subset=[dimensao])
+                .groupby(chaves, observed=True, dropna=False)["QUANTIDADE"].sum()
+                .reset_index())
+    cubo = cubo[cubo["QUANTIDADE"] > 0]
+
+    totais = cubo.groupby(dimensao, observed=True)["QUANTIDADE"].sum()
+    totais = totais[totais >= minimo_alertas].sort_values(ascending=False, kind="stable")
+
+    paginas = {}
+    for entidade, grupo in cubo[cubo[dimensao].isin(totais.index)].groupby(dimensao, observed=True, sort=False):
+        tipos = grupo.groupby("TIPO", observed=True)["QUANTIDADE"].sum() if "TIPO" in grupo else pd.Series(dtype="int64")
+        detalhes = (grupo.groupby(detalhe, observed=True)["QUANTIDADE"].sum().nlargest(top)
+                    if detalhe in grupo else pd.Series(dtype="int64"))
+        diario = grupo.groupby("DATA")["QUANTIDADE"].sum().sort_index() if "DATA" in grupo else None
+        pas = grupo.groupby("PA", observed=True)["QUANTIDADE"].sum() if dimensao != "PA" else None
+
+        paginas[entidade] = {
+            "entidade": str(entidade),
+            "total": int(grupo["QUANTIDADE"].sum()),
+            "pa": str(pas.idxmax()) if pas is not None and not pas.empty else None,
+            "tipos": (list(map(str, tipos.index)), tipos.to_numpy(dtype="int64").tolist()),
+            "detalhe": (list(map(str, detalhes.index)), detalhes.to_numpy(dtype="int64").tolist()),
+            "diario": None if diario is None else (pd.to_datetime(diario.index).to_numpy(),
+                                                   diario.to_numpy(dtype="int64")),
+        }
+    return [paginas[entidade] for entidade in totais.index]
+
+
+def _criar_modelo():
+    """Figura, eixos e textos do cabeçalho, criados uma vez por processo"""
+    plt.style.use('default')
+    for key, value in MATPLOTLIB_CONFIG.items():
+        plt.rcParams[key] = value
+    plt.rcParams["pdf.fonttype"] = 42
+
+    fig = plt.figure(figsize=TAMANHO_PAGINA_ENTIDADE, facecolor='white')
+    gs = fig.add_gridspec(2, 2, hspace=0.45, wspace=0.45, left=0.14, right=0.97, top=0.84, bottom=0.08)
+    eixos = {
+        "tipos": fig.add_subplot(gs[0, 0]),
+        "detalhe": fig.add_subplot(gs[0, 1]),
+        "diario": fig.add_subplot(gs[1, :]),
+    }
+    titulo = fig.text(0.5, 0.95, "", ha='center', va='center', fontsize=18, fontweight='bold', color='black')
+    subtitulo = fig.text(0.5, 0.905, "", ha='center', va='center', fontsize=11, color='#475569')
+    rodape = fig.text(0.99, 0.01, "", ha='right', va='bottom', fontsize=8, color='#94a3b8')
+    return fig, eixos, titulo, subtitulo, rodape
+
+
+def _barras_horizontais(ax, rotulos: List[str], valores: List[int], cores: List[str], titulo: str):
+    if not rotulos:
+        ax.text(0.5, 0.5, "Sem dados", ha='center', va='center', transform=ax.transAxes,
+                fontsize=11, color=COR_NEUTRA)
+        ax.set_xticks([])
+        ax.set_yticks([])
+    else:
+        barras = ax.barh(rotulos, valores, color=cores, edgecolor='white', linewidth=0.8)
+        ax.invert_yaxis()
+        ax.bar_label(barras, padding=3, fontsize=9, fontweight='bold')
+        ax.set_xlim(0, max(valores) * 1.15)
+        ax.tick_params(axis='y', labelsize=9)
+        ax.grid(axis='y', visible=False)
+    ax.set_title(titulo, fontsize=13, fontweight='bold', pad=12, color='black')
+
+
+def _desenhar_pagina(modelo, pagina: Dict, dimensao: str, periodo, gerado_em: datetime):
+    """Troca só os dados da figura modelo: eixos limpos e redesenhados, textos atualizados"""
+    fig, eixos, titulo, subtitulo, rodape = modelo
+    for ax in eixos.values():
+        ax.cla()
+
+    titulo.set_text(f"{dimensao}: {pagina['entidade']}")
+    partes = [f"{pagina['total']:,} alertas".replace(",", ".")]
+    if pagina["pa"]:
+        partes.append(pagina["pa"])
+    if pagina["diario"] is not None:
+        partes.append(f"{len(pagina['diario'][0])} dias com alerta")
+    subtitulo.set_text("  ·  ".join(partes))
+    rodape.set_text(f"Gerado em {gerado_em.strftime('%d/%m/%Y %H:%M')}")
+
+    tipos, quantidades = pagina["tipos"]
+    _barras_horizontais(eixos["tipos"], tipos, quantidades,
+                        [CORES_TIPO.get(tipo, COR_NEUTRA) for tipo in tipos], "Alertas por tipo")
+
+    detalhe = DETALHE_ENTIDADE[dimensao]
+    nomes, quantidades = pagina["detalhe"]
+    cor = CORES_PA.get(pagina["pa"] or pagina["entidade"], "#1e40af")
+    _barras_horizontais(eixos["detalhe"], nomes, quantidades, [cor] * len(nomes),
+                        f"Alertas por {detalhe.lower()}")
+
+    ax = eixos["diario"]
+    if pagina["diario"] is None:
+        ax.text(0.5, 0.5, "Arquivo sem coluna de data", ha='center', va='center', transform=ax.transAxes,
+                fontsize=11, color=COR_NEUTRA)
+        ax.set_xticks([])
+        ax.set_yticks([])
+    else:
+        datas, quantidades = pagina["diario"]
+        ax.plot(datas, quantidades, color=cor, marker='o', markersize=3, linewidth=1.8)
+        ax.fill_between(datas, quantidades, color=cor, alpha=0.15)
+        # Mesmo eixo de datas em todas as páginas: as entidades ficam comparáveis
+        ax.set_xlim(*periodo)
+        ax.set_ylim(0, max(quantidades.max() * 1.15, 1))
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
+        ax.set_ylabel("Alertas", fontsize=10)
+    ax.set_title("Alertas por dia", fontsize=13, fontweight='bold', pad=12, color='black')
+
+
+def nome_arquivo_entidade(posicao: int, entidade: str) -> str:
+    """Posição no ranking + nome sem caracteres inválidos (nomes parecidos não colidem)"""
+    nome = re.sub(r"[^\w.-]+", "_", entidade).strip("._")[:80] or "sem_nome"
+    return f"{posicao:04d}_{nome}.png"
+
+
+def _renderizar_lote(paginas: List[Dict], posicao_inicial: int, dimensao: str, periodo,
+                     gerado_em: datetime, pasta: Optional[str]) -> List:
+    """
+    Executado no processo de renderização: desenha um lote de páginas na figura modelo
+
+    Returns:
+        Com ``pasta``, os caminhos dos PNGs gravados; sem ela, o PDF de cada
+        página (bytes) para o processo principal montar o arquivo indexado
+    """
+    global _modelo
+    if _modelo is None:
+        _modelo = _criar_modelo()
+    fig = _modelo[0]
+
+    saidas = []
+    for posicao, pagina in enumerate(paginas, start=posicao_inicial):
+        _desenhar_pagina(_modelo, pagina, dimensao, periodo, gerado_em)
+        if pasta is None:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='pdf')
+            saidas.append(buffer.getvalue())
+        else:
+            caminho = os.path.join(pasta, nome_arquivo_entidade(posicao, pagina["entidade"]))
+            temporario = caminho_temporario(caminho)
+            fig.savefig(temporario, format='png', dpi=RELATORIO_ENTIDADE_DPI, facecolor='white')
+            publicar(temporario, caminho)
+            saidas.append(caminho)
+    return saidas
+
+
+class _Progresso:
+    """Páginas prontas, vazão e aviso ao callback a cada ~5% (ou a cada lote, se maior)"""
+
+    def __init__(self, total: int, callback: Optional[Callable]):
+        self.total = total
+        self.callback = callback
+        self.prontas = 0
+        self.inicio = time.perf_counter()
+        self._proximo_aviso = 0
+
+    def avancar(self, paginas: int):
+        self.prontas += paginas
+        if self.callback:
+            try:
+                self.callback(self.prontas / self.total)
+            except Exception as callback_error:
+                print(f"⚠️ Erro no callback de progresso: {callback_error}")
+        if self.prontas >= self._proximo_aviso or self.prontas == self.total:
+            print(f"📄 {self.prontas}/{self.total} páginas ({self.vazao():.1f} páginas/s)")
+            self._proximo_aviso = self.prontas + max(self.total // 20, 1)
+
+    def duracao(self) -> float:
+        return time.perf_counter() - self.inicio
+
+    def vazao(self) -> float:
+        return self.prontas / max(self.duracao(), 1e-9)
+
+
+class GeradorRelatoriosEntidade:
+    """
+    Classe responsável pelos relatórios de uma página por motorista, prefixo ou PA
+
+    Os dados de todas as páginas saem de uma única agregação do cubo diário.
+    As páginas são desenhadas em lotes num pool de processos; cada processo
+    cria a figura uma vez e, a cada página, só limpa os eixos e redesenha os
+    dados (sem recriar figura, grade e textos). A saída é um PNG por
+    entidade ou um PDF único com página de índice e marcadores.
+    """
+
+    def __init__(self, dimensao: Optional[str] = None, saida: Optional[str] = None,
+                 workers: Optional[int] = None, lote: int = RELATORIO_ENTIDADE_LOTE):
+        self.dimensao = (dimensao or RELATORIO_ENTIDADE_DIMENSAO).upper()
+        self.saida = saida or RELATORIO_ENTIDADE_SAIDA
+        if self.dimensao not in DIMENSOES_ENTIDADE:
+            raise ValueError(f"Dimensão inválida: {self.dimensao} (use {', '.join(DIMENSOES_ENTIDADE)})")
+        if self.saida not in ("pdf_indexado", "arquivos"):
+            raise ValueError(f"Saída inválida: {self.saida}")
+        self.workers = workers or RELATORIO_ENTIDADE_WORKERS or os.cpu_count() or 1
+        self.lote = max(lote, 1)
+
+    def gerar(self, agregados: dict, pasta_saida: Optional[str] = None,
+              progress_callback: Optional[Callable] = None) -> Dict:
+        """
+        Gera as páginas de todas as entidades
+
+        Args:
+            agregados: Agregados de uma execução (idealmente com ``diario``)
+            pasta_saida: Pasta dos relatórios (padrão: Downloads do usuário)
+            progress_callback: Recebe o progresso (0 a 1) conforme os lotes terminam
+
+        Returns:
+            Dict com ``arquivos``, ``paginas``, ``duracao`` e ``paginas_por_segundo``
+            (vazio se não houver entidades)
+        """
+        paginas = preparar_entidades(agregados, self.dimensao)
+        if not paginas:
+            print(f"❌ Nenhum {self.dimensao.lower()} com alertas para gerar relatórios")
+            return {}
+        print(f"🗂️ {len(paginas)} relatórios por {self.dimensao.lower()} preparados")
+
+        datas = [pagina["diario"][0] for pagina in paginas if pagina["diario"] is not None]
+        periodo = None
+        if datas:
+            todas = np.concatenate(datas)
+            periodo = (todas.min() - np.timedelta64(12, 'h'), todas.max() + np.timedelta64(12, 'h'))
+
+        pasta = pasta_saida or os.path.join(os.path.expanduser("~"), "Downloads")
+        progresso = _Progresso(len(paginas), progress_callback)
+        args = (self.dimensao, periodo, datetime.now())
+
+        if self.saida == "arquivos":
+            pasta_entidades = os.path.join(pasta, f"relatorios_{self.dimensao.lower()}")
+            os.makedirs(pasta_entidades, exist_ok=True)
+            arquivos = self._renderizar(paginas, args, pasta_entidades, progresso)
+            print(f"✅ Relatórios salvos em: {pasta_entidades}")
+        else:
+            caminho = os.path.join(pasta, f"relatorios_{self.dimensao.lower()}.pdf")
+            if PdfWriter is not None:
+                self._montar_pdf(caminho, paginas, self._renderizar(paginas, args, None, progresso))
+            else:
+                self._desenhar_pdf(caminho, paginas, args, progresso)
+            arquivos = [caminho]
+            print(f"✅ Relatório indexado salvo em: {caminho}")
+
+        duracao = progresso.duracao()
+        print(f"🎉 {len(paginas)} páginas em {duracao:.1f}s ({progresso.vazao():.1f} páginas/s)")
+        return {"arquivos": arquivos, "paginas": len(paginas), "duracao": duracao,
+                "paginas_por_segundo": progresso.vazao()}
+
+    def _renderizar(self, paginas: List[Dict], args: tuple, pasta: Optional[str],
+                    progresso: "_Progresso") -> List:
+        """Desenha os lotes no pool (na ordem das páginas); cai para o processo atual se o pool falhar"""
+        lotes = [(inicio, paginas[inicio:inicio + self.lote]) for inicio in range(0, len(paginas), self.lote)]
+        workers = min(self.workers, len(lotes))
+        resultados = [None] * len(lotes)
+
+        if workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = {pool.submit(_renderizar_lote, lote, inicio + 1, *args, pasta): indice
+                               for indice, (inicio, lote) in enumerate(lotes)}
+                    for future in as_completed(futures):
+                        indice = futures[future]
+                        resultados[indice] = future.result()
+                        progresso.avancar(len(lotes[indice][1]))
+                return [saida for resultado in resultados for saida in resultado]
+            except Exception as e:
+                print(f"⚠️ Renderização paralela falhou ({e}), desenhando no processo atual")
+                progresso.prontas = sum(len(lotes[indice][1]) for indice, resultado in enumerate(resultados)
+                                        if resultado is not None)
+
+        for indice, (inicio, lote) in enumerate(lotes):
+            if resultados[indice] is None:
+                resultados[indice] = _renderizar_lote(lote, inicio + 1, *args, pasta)
+                progresso.avancar(len(lote))
+        return [saida for resultado in resultados for saida in resultado]
+
+    def _figuras_indice(self, paginas: List[Dict]):
+        """Páginas de índice (duas colunas): entidade, alertas e página onde está"""
+        por_pagina = 2 * LINHAS_INDICE
+        n_indice = math.ceil(len(paginas) / por_pagina)
+        for numero in range(n_indice):
+            fig = plt.figure(figsize=TAMANHO_PAGINA_ENTIDADE, facecolor='white')
+            fig.text(0.5, 0.95, f"Índice · relatórios por {self.dimensao.lower()}", ha='center', va='center',
+                     fontsize=16, fontweight='bold', color='black')
+            inicio = numero * por_pagina
+            for deslocamento, pagina in enumerate(paginas[inicio:inicio + por_pagina]):
+                posicao = inicio + deslocamento
+                coluna, linha = divmod(deslocamento, LINHAS_INDICE)
+                x = 0.05 + coluna * 0.48
+                y = 0.9 - (linha + 1) * (0.84 / LINHAS_INDICE)
+                total = f"{pagina['total']:,}".replace(",", ".")
+                fig.text(x, y, f"{posicao + 1:>4}. {pagina['entidade'][:38]}", fontsize=8, family='monospace')
+                fig.text(x + 0.43, y, f"{total} · p. {n_indice + posicao + 1}", fontsize=8,
+                         family='monospace', ha='right')
+            yield fig
+
+    def _montar_pdf(self, caminho: str, paginas: List[Dict], paginas_pdf: List[bytes]):
+        """Junta índice e páginas num PDF com um marcador por entidade"""
+        writer = PdfWriter()
+        with plt.rc_context({"pdf.fonttype": 42}):
+            for fig in self._figuras_indice(paginas):
+                buffer = io.BytesIO()
+                fig.savefig(buffer, format='pdf')
+                plt.close(fig)
+                writer.add_page(PdfReader(buffer).pages[0])
+        n_indice = len(writer.pages)
+
+        for posicao, (pagina, conteudo) in enumerate(zip(paginas, paginas_pdf)):
+            writer.add_page(PdfReader(io.BytesIO(conteudo)).pages[0])
+            writer.add_outline_item(pagina["entidade"], n_indice + posicao)
+        if hasattr(writer, "compress_identical_objects"):
+            # As fontes embutidas se repetem em cada página desenhada à parte
+            writer.compress_identical_objects()
+
+        temporario = caminho_temporario(caminho)
+        with open(temporario, "wb") as arquivo:
+            writer.write(arquivo)
+        publicar(temporario, caminho)
+
+    def _desenhar_pdf(self, caminho: str, paginas: List[Dict], args: tuple, progresso: "_Progresso"):
+        """Sem pypdf: índice e páginas desenhados em sequência na mesma figura modelo"""
+        global _modelo
+        if _modelo is None:
+            _modelo = _criar_modelo()
+        temporario = caminho_temporario(caminho)
+        metadados = {"Title": f"Relatórios por {self.dimensao.lower()}"}
+        with plt.rc_context({"pdf.fonttype": 42}), PdfPages(temporario, metadata=metadados) as pdf:
+            for fig in self._figuras_indice(paginas):
+                pdf.savefig(fig)
+                plt.close(fig)
+            for inicio in range(0, len(paginas), self.lote):
+                lote = paginas[inicio:inicio + self.lote]
+                for pagina in lote:
+                    _desenhar_pagina(_modelo, pagina, *args)
+                    pdf.savefig(_modelo[0])
+                progresso.avancar(len(lote))
+        publicar(temporario, caminho)
+
+
+def gerar_relatorios_entidades(filepath: str, dimensao: Optional[str] = None, saida: Optional[str] = None,
+                               pasta_saida: Optional[str] = None, forcar: bool = False, filtro=None) -> Dict:
+    """
+    Processa o arquivo (reaproveitando a execução anterior se nada mudou) e
+    gera os relatórios por entidade a partir dos agregados
+
+    Returns:
+        Estatísticas de ``GeradorRelatoriosEntidade.gerar`` (vazio se não houver agregados)
+    """
+    # Import tardio: o processamento não é necessário só para importar o gerador
+    from data_processor import DataProcessor
+    from preflight import ErroEsquema
+
+    gerador = GeradorRelatoriosEntidade(dimensao, saida)
+    try:
+        resultado = DataProcessor().processar_arquivo(filepath, forcar=forcar, filtro=filtro)
+    except ErroEsquema as e:
+        print(f"❌ Arquivo não processado: {e}")
+        return {}
+    if not resultado or not resultado.agregados:
+        print("❌ Processamento sem agregados: relatórios por entidade não gerados")
+        return {}
+    return gerador.gerar(resultado.agregados, pasta_saida)
@@ -0,0 +1,183 @@
+"""
+Módulo para escrita de arquivos Excel em streaming (modo write-only)
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from config import LIMITE_LINHAS_ABA, FRAGMENTACAO_EXCEL
+from run_manifest import caminho_temporario, publicar
+
+# Linhas de dados que cabem numa aba XLSX (1.048.576 menos o cabeçalho)
+MAXIMO_LINHAS_XLSX = 1_048_575
+
+
+def _nulo(valor) -> bool:
+    """NaN, NaT, None ou pd.NA (NaN e NaT são os únicos diferentes de si mesmos)"""
+    return valor is None or valor is pd.NA or valor != valor
+
+
+class StreamingExcelWriter:
+    """
+    Escreve DataFrames em blocos num XLSX em modo write-only
+
+    As linhas vão direto para disco conforme chegam, então a memória não
+    cresce com o tamanho da partição. No modo write-only as larguras das
+    colunas precisam existir antes da primeira linha, por isso são calculadas
+    a partir do primeiro bloco (mesma regra do ExcelFormatter). O modo em
+    memória escreve cada partição num bloco só e fica com as larguras da
+    partição inteira; no pipeline valem as do primeiro bloco de leitura.
+
+    Um mesmo arquivo pode receber várias abas intercaladas (uma por PA); a
+    tabela de strings compartilhadas é única por workbook, então as escritas
+    são serializadas por um lock.
+
+    Uma aba que passa de ``limite_linhas`` continua num novo fragmento: outra
+    aba do mesmo arquivo ("PA1_2", ...) ou outro arquivo ("..._parte2.xlsx"),
+    conforme ``fragmentar_em``. Os fragmentos ficam registrados em ``manifesto``.
+    """
+
+    def __init__(self, caminho: str, limite_linhas: int = LIMITE_LINHAS_ABA,
+                 fragmentar_em: str = FRAGMENTACAO_EXCEL):
+        if fragmentar_em not in ("abas", "arquivos"):
+            raise ValueError(f"Fragmentação desconhecida: {fragmentar_em} (opções: abas, arquivos)")
+        self.caminho = caminho
+        self.limite_linhas = min(limite_linhas, MAXIMO_LINHAS_XLSX)
+        self.fragmentar_em = fragmentar_em
+        self.wb = Workbook(write_only=True)
+        self.font_bold = Font(bold=True, name="Calibri", size=11)
+        self.abas = {}
+        self.linhas = {}
+        self._workbooks = {caminho: self.wb}
+        self._fragmentos: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def arquivos(self) -> List[str]:
+        """Arquivos gravados por este escritor (o principal e os fragmentos extras)"""
+        return list(self._workbooks)
+
+    @property
+    def manifesto(self) -> List[Dict]:
+        """Um registro por fragmento: particao, parte, arquivo, aba e linhas"""
+        return [{chave: valor for chave, valor in fragmento.items() if chave != "ws"}
+                for fragmentos in self._fragmentos.values() for fragmento in fragmentos]
+
+    def reservar_aba(self, aba: str):
+        """Cria a aba já na sua posição final, para receber linhas depois (ex.: resumo)"""
+        with self._lock:
+            return self._criar_aba(self.caminho, aba)
+
+    def _criar_aba(self, caminho: str, aba: str):
+        chave = aba if caminho == self.caminho else (caminho, aba)
+        if chave not in self.abas:
+            if caminho not in self._workbooks:
+                self._workbooks[caminho] = Workbook(write_only=True)
+            self.abas[chave] = self._workbooks[caminho].create_sheet(title=aba)
+        return self.abas[chave]
+
+    def escrever(self, df: pd.DataFrame, aba: str = "Sheet1", particao: Optional[str] = None):
+        """
+        Anexa as linhas do bloco à aba, abrindo novos fragmentos ao atingir o limite
+
+        ``particao`` identifica os fragmentos no manifesto (padrão: o nome da
+        aba); um arquivo por PA grava em "Sheet1", mas o fragmento é do PA.
+        """
+        # Nulos viram célula vazia valor a valor, só nas colunas que têm nulos:
+        # nenhuma cópia do bloco inteiro em dtype object
+        nulas = [i for i, (_, serie) in enumerate(df.items()) if serie.hasnans]
+
+        with self._lock:
+            inicio = 0
+            fragmento = self._fragmento_atual(aba, df, particao)
+            while inicio < len(df):
+                if fragmento["linhas"] >= self.limite_linhas:
+                    fragmento = self._fragmento_atual(aba, df, particao)
+                fim = min(inicio + self.limite_linhas - fragmento["linhas"], len(df))
+                # Fatias posicionais do mesmo bloco: nenhum fragmento é copiado
+                for linha in df.iloc[inicio:fim].itertuples(index=False, name=None):
+                    if nulas:
+                        linha = list(linha)
+                        for i in nulas:
+                            if _nulo(linha[i]):
+                                linha[i] = None
+                    fragmento["ws"].append(linha)
+                fragmento["linhas"] += fim - inicio
+                inicio = fim
+            self.linhas[aba] = self.linhas.get(aba, 0) + len(df)
+
+    def _fragmento_atual(self, aba: str, df: pd.DataFrame, particao: Optional[str] = None) -> Dict:
+        fragmentos = self._fragmentos.setdefault(aba, [])
+        if fragmentos and fragmentos[-1]["linhas"] < self.limite_linhas:
+            return fragmentos[-1]
+
+        parte = len(fragmentos) + 1
+        caminho, nome = self.caminho, aba
+        if parte > 1 and self.fragmentar_em == "arquivos":
+            raiz, extensao = os.path.splitext(self.caminho)
+            caminho = f"{raiz}_parte{parte}{extensao}"
+        elif parte > 1:
+            sufixo = f"_{parte}"
+            nome = aba[:31 - len(sufixo)] + sufixo  # nomes de aba têm no máximo 31 caracteres
+
+        ws = self._criar_aba(caminho, nome)
+        self._iniciar_aba(ws, df)
+        if parte > 1:
+            print(f"📑 {aba}: limite de {self.limite_linhas} linhas atingido, continuando em {os.path.basename(caminho)}:{nome}")
+        fragmento = {"particao": particao or aba, "parte": parte, "arquivo": caminho, "aba": nome, "linhas": 0, "ws": ws}
+        fragmentos.append(fragmento)
+        return fragmento
+
+    def _iniciar_aba(self, ws, df: pd.DataFrame):
+        for i, coluna in enumerate(df.columns, start=1):
+            textos = df[coluna].dropna().astype(str)
+            max_length = max(len(str(coluna)), int(textos.str.len().max()) if len(textos) else 0)
+            ws.column_dimensions[get_column_letter(i)].width = max(max_length + 2, 10)
+
+        cabecalho = []
+        for coluna in df.columns:
+            cell = WriteOnlyCell(ws, value=str(coluna))
+            cell.font = self.font_bold
+            cabecalho.append(cell)
+        ws.append(cabecalho)
+
+    def fechar(self):
+        # Cada arquivo só aparece com o nome final depois de gravado por inteiro
+        for caminho, wb in self._workbooks.items():
+            temporario = caminho_temporario(caminho)
+            wb.save(temporario)
+            publicar(temporario, caminho)
+
+
+def montar_resumo(registros_por_pa: Dict[str, int], contagens: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Monta a aba de resumo do workbook único: registros por PA e por TIPO
+
+    Args:
+        registros_por_pa: Quantidade de registros exportados em cada PA
+        contagens: Cubo de contagens dos agregados (opcional, para as colunas por TIPO)
+
+    Returns:
+        DataFrame com uma linha por PA e uma linha TOTAL
+    """
+    resumo = pd.DataFrame({"PA": list(registros_por_pa), "REGISTROS": list(registros_por_pa.values())})
+
+    if contagens is not None and "TIPO" in contagens.columns:
+        por_tipo = (contagens.dropna(subset=["TIPO"])
+                    .groupby(["PA", "TIPO"])["QUANTIDADE"].sum()
+                    .unstack(fill_value=0)
+                    .reset_index())
+        resumo = resumo.merge(por_tipo, on="PA", how="left")
+        colunas_tipo = [col for col in resumo.columns if col not in ("PA", "REGISTROS")]
+        resumo[colunas_tipo] = resumo[colunas_tipo].fillna(0).astype("int64")
+
+    total = resumo.drop(columns="PA").sum()
+    resumo.loc[len(resumo)] = ["TOTAL", *total.tolist()]
+    return resumo
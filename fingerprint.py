@@ -0,0 +1,179 @@
+"""
+Módulo de impressões digitais das saídas: conteúdo da entrada, configuração e versão do código
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+import config
+from run_manifest import caminho_temporario, publicar, checksum
+
+# Configurações que mudam o conteúdo dos XLSX exportados (PREFIXOS entra por PA)
+CONFIG_EXPORTACAO = ["COLUNAS_REMOVER", "TIPOS_DESCONSIDERAR", "COLUNAS_CODIGO", "COLUNAS_TEXTO", "ENCODING_CSV",
+                     "LIMITE_LINHAS_ABA", "FRAGMENTACAO_EXCEL", "CHAVE_DEDUPLICACAO",
+                     "INCLUIR_ABA_RESUMO", "ABA_RESUMO"]
+
+# Configurações que mudam só os agregados (checkpoint da execução inteira)
+CONFIG_AGREGADOS = ["HISTORICO_ATIVO", "JANELA_TEMPORAL_DIAS", "ANOMALIA_DIMENSOES", "ANOMALIA_METODO",
+                    "ANOMALIA_JANELA_DIAS", "ANOMALIA_LIMIAR", "ANOMALIA_MINIMO_ALERTAS",
+                    "ANOMALIA_HISTORICO_MINIMO", "ANOMALIA_TOP", "MAPA_HORARIO", "HOTSPOTS_ATIVO",
+                    "HOTSPOT_COLUNAS", "HOTSPOT_RESOLUCAO"]
+
+# Configurações do desenho do relatório (os agregados entram pelo conteúdo)
+CONFIG_RELATORIO = ["TIPOS_DESCONSIDERAR", "PDF_TAMANHO_PAGINA", "PDF_DPI_RASTER", "PDF_LIMITE_VETORIAL"]
+
+# Módulos cujo código decide o conteúdo de cada saída
+MODULOS_EXPORTACAO = ("backends", "source_reader", "deduplicator", "data_processor", "pipeline",
+                      "excel_writer", "run_filters")
+MODULOS_AGREGADOS = ("aggregate_store", "anomaly_detector", "hotspots", "driver_ranking")
+MODULOS_RELATORIO = ("chart_generator", "styles", "driver_ranking")
+
+ARQUIVO_REGISTRO_SAIDAS = ".impressoes_saidas.json"  # na pasta de cada saída reaproveitável
+
+_cache_entrada: Dict[Tuple[str, int, int], str] = {}
+_lock_registro = threading.Lock()
+
+
+def _serializar(valor):
+    # Conjuntos não têm ordem: a mesma configuração precisa dar o mesmo texto
+    if isinstance(valor, (set, frozenset)):
+        return sorted(valor, key=str)
+    if isinstance(valor, tuple):
+        return list(valor)
+    return str(valor)
+
+
+def resumir(*partes) -> str:
+    """SHA-256 de valores serializáveis em JSON (conjuntos ordenados, chaves ordenadas)"""
+    texto = json.dumps(partes, sort_keys=True, default=_serializar, ensure_ascii=False)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def impressao_entrada(filepath: str) -> str:
+    """SHA-256 do conteúdo do arquivo de origem (calculado uma vez por tamanho/mtime no processo)"""
+    status = os.stat(filepath)
+    chave = (os.path.abspath(filepath), status.st_size, status.st_mtime_ns)
+    if chave not in _cache_entrada:
+        _cache_entrada[chave] = checksum(filepath)
+    return _cache_entrada[chave]
+
+
+@lru_cache(maxsize=None)
+def versao_codigo(modulos: Tuple[str, ...]) -> str:
+    """
+    Impressão do código-fonte dos módulos indicados
+
+    No executável empacotado não há fontes: vale a identificação do próprio
+    executável (tamanho e data), que só muda com um novo build.
+    """
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    partes = []
+    for modulo in modulos:
+        caminho = os.path.join(pasta, f"{modulo}.py")
+        if os.path.exists(caminho):
+            partes.append((modulo, checksum(caminho)))
+        else:
+            status = os.stat(sys.executable)
+            partes.append((modulo, status.st_size, status.st_mtime_ns))
+    return resumir(partes)
+
+
+def valores_config(nomes) -> Dict:
+    return {nome: getattr(config, nome, None) for nome in nomes}
+
+
+class ImpressaoExecucao:
+    """
+    Classe responsável pelas impressões digitais de uma execução sobre um arquivo
+
+    Cada PA tem a sua: conteúdo da entrada + configuração de exportação +
+    filtro da execução + os prefixos do próprio PA + versão do código. Mudar
+    os prefixos de um PA invalida só as saídas dele. Os nomes dos arquivos
+    exportados carregam a impressão, então a mesma entrada com a mesma
+    configuração sempre cai no mesmo nome em vez de acumular cópias com
+    carimbo de hora (e execuções com filtros diferentes não se sobrescrevem).
+    """
+
+    def __init__(self, filepath: str, modo_exportacao: str, deduplicar: bool,
+                 entre_execucoes: Optional[bool] = None, filtro=None):
+        if entre_execucoes is None:
+            entre_execucoes = config.DEDUPLICAR_ENTRE_EXECUCOES
+        self.entrada = impressao_entrada(filepath)
+        self.base = resumir(self.entrada, versao_codigo(MODULOS_EXPORTACAO), valores_config(CONFIG_EXPORTACAO),
+                            modo_exportacao, bool(deduplicar), bool(deduplicar and entre_execucoes),
+                            filtro.chave() if filtro is not None and filtro.ativo else None)
+        self.particoes = {pa: resumir(self.base, pa, prefixos) for pa, prefixos in config.PREFIXOS.items()}
+        self.workbook = resumir(self.base, config.PREFIXOS)
+        self.execucao = resumir(self.workbook, versao_codigo(MODULOS_AGREGADOS), valores_config(CONFIG_AGREGADOS))
+
+    def nome_particao(self, pa: str) -> str:
+        return f"veiculos_{pa.lower()}_filtrado_{self.particoes[pa][:12]}.xlsx"
+
+    def nome_workbook(self) -> str:
+        return f"veiculos_filtrados_{self.workbook[:12]}.xlsx"
+
+
+def impressao_agregados(agregados: dict) -> str:
+    """
+    Impressão do conteúdo dos agregados (DataFrames pelo hash de linhas do pandas)
+
+    Objetos sem conteúdo estável (ex.: o esboço do ranking) devem ser
+    trocados pelo seu resultado antes de chegar aqui.
+    """
+    sha = hashlib.sha256()
+
+    def atualizar(chave: str, valor):
+        sha.update(chave.encode("utf-8"))
+        if isinstance(valor, pd.DataFrame):
+            sha.update(resumir(list(map(str, valor.columns)), list(map(str, valor.dtypes))).encode("ascii"))
+            sha.update(pd.util.hash_pandas_object(valor, index=False).to_numpy().tobytes())
+        elif isinstance(valor, dict):
+            for subchave in sorted(valor, key=str):
+                atualizar(f"{chave}.{subchave}", valor[subchave])
+        else:
+            sha.update(resumir(valor).encode("ascii"))
+
+    for chave in sorted(agregados):
+        atualizar(chave, agregados[chave])
+    return sha.hexdigest()
+
+
+def _caminho_registro(caminho: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(caminho)), ARQUIVO_REGISTRO_SAIDAS)
+
+
+def _ler_registro(caminho_registro: str) -> Dict:
+    try:
+        with open(caminho_registro, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def saida_reaproveitavel(caminho: str, impressao: str) -> bool:
+    """True se ``caminho`` foi gerado com a mesma impressão e não foi alterado desde então"""
+    with _lock_registro:
+        registro = _ler_registro(_caminho_registro(caminho)).get(os.path.basename(caminho))
+    if not registro or registro.get("impressao") != impressao or not os.path.exists(caminho):
+        return False
+    return checksum(caminho) == registro.get("sha256")
+
+
+def registrar_saida(caminho: str, impressao: str):
+    """Anota a impressão de uma saída recém-publicada no registro da pasta dela"""
+    caminho_registro = _caminho_registro(caminho)
+    soma = checksum(caminho)
+    with _lock_registro:
+        registro = _ler_registro(caminho_registro)
+        registro[os.path.basename(caminho)] = {"impressao": impressao, "sha256": soma}
+        temporario = caminho_temporario(caminho_registro)
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(registro, arquivo, ensure_ascii=False, indent=2)
+        publicar(temporario, caminho_registro)
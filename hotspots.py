@@ -0,0 +1,87 @@
+"""
+Módulo de pontos críticos: contagem de alertas por célula de grade (LATITUDE/LONGITUDE)
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import PREFIXOS, TIPOS_DESCONSIDERAR, HOTSPOT_COLUNAS, HOTSPOT_RESOLUCAO
+
+CHAVES_HOTSPOT = ["PA", "TIPO", "CELULA_LAT", "CELULA_LON"]
+
+
+def _coordenada(serie: pd.Series) -> pd.Series:
+    """Coordenada numérica; exportações com vírgula decimal também são aceitas"""
+    if serie.dtype == object:
+        serie = serie.str.replace(",", ".", regex=False)
+    return pd.to_numeric(serie, errors="coerce")
+
+
+def contar_hotspots(df: pd.DataFrame, resolucao: float = HOTSPOT_RESOLUCAO) -> Optional[pd.DataFrame]:
+    """
+    Conta alertas por PA, TIPO e célula da grade
+
+    A célula é a chave inteira ``floor(coordenada / resolucao)`` em cada eixo:
+    não depende dos limites dos dados, então blocos diferentes somam direto e
+    o tamanho do resultado é limitado pelas células ocupadas, não pelas linhas.
+
+    Args:
+        df: Registros com PREFIXO, as colunas de coordenadas e, se houver, TIPO
+        resolucao: Lado da célula em graus
+
+    Returns:
+        DataFrame com PA, TIPO, CELULA_LAT, CELULA_LON e QUANTIDADE, ou None
+        se o arquivo não tiver coordenadas
+    """
+    coluna_lat, coluna_lon = HOTSPOT_COLUNAS
+    if coluna_lat not in df.columns or coluna_lon not in df.columns:
+        return None
+
+    mapa_pa = {prefixo: pa for pa, prefixos in PREFIXOS.items() for prefixo in prefixos}
+    pas = df["PREFIXO"].astype(object).map(mapa_pa)
+    tipos = df["TIPO"].astype(object) if "TIPO" in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+    lat = _coordenada(df[coluna_lat])
+    lon = _coordenada(df[coluna_lon])
+    validos = (pas.notna() & ~tipos.isin(TIPOS_DESCONSIDERAR) & lat.between(-90, 90)
+               & lon.between(-180, 180) & ~((lat == 0) & (lon == 0))).to_numpy()
+
+    celulas = pd.DataFrame({
+        "PA": pas.to_numpy()[validos],
+        "TIPO": tipos.to_numpy()[validos],
+        "CELULA_LAT": np.floor(lat.to_numpy()[validos] / resolucao).astype("int64"),
+        "CELULA_LON": np.floor(lon.to_numpy()[validos] / resolucao).astype("int64"),
+    })
+    return celulas.groupby(CHAVES_HOTSPOT, dropna=False).size().reset_index(name="QUANTIDADE")
+
+
+class AcumuladorHotspots:
+    """Soma as contagens por célula bloco a bloco (memória limitada às células ocupadas)"""
+
+    def __init__(self, resolucao: float = HOTSPOT_RESOLUCAO):
+        self.resolucao = resolucao
+        self.contagens: Optional[pd.DataFrame] = None
+
+    def atualizar(self, parcial: Optional[pd.DataFrame]):
+        if parcial is None or parcial.empty:
+            return
+        if self.contagens is not None:
+            parcial = pd.concat([self.contagens, parcial], ignore_index=True)
+            parcial = parcial.groupby(CHAVES_HOTSPOT, dropna=False)["QUANTIDADE"].sum().reset_index()
+        self.contagens = parcial
+
+    def resultado(self) -> Optional[pd.DataFrame]:
+        return finalizar_hotspots(self.contagens, self.resolucao)
+
+
+def finalizar_hotspots(contagens: Optional[pd.DataFrame],
+                       resolucao: float = HOTSPOT_RESOLUCAO) -> Optional[pd.DataFrame]:
+    """Acrescenta LATITUDE/LONGITUDE do centro de cada célula (formato de ``agregados["hotspots"]``)"""
+    if contagens is None or contagens.empty:
+        return None
+    return contagens.assign(
+        LATITUDE=(contagens["CELULA_LAT"] + 0.5) * resolucao,
+        LONGITUDE=(contagens["CELULA_LON"] + 0.5) * resolucao,
+    )
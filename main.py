@@ -1,8 +1,83 @@
-from ui_components import ProcessadorUI
+import argparse
+import multiprocessing
+
+from config import SERVICO_HOST, SERVICO_PORTA, SERVICO_WORKERS
+
+
+def filtro_da_linha_de_comando(args):
+    # Import tardio: pandas só é carregado nos modos que processam arquivos
+    from run_filters import FiltroExecucao
+    return FiltroExecucao.da_configuracao(
+        ultimos_dias=args.ultimos_dias,
+        data_inicio=args.desde,
+        data_fim=args.ate,
+        tipos_incluir=args.tipos,
+        tipos_excluir=args.excluir_tipos,
+        prefixos=args.prefixos,
+        motoristas=args.motoristas,
+    )
+
 
 def main():
-    app = ProcessadorUI()
+    parser = argparse.ArgumentParser(description="Processador de Dados de Alertas")
+    parser.add_argument("--servico", action="store_true",
+                        help="Sobe o serviço HTTP local em vez da interface gráfica")
+    parser.add_argument("--host", default=SERVICO_HOST)
+    parser.add_argument("--porta", type=int, default=SERVICO_PORTA)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--pasta-jobs", default=None)
+    parser.add_argument("--observar", nargs="+", metavar="PASTA",
+                        help="Processa automaticamente as exportações que chegarem nas pastas")
+    parser.add_argument("--retomar", metavar="ARQUIVO",
+                        help="Retoma uma execução interrompida, refazendo só o que falta")
+    parser.add_argument("--relatorios-entidade", metavar="ARQUIVO",
+                        help="Gera uma página de relatório por motorista, prefixo ou PA do arquivo")
+    parser.add_argument("--dimensao", choices=("MOTORISTA", "PREFIXO", "PA"), default=None,
+                        help="Entidade dos relatórios em lote (padrão: config)")
+    parser.add_argument("--saida-entidades", choices=("pdf_indexado", "arquivos"), default=None,
+                        help="Um PDF com índice ou um PNG por entidade (padrão: config)")
+    parser.add_argument("--forcar", action="store_true",
+                        help="Refaz exportações e relatórios mesmo se nada mudou (--retomar, --relatorios-entidade)")
+    filtros = parser.add_argument_group("filtros da execução (todos os modos; padrão: config)")
+    filtros.add_argument("--desde", metavar="AAAA-MM-DD", default=None, help="Primeiro dia considerado")
+    filtros.add_argument("--ate", metavar="AAAA-MM-DD", default=None, help="Último dia considerado")
+    filtros.add_argument("--ultimos-dias", type=int, metavar="N", default=None,
+                         help="Só hoje e os N - 1 dias anteriores (sem --desde)")
+    filtros.add_argument("--tipos", metavar="TIPO,...", default=None, help="Só estes TIPOs")
+    filtros.add_argument("--excluir-tipos", metavar="TIPO,...", default=None,
+                         help="TIPOs descartados, além de TIPOS_DESCONSIDERAR")
+    filtros.add_argument("--prefixos", metavar="PREFIXO,...", default=None, help="Só estes prefixos")
+    filtros.add_argument("--motoristas", metavar="NOME,...", default=None, help="Só estes motoristas")
+    args = parser.parse_args()
+
+    if args.servico:
+        # Import tardio: o modo serviço roda sem CustomTkinter/display
+        from service import iniciar_servico
+        iniciar_servico(args.host, args.porta, args.workers or SERVICO_WORKERS, args.pasta_jobs,
+                        criar_filtro=lambda: filtro_da_linha_de_comando(args))
+        return
+
+    if args.retomar:
+        from run_manifest import retomar_execucao
+        retomar_execucao(args.retomar, forcar=args.forcar, filtro=filtro_da_linha_de_comando(args))
+        return
+
+    if args.relatorios_entidade:
+        from entity_reports import gerar_relatorios_entidades
+        gerar_relatorios_entidades(args.relatorios_entidade, args.dimensao, args.saida_entidades,
+                                   forcar=args.forcar, filtro=filtro_da_linha_de_comando(args))
+        return
+
+    if args.observar:
+        from watcher import iniciar_observador
+        iniciar_observador(args.observar, args.workers, criar_filtro=lambda: filtro_da_linha_de_comando(args))
+        return
+
+    from ui_components import ProcessadorUI
+    app = ProcessadorUI(criar_filtro=lambda: filtro_da_linha_de_comando(args))
     app.executar()
 
 if __name__ == "__main__":
+    # No executável empacotado os workers dos pools de processos não podem rodar a interface de novo
+    multiprocessing.freeze_support()
     main()
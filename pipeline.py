@@ -0,0 +1,379 @@
+"""
+Módulo do pipeline em estágios: leitor → particionador → escritores → agregador
+"""
+
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from config import (PREFIXOS, ENCODING_CSV, PASTA_EXPORTADOS, PIPELINE_TAMANHO_CHUNK,
+                    PIPELINE_FILA_MAXIMA, PIPELINE_INTERVALO_AMOSTRAGEM, MODO_EXPORTACAO_PADRAO,
+                    INCLUIR_ABA_RESUMO, ABA_RESUMO, HOTSPOTS_ATIVO)
+from backends import AcumuladorParciais, PandasBackend, combinar_parciais, detectar_separador
+from source_reader import abrir_fonte
+from deduplicator import Deduplicador
+from hotspots import AcumuladorHotspots
+from excel_writer import StreamingExcelWriter, montar_resumo
+from resultado import ResultadoProcessamento
+
+# Marca de fim de fluxo entre estágios
+_FIM = object()
+
+
+class InstrumentacaoFilas:
+    """Amostra periodicamente a profundidade de cada fila do pipeline"""
+
+    def __init__(self, filas: Dict[str, queue.Queue], intervalo: float = PIPELINE_INTERVALO_AMOSTRAGEM):
+        self.filas = filas
+        self.intervalo = intervalo
+        self.maximas = {nome: 0 for nome in filas}
+        self.somas = {nome: 0 for nome in filas}
+        self.amostras = 0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name="instrumentacao", daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def profundidades(self) -> Dict[str, int]:
+        """Profundidade atual de cada fila"""
+        return {nome: fila.qsize() for nome, fila in self.filas.items()}
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            for nome, tamanho in self.profundidades().items():
+                self.maximas[nome] = max(self.maximas[nome], tamanho)
+                self.somas[nome] += tamanho
+            self.amostras += 1
+
+    def resumo(self) -> Dict[str, Dict]:
+        """Profundidade máxima e média de cada fila durante a execução"""
+        return {
+            nome: {
+                "capacidade": fila.maxsize,
+                "maxima": self.maximas[nome],
+                "media": self.somas[nome] / self.amostras if self.amostras else 0.0,
+            }
+            for nome, fila in self.filas.items()
+        }
+
+
+class PipelineProcessor:
+    """
+    Classe responsável pelo processamento em estágios com filas limitadas
+
+    Cada estágio roda em sua thread: o leitor lê blocos do CSV, o particionador
+    separa cada bloco por PA, um escritor por PA grava o XLSX em streaming e o
+    agregador acumula as contagens do relatório. Assim a gravação do PA1
+    acontece enquanto o próximo bloco é particionado e a agregação corre junto
+    com as exportações.
+
+    No modo ``workbook_unico`` os escritores gravam abas de um mesmo workbook
+    (uma por PA), fechado ao final com a aba de resumo.
+    """
+
+    def __init__(self, tamanho_chunk: int = PIPELINE_TAMANHO_CHUNK,
+                 fila_maxima: int = PIPELINE_FILA_MAXIMA,
+                 modo_exportacao: str = MODO_EXPORTACAO_PADRAO,
+                 deduplicador: Optional[Deduplicador] = None, execucao=None,
+                 concluidos: Optional[Dict[str, List[Dict]]] = None, impressao=None, filtro=None):
+        self.backend = PandasBackend()
+        self.deduplicador = deduplicador
+        # Filtro da execução: linhas de fora são descartadas em cada bloco, antes da deduplicação
+        self.filtro = filtro if filtro is not None and filtro.ativo else None
+        # Manifesto da execução e PAs já exportados (com fragmentos) numa execução anterior
+        self.execucao = execucao
+        self.concluidos = concluidos or {}
+        # Impressões digitais da execução (nomes determinísticos); sem elas, carimbo de hora
+        self.impressao = impressao
+        self.tamanho_chunk = tamanho_chunk
+        self.fila_maxima = fila_maxima
+        self.modo_exportacao = modo_exportacao
+        self.instrumentacao: Optional[InstrumentacaoFilas] = None
+
+    def profundidades(self) -> Dict[str, int]:
+        """Profundidade atual das filas (vazio fora de uma execução)"""
+        return self.instrumentacao.profundidades() if self.instrumentacao else {}
+
+    def _colocar(self, fila: queue.Queue, item) -> bool:
+        """Put com contrapressão que desiste se o pipeline for cancelado"""
+        while not self._cancelado.is_set():
+            try:
+                fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _retirar(self, fila: queue.Queue):
+        """Get que devolve o fim de fluxo se o pipeline for cancelado"""
+        while not self._cancelado.is_set():
+            try:
+                return fila.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _FIM
+
+    def _estagio(self, nome: str, funcao: Callable, *args):
+        """Executa um estágio medindo o tempo e cancelando o pipeline em caso de erro"""
+        inicio = time.perf_counter()
+        try:
+            funcao(*args)
+        except Exception as e:
+            print(f"❌ Erro no estágio {nome}: {e}")
+            self._erros.append((nome, e))
+            self._cancelado.set()
+        finally:
+            self._tempos[nome] = time.perf_counter() - inicio
+
+    def _ler(self, filepath: str, saida: queue.Queue, progress_callback: Optional[Callable]):
+        try:
+            with abrir_fonte(filepath) as fonte:
+                leitor = pd.read_csv(fonte.stream, encoding=ENCODING_CSV, sep=detectar_separador(filepath),
+                                     chunksize=self.tamanho_chunk)
+                for chunk in leitor:
+                    if "PREFIXO" not in chunk.columns:
+                        raise KeyError("PREFIXO")
+                    self._registros_lidos += len(chunk)
+                    chunk = self.backend.normalizar(chunk)
+                    if self.filtro is not None:
+                        lidas = len(chunk)
+                        chunk = self.filtro.aplicar(chunk)
+                        self._registros_filtrados += lidas - len(chunk)
+                    if self.deduplicador is not None and len(chunk):
+                        chunk = self.deduplicador.aplicar(chunk)
+                    if len(chunk) and not self._colocar(saida, chunk):
+                        return
+
+                    if progress_callback:
+                        try:
+                            progress_callback(fonte.progresso() * 0.95)
+                        except Exception as callback_error:
+                            print(f"⚠️ Erro no callback de progresso: {callback_error}")
+        finally:
+            self._colocar(saida, _FIM)
+
+    def _particionar(self, entrada: queue.Queue, filas_escrita: Dict[str, queue.Queue],
+                     fila_agregador: queue.Queue):
+        try:
+            while True:
+                chunk = self._retirar(entrada)
+                if chunk is _FIM:
+                    return
+                if self._hotspots is not None:
+                    # Antes da partição, que descarta as coordenadas
+                    self._hotspots.atualizar(self.backend.contar_hotspots(chunk))
+                for pa, prefixos in PREFIXOS.items():
+                    particao = self.backend.filtrar_por_prefixo(chunk, prefixos, pa)
+                    if particao.empty:
+                        continue
+                    if pa not in self.concluidos and not self._colocar(filas_escrita[pa], particao):
+                        return
+                    if not self._colocar(fila_agregador, particao):
+                        return
+        finally:
+            for fila in [*filas_escrita.values(), fila_agregador]:
+                self._colocar(fila, _FIM)
+
+    def _nome_saida(self, pa: Optional[str] = None) -> str:
+        """Nome do XLSX do PA (ou do workbook único, sem PA)"""
+        if self.impressao is not None:
+            return self.impressao.nome_particao(pa) if pa else self.impressao.nome_workbook()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:21]
+        return f"veiculos_{pa.lower()}_filtrado_{timestamp}.xlsx" if pa else f"veiculos_filtrados_{timestamp}.xlsx"
+
+    def _escrever(self, pa: str, entrada: queue.Queue, pasta_exportados: str):
+        escritor = None
+        caminho_saida = None
+        falhou = False
+
+        while True:
+            particao = self._retirar(entrada)
+            if particao is _FIM:
+                break
+            if falhou:
+                continue  # Continua drenando para não travar o particionador
+            try:
+                if self._workbook_unico is not None:
+                    self._workbook_unico.escrever(particao, aba=pa)
+                    self._registros_pa[pa] += len(particao)
+                    continue
+                if escritor is None:
+                    caminho_saida = os.path.join(pasta_exportados, self._nome_saida(pa))
+                    if self.execucao is not None:
+                        self.execucao.iniciar_saida(caminho_saida)
+                    escritor = StreamingExcelWriter(caminho_saida)
+                escritor.escrever(particao, particao=pa)
+                self._registros_pa[pa] += len(particao)
+            except Exception as pa_error:
+                print(f"❌ Erro ao processar {pa}: {pa_error}")
+                falhou = True
+
+        if self._workbook_unico is not None and falhou:
+            self._pas_com_falha.add(pa)
+        if escritor is None or self._cancelado.is_set():
+            return
+        if not falhou:
+            try:
+                escritor.fechar()
+                self._arquivos[pa] = escritor.arquivos
+                self._manifestos[pa] = escritor.manifesto
+                if self.execucao is not None:
+                    impressao = self.impressao.particoes[pa] if self.impressao is not None else None
+                    self.execucao.registrar_particao(pa, escritor.manifesto, impressao)
+                print(f"✅ {pa}: {self._registros_pa[pa]} registros salvos")
+                return
+            except Exception as pa_error:
+                print(f"❌ Erro ao processar {pa}: {pa_error}")
+        self._pas_com_falha.add(pa)
+
+    def _agregar(self, entrada: queue.Queue):
+        while True:
+            particao = self._retirar(entrada)
+            if particao is _FIM:
+                return
+            parcial = self.backend.agregar_parcial(particao)
+            # Totais correntes por chave e dia: a memória acompanha o cubo, não o arquivo
+            self._acumulador.adicionar(parcial)
+
+    def processar_arquivo(self, filepath: str, progress_callback: Optional[Callable] = None) -> ResultadoProcessamento:
+        """
+        Processa o arquivo com os estágios sobrepostos
+
+        Args:
+            filepath: Caminho do CSV exportado
+            progress_callback: Recebe o progresso (0 a 1) pela posição de leitura
+
+        Returns:
+            ResultadoProcessamento com os arquivos, os agregados e, em
+            ``estatisticas``, profundidade das filas e tempo de cada estágio
+        """
+        try:
+            print(f"📂 Processando arquivo em pipeline: {os.path.basename(filepath)}")
+
+            pasta_exportados = os.path.join(os.path.dirname(filepath), PASTA_EXPORTADOS)
+            os.makedirs(pasta_exportados, exist_ok=True)
+
+            self._cancelado = threading.Event()
+            self._erros = []
+            self._tempos = {}
+            self._arquivos = {pa: list(dict.fromkeys(fragmento["arquivo"] for fragmento in fragmentos))
+                              for pa, fragmentos in self.concluidos.items()}
+            self._manifestos = dict(self.concluidos)
+            for pa in self.concluidos:
+                print(f"⏭️ {pa}: inalterado, reaproveitando a exportação anterior")
+            self._acumulador = AcumuladorParciais()
+            self._hotspots = AcumuladorHotspots() if HOTSPOTS_ATIVO else None
+            self._pas_com_falha = set()
+            self._registros_lidos = 0
+            self._registros_filtrados = 0
+            self._registros_pa = {pa: 0 for pa in PREFIXOS}
+
+            self._workbook_unico = None
+            if self.modo_exportacao == "workbook_unico":
+                caminho_workbook = os.path.join(pasta_exportados, self._nome_saida())
+                if self.execucao is not None:
+                    self.execucao.iniciar_saida(caminho_workbook)
+                self._workbook_unico = StreamingExcelWriter(caminho_workbook)
+                if INCLUIR_ABA_RESUMO:
+                    self._workbook_unico.reservar_aba(ABA_RESUMO)
+
+            fila_particionador = queue.Queue(maxsize=self.fila_maxima)
+            filas_escrita = {pa: queue.Queue(maxsize=self.fila_maxima) for pa in PREFIXOS}
+            fila_agregador = queue.Queue(maxsize=self.fila_maxima * len(PREFIXOS))
+
+            filas = {"particionador": fila_particionador, "agregador": fila_agregador}
+            filas.update({f"escritor_{pa}": fila for pa, fila in filas_escrita.items()})
+            self.instrumentacao = InstrumentacaoFilas(filas)
+
+            estagios = [
+                ("leitor", self._ler, filepath, fila_particionador, progress_callback),
+                ("particionador", self._particionar, fila_particionador, filas_escrita, fila_agregador),
+                ("agregador", self._agregar, fila_agregador),
+            ]
+            estagios += [(f"escritor_{pa}", self._escrever, pa, fila, pasta_exportados)
+                         for pa, fila in filas_escrita.items()]
+            threads = [threading.Thread(target=self._estagio, args=estagio, name=estagio[0], daemon=True)
+                       for estagio in estagios]
+
+            inicio = time.perf_counter()
+            self.instrumentacao.iniciar()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.instrumentacao.parar()
+            duracao = time.perf_counter() - inicio
+
+            if self._erros:
+                nome, erro = self._erros[0]
+                raise RuntimeError(f"estágio {nome}: {erro}")
+
+            arquivos_gerados = [arquivo for pa in PREFIXOS for arquivo in self._arquivos.get(pa, [])]
+            manifesto = [fragmento for pa in PREFIXOS for fragmento in self._manifestos.get(pa, [])]
+
+            agregados = None
+            if self._acumulador.blocos:
+                agregados = combinar_parciais([self._acumulador.resultado()])
+                hotspots = self._hotspots.resultado() if self._hotspots is not None else None
+                if hotspots is not None:
+                    agregados["hotspots"] = hotspots
+                if self._pas_com_falha:
+                    # O relatório cobre só os PAs efetivamente exportados
+                    agregados = {nome: df[~df["PA"].isin(self._pas_com_falha)]
+                                 for nome, df in agregados.items()}
+
+            if self._workbook_unico is not None:
+                registros_por_pa = {pa: total for pa, total in self._registros_pa.items()
+                                    if total and pa not in self._pas_com_falha}
+                if registros_por_pa:
+                    if INCLUIR_ABA_RESUMO:
+                        contagens = agregados["contagens"] if agregados else None
+                        self._workbook_unico.escrever(montar_resumo(registros_por_pa, contagens), aba=ABA_RESUMO)
+                    self._workbook_unico.fechar()
+                    arquivos_gerados = self._workbook_unico.arquivos
+                    manifesto = self._workbook_unico.manifesto
+                    if self.execucao is not None:
+                        impressao = self.impressao.workbook if self.impressao is not None else None
+                        self.execucao.registrar_fragmentos(manifesto, impressao)
+                    for pa, total in registros_por_pa.items():
+                        print(f"✅ {pa}: {total} registros salvos na aba {pa}")
+
+            estatisticas = {
+                "registros_lidos": self._registros_lidos,
+                "duracao": duracao,
+                "tempos": dict(self._tempos),
+                "filas": self.instrumentacao.resumo(),
+            }
+            if self.filtro is not None:
+                estatisticas["registros_filtrados"] = self._registros_filtrados
+                print(f"🔎 Filtro ({self.filtro.descricao()}): {self._registros_filtrados} registros descartados")
+            if self.deduplicador is not None:
+                self.deduplicador.salvar()
+                estatisticas["duplicados_removidos"] = self.deduplicador.removidos
+                print(f"🧹 Duplicados removidos: {self.deduplicador.removidos}")
+            print(f"📊 Dados carregados: {self._registros_lidos} registros em {duracao:.1f}s")
+            for nome, dados in estatisticas["filas"].items():
+                print(f"   📦 fila {nome}: máx {dados['maxima']}/{dados['capacidade']}, média {dados['media']:.1f}")
+
+            if progress_callback:
+                try:
+                    progress_callback(1.0)
+                except Exception as callback_error:
+                    print(f"⚠️ Erro no callback de progresso: {callback_error}")
+
+            print(f"🎉 Processamento concluído! {len(arquivos_gerados)} arquivos gerados")
+            return ResultadoProcessamento(arquivos_gerados, agregados, estatisticas, manifesto)
+
+        except Exception as e:
+            print(f"❌ Erro geral no processamento: {e}")
+            return ResultadoProcessamento()
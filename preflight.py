@@ -0,0 +1,147 @@
+"""
+Módulo de verificação prévia: esquema, tamanho e escolha da estratégia de execução
+"""
+
+import csv
+import mmap
+import os
+from typing import Dict, Optional
+
+import pandas as pd
+
+from config import (ENCODING_CSV, PREFIXOS, PIPELINE_FILA_MAXIMA, PREFLIGHT_LINHAS_AMOSTRA,
+                    PREFLIGHT_FRACAO_MEMORIA, PREFLIGHT_FATOR_MEMORIA, PREFLIGHT_LINHAS_POLARS)
+from backends import detectar_coluna_data, detectar_separador
+from source_reader import abrir_fonte, e_compactado
+
+try:
+    import psutil
+except ImportError:  # Sem psutil a RAM livre vem do sysconf (Linux/macOS)
+    psutil = None
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+try:
+    import polars
+except ImportError:
+    polars = None
+
+
+class ErroEsquema(ValueError):
+    """Arquivo sem as colunas mínimas para o processamento"""
+
+
+def memoria_disponivel() -> Optional[int]:
+    """RAM livre em bytes, ou None quando não dá para medir"""
+    if psutil is not None:
+        return psutil.virtual_memory().available
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def contar_linhas(filepath: str, bloco: int = 1 << 24) -> int:
+    """Conta quebras de linha varrendo o arquivo mapeado em memória (sem parsear CSV)"""
+    with open(filepath, "rb") as arquivo:
+        if os.fstat(arquivo.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            total = 0
+            for inicio in range(0, len(mapa), bloco):
+                total += mapa[inicio:inicio + bloco].count(b"\n")
+            if mapa[-1:] != b"\n":
+                total += 1  # última linha sem quebra
+    return total
+
+
+def verificar_arquivo(filepath: str, linhas_amostra: int = PREFLIGHT_LINHAS_AMOSTRA) -> Dict:
+    """
+    Lê só o cabeçalho e uma amostra, valida o esquema e escolhe a estratégia
+
+    Args:
+        filepath: Caminho do CSV exportado (simples ou compactado)
+        linhas_amostra: Linhas lidas para estimar bytes e memória por registro
+
+    Returns:
+        Dict com colunas, linhas estimadas, memória estimada/disponível, ``modo``
+        ("memoria" ou "pipeline"), ``backend`` do modo em memória ("pandas" ou
+        "polars", usado com ``BACKEND_PADRAO = "auto"``), ``tamanho_chunk`` e
+        ``motor_relatorio`` ("duckdb" quando nem a estimativa cabe na RAM livre)
+
+    Raises:
+        ErroEsquema: Se faltar a coluna PREFIXO ou o arquivo estiver vazio
+    """
+    try:
+        separador = detectar_separador(filepath)
+        with abrir_fonte(filepath) as fonte:
+            amostra = pd.read_csv(fonte.stream, encoding=ENCODING_CSV, sep=separador, nrows=linhas_amostra)
+            consumido = fonte.bruto.tell()
+    except (pd.errors.EmptyDataError, csv.Error):
+        raise ErroEsquema("Arquivo vazio ou sem cabeçalho reconhecível")
+
+    if "PREFIXO" not in amostra.columns:
+        raise ErroEsquema(f"Coluna PREFIXO não encontrada. Colunas do arquivo: {', '.join(map(str, amostra.columns))}")
+    if amostra.empty:
+        raise ErroEsquema("Arquivo sem registros")
+    avisos = [f"Coluna {col} não encontrada: o painel correspondente ficará vazio"
+              for col in ("TIPO", "MOTORISTA") if col not in amostra.columns]
+    if detectar_coluna_data(amostra.columns) is None:
+        avisos.append("Nenhuma coluna de data: a análise temporal será simulada")
+
+    tamanho = os.path.getsize(filepath)
+    if len(amostra) < linhas_amostra:
+        linhas = len(amostra)
+    elif e_compactado(filepath):
+        # Sem descompactar tudo: extrapola pelos bytes compactados consumidos pela amostra
+        linhas = int(tamanho / max(consumido, 1) * len(amostra))
+    else:
+        linhas = max(contar_linhas(filepath) - 1, 0)
+
+    bytes_por_linha = amostra.memory_usage(deep=True).sum() / len(amostra)
+    memoria_estimada = int(bytes_por_linha * linhas * PREFLIGHT_FATOR_MEMORIA)
+    disponivel = memoria_disponivel()
+    limite = disponivel * PREFLIGHT_FRACAO_MEMORIA if disponivel else None
+
+    modo = "memoria" if limite is None or memoria_estimada <= limite else "pipeline"
+
+    # Arquivo grande que ainda cabe na memória: scan com predicado e groupbys multi-thread do Polars
+    # (o pipeline lê em blocos com o pandas; o DuckDB agrega, mas não exporta as partições)
+    backend = "polars" if polars is not None and modo == "memoria" and linhas >= PREFLIGHT_LINHAS_POLARS else "pandas"
+
+    # Blocos em voo no pipeline: fila do particionador + uma fila por PA + fila do agregador
+    blocos_em_voo = PIPELINE_FILA_MAXIMA * (len(PREFIXOS) + 2)
+    orcamento = limite if limite else 1 << 30
+    tamanho_chunk = int(orcamento / blocos_em_voo / max(bytes_por_linha, 1))
+    tamanho_chunk = min(max(tamanho_chunk, 10_000), 1_000_000)
+
+    # Nem em blocos cabe o arquivo inteiro em RAM: o relatório agrega fora da memória
+    motor_relatorio = None
+    if disponivel and memoria_estimada > disponivel and duckdb is not None:
+        motor_relatorio = "duckdb"
+
+    return {
+        "colunas": list(amostra.columns),
+        "separador": separador,
+        "linhas_estimadas": linhas,
+        "bytes_por_linha": float(bytes_por_linha),
+        "memoria_estimada": memoria_estimada,
+        "memoria_disponivel": disponivel,
+        "modo": modo,
+        "backend": backend,
+        "tamanho_chunk": tamanho_chunk,
+        "motor_relatorio": motor_relatorio,
+        "avisos": avisos,
+    }
+
+
+def resumo_verificacao(verificacao: Dict) -> str:
+    disponivel = verificacao["memoria_disponivel"]
+    texto_disponivel = f"{disponivel / 2**30:.1f} GB livres" if disponivel else "RAM livre desconhecida"
+    return (f"🔎 Verificação: ~{verificacao['linhas_estimadas']:,} linhas, "
+            f"~{verificacao['memoria_estimada'] / 2**30:.2f} GB em memória ({texto_disponivel}) "
+            f"→ modo {verificacao['modo']}"
+            + (f" ({verificacao['backend']})" if verificacao['modo'] == "memoria" else "")).replace(",", ".")
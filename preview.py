@@ -0,0 +1,136 @@
+"""
+Módulo da prévia rápida do relatório (amostra de reservatório + contagens exatas)
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import PREFIXOS, ENCODING_CSV, PIPELINE_TAMANHO_CHUNK, PREVIA_TAMANHO_AMOSTRA
+from backends import (PandasBackend, detectar_coluna_data, detectar_separador, consolidar_temporal,
+                      temporal_simulado)
+from source_reader import abrir_fonte
+from run_filters import FiltroExecucao
+
+
+class AmostradorPrevia:
+    """
+    Classe responsável pela passada única que alimenta a prévia
+
+    Cada bloco lido é normalizado, filtrado e roteado como no processamento completo.
+    As contagens por PA/TIPO são exatas; o restante (motoristas e datas) vem
+    de uma amostra uniforme de tamanho fixo (reservatório, algoritmo R
+    vetorizado por bloco) e é reescalado para bater com os totais exatos.
+    """
+
+    def __init__(self, tamanho_amostra: int = PREVIA_TAMANHO_AMOSTRA,
+                 tamanho_chunk: int = PIPELINE_TAMANHO_CHUNK, semente: Optional[int] = None,
+                 filtro: Optional[FiltroExecucao] = None):
+        self.tamanho_amostra = tamanho_amostra
+        self.filtro = filtro if filtro is not None else FiltroExecucao.da_configuracao()
+        self.tamanho_chunk = tamanho_chunk
+        self.rng = np.random.default_rng(semente)
+        self.backend = PandasBackend()
+
+    def _colunas_uteis(self, fonte, separador: str):
+        cabecalho = pd.read_csv(fonte.stream, encoding=ENCODING_CSV, sep=separador, nrows=0).columns
+        if "PREFIXO" not in cabecalho:
+            raise KeyError("PREFIXO")
+        coluna_data = detectar_coluna_data(cabecalho)
+        return [col for col in ("PREFIXO", "TIPO", "MOTORISTA", coluna_data) if col in cabecalho]
+
+    def _amostrar(self, reservatorio: Optional[pd.DataFrame], bloco: pd.DataFrame, vistos: int):
+        """Aplica o algoritmo R ao bloco inteiro de uma vez (índice do reservatório = vaga)"""
+        posicoes = np.arange(vistos, vistos + len(bloco))
+        vagas = np.where(posicoes < self.tamanho_amostra, posicoes, self.rng.integers(0, posicoes + 1))
+        aceitos = vagas < self.tamanho_amostra
+        if not aceitos.any():
+            return reservatorio
+
+        # Se duas linhas do bloco caem na mesma vaga, vale a última (como no laço sequencial)
+        linhas = pd.Series(np.flatnonzero(aceitos), index=vagas[aceitos])
+        linhas = linhas[~linhas.index.duplicated(keep="last")]
+        novos = bloco.iloc[linhas.to_numpy()].set_axis(linhas.index)
+        if reservatorio is None:
+            return novos
+        return pd.concat([reservatorio.drop(index=linhas.index, errors="ignore"), novos])
+
+    def coletar(self, filepath: str) -> Dict:
+        """
+        Lê o arquivo uma vez e monta agregados aproximados no formato dos backends
+
+        Returns:
+            Dict com ``contagens``, ``temporal`` e ``previa`` (registros, amostra)
+        """
+        separador = detectar_separador(filepath)
+        with abrir_fonte(filepath) as fonte:
+            colunas = self._colunas_uteis(fonte, separador)
+        chaves_exatas = [col for col in ("PA", "TIPO") if col == "PA" or col in colunas]
+
+        reservatorio = None
+        parciais = []
+        registros = 0
+        with abrir_fonte(filepath) as fonte:
+            leitor = pd.read_csv(fonte.stream, encoding=ENCODING_CSV, sep=separador, usecols=colunas,
+                                 chunksize=self.tamanho_chunk)
+            for chunk in leitor:
+                chunk = self.filtro.aplicar(self.backend.normalizar(chunk))
+                bloco = pd.concat([self.backend.filtrar_por_prefixo(chunk, prefixos, pa)
+                                   for pa, prefixos in PREFIXOS.items()], ignore_index=True)
+                if bloco.empty:
+                    continue
+                parciais.append(bloco.groupby(chaves_exatas, dropna=False, observed=True).size())
+                reservatorio = self._amostrar(reservatorio, bloco, registros)
+                registros += len(bloco)
+
+        if reservatorio is None:
+            raise ValueError("Nenhum registro dos PAs configurados no arquivo")
+
+        exatas = pd.concat(parciais).groupby(level=chaves_exatas, dropna=False).sum()
+        exatas = exatas.rename("QUANTIDADE").reset_index()
+        for coluna in chaves_exatas:
+            exatas[coluna] = exatas[coluna].astype(object)
+        amostra = reservatorio.astype({col: object for col in chaves_exatas})
+
+        return {
+            "contagens": self._estimar_contagens(amostra, exatas, chaves_exatas),
+            "temporal": self._estimar_temporal(amostra, exatas),
+            "previa": {"registros": registros, "amostra": len(amostra)},
+        }
+
+    def _estimar_contagens(self, amostra: pd.DataFrame, exatas: pd.DataFrame, grupos: list) -> pd.DataFrame:
+        """Distribui o total exato de cada PA/TIPO entre os motoristas na proporção da amostra"""
+        if "MOTORISTA" not in amostra.columns:
+            return exatas
+
+        cubo = amostra.groupby([*grupos, "MOTORISTA"], dropna=False).size().rename("AMOSTRA").reset_index()
+        cubo["MOTORISTA"] = cubo["MOTORISTA"].astype(object)
+        total_amostra = cubo.groupby(grupos, dropna=False)["AMOSTRA"].transform("sum")
+        total_exato = cubo[grupos].merge(exatas, on=grupos, how="left")["QUANTIDADE"].to_numpy()
+        cubo["QUANTIDADE"] = np.floor(cubo["AMOSTRA"] * total_exato / total_amostra).astype("int64")
+
+        # O que o arredondamento (ou a amostra) não cobriu fica sem motorista: os totais seguem exatos
+        distribuido = cubo.groupby(grupos, dropna=False)["QUANTIDADE"].sum().rename("DISTRIBUIDO").reset_index()
+        resto = exatas.merge(distribuido, on=grupos, how="left").fillna({"DISTRIBUIDO": 0})
+        resto["QUANTIDADE"] = (resto["QUANTIDADE"] - resto["DISTRIBUIDO"]).astype("int64")
+        resto = resto[resto["QUANTIDADE"] > 0].drop(columns="DISTRIBUIDO").assign(MOTORISTA=None)
+
+        contagens = pd.concat([cubo.drop(columns="AMOSTRA"), resto], ignore_index=True)
+        return contagens[[*grupos, "MOTORISTA", "QUANTIDADE"]]
+
+    def _estimar_temporal(self, amostra: pd.DataFrame, exatas: pd.DataFrame) -> pd.DataFrame:
+        """Série diária da amostra reescalada para o total exato de cada PA"""
+        coluna_data = detectar_coluna_data(amostra.columns)
+        if coluna_data is None:
+            temporal = temporal_simulado(amostra["PA"].astype(object).value_counts())
+        else:
+            contagem_bruta = (amostra.groupby(["PA", coluna_data]).size()
+                              .reset_index(name="QUANTIDADE")
+                              .rename(columns={coluna_data: "BRUTO"}))
+            temporal = consolidar_temporal(contagem_bruta)
+
+        fator = exatas.groupby("PA")["QUANTIDADE"].sum() / amostra.groupby("PA").size()
+        escalado = temporal["QUANTIDADE"] * temporal["PA"].map(fator).fillna(1.0)
+        temporal["QUANTIDADE"] = escalado.round().astype("int64")
+        return temporal
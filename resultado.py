@@ -0,0 +1,22 @@
+"""
+Módulo com o resultado do processamento de um arquivo
+"""
+
+from typing import Optional
+
+
+class ResultadoProcessamento(list):
+    """
+    Lista dos arquivos gerados, com os agregados do relatório e métricas anexados
+
+    ``manifesto`` tem um registro por fragmento exportado (particao, parte,
+    arquivo, aba e linhas), inclusive quando um PA foi dividido por ter
+    passado do limite de linhas do XLSX.
+    """
+
+    def __init__(self, arquivos=(), agregados: Optional[dict] = None,
+                 estatisticas: Optional[dict] = None, manifesto: Optional[list] = None):
+        super().__init__(arquivos)
+        self.agregados = agregados
+        self.estatisticas = estatisticas
+        self.manifesto = manifesto or []
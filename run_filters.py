@@ -0,0 +1,179 @@
+"""
+Módulo dos filtros da execução (período, TIPO, PREFIXO, MOTORISTA) aplicados já na leitura
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import (COLUNAS_CODIGO, FILTRO_DATA_INICIO, FILTRO_DATA_FIM, FILTRO_ULTIMOS_DIAS,
+                    FILTRO_TIPOS_INCLUIR, FILTRO_TIPOS_EXCLUIR, FILTRO_PREFIXOS, FILTRO_MOTORISTAS)
+from backends import detectar_coluna_data
+from preflight import ErroEsquema
+
+
+def _dia(valor) -> Optional[pd.Timestamp]:
+    if valor is None or valor == "":
+        return None
+    return pd.Timestamp(valor).normalize()
+
+
+def _valores(coluna: str, valores: Optional[Iterable[str]]) -> Optional[frozenset]:
+    """Valores do filtro com a mesma limpeza da leitura (trim; códigos em maiúsculas)"""
+    if valores is None:
+        return None
+    if isinstance(valores, str):
+        valores = valores.split(",")
+    limpos = (str(valor).strip() for valor in valores)
+    if coluna in COLUNAS_CODIGO:
+        limpos = (valor.upper() for valor in limpos)
+    return frozenset(valor for valor in limpos if valor)
+
+
+class FiltroExecucao:
+    """
+    Classe responsável pelos filtros de linhas de uma execução
+
+    O filtro é aplicado logo após a normalização, em cada bloco lido (ou no
+    predicado do scan Polars / na consulta DuckDB), antes da deduplicação e
+    da partição: linhas de fora não chegam aos exportados, aos agregados nem
+    ao relatório. Listas de inclusão (``None`` = sem restrição) deixam passar
+    só os valores indicados; TIPOs excluídos somam-se aos de
+    ``TIPOS_DESCONSIDERAR``. O período é inclusivo nos dois extremos e, com
+    ele, linhas sem data reconhecível ficam de fora.
+    """
+
+    def __init__(self, data_inicio=None, data_fim=None, tipos_incluir: Optional[Iterable[str]] = None,
+                 tipos_excluir: Optional[Iterable[str]] = None, prefixos: Optional[Iterable[str]] = None,
+                 motoristas: Optional[Iterable[str]] = None):
+        self.data_inicio = _dia(data_inicio)
+        self.data_fim = _dia(data_fim)
+        if self.data_inicio is not None and self.data_fim is not None and self.data_inicio > self.data_fim:
+            raise ValueError("Filtro de período com início depois do fim")
+        self.tipos_incluir = _valores("TIPO", tipos_incluir)
+        self.tipos_excluir = _valores("TIPO", tipos_excluir) or frozenset()
+        self.prefixos = _valores("PREFIXO", prefixos)
+        self.motoristas = _valores("MOTORISTA", motoristas)
+
+    @classmethod
+    def da_configuracao(cls, ultimos_dias: Optional[int] = None, **valores) -> "FiltroExecucao":
+        """
+        Filtro padrão da configuração (``FILTRO_*``); valores informados (não None) substituem os dela
+
+        ``ultimos_dias`` vale como início do período (hoje e os N - 1 dias
+        anteriores) quando não há ``data_inicio``.
+        """
+        ultimos_dias = ultimos_dias or FILTRO_ULTIMOS_DIAS
+        padrao = {
+            "data_inicio": FILTRO_DATA_INICIO,
+            "data_fim": FILTRO_DATA_FIM,
+            "tipos_incluir": FILTRO_TIPOS_INCLUIR,
+            "tipos_excluir": FILTRO_TIPOS_EXCLUIR,
+            "prefixos": FILTRO_PREFIXOS,
+            "motoristas": FILTRO_MOTORISTAS,
+        }
+        padrao.update({chave: valor for chave, valor in valores.items() if valor is not None})
+        if padrao["data_inicio"] is None and ultimos_dias:
+            padrao["data_inicio"] = pd.Timestamp.now().normalize() - pd.Timedelta(days=ultimos_dias - 1)
+        return cls(**padrao)
+
+    @property
+    def periodo(self) -> bool:
+        return self.data_inicio is not None or self.data_fim is not None
+
+    @property
+    def ativo(self) -> bool:
+        return bool(self.periodo or self.tipos_incluir is not None or self.tipos_excluir
+                    or self.prefixos is not None or self.motoristas is not None)
+
+    def listas(self) -> List[Tuple[str, frozenset, bool]]:
+        """Filtros por valor como (coluna, valores, inclusão), para cada motor traduzir no seu predicado"""
+        listas = []
+        if self.tipos_incluir is not None:
+            listas.append(("TIPO", self.tipos_incluir, True))
+        if self.tipos_excluir:
+            listas.append(("TIPO", self.tipos_excluir, False))
+        if self.prefixos is not None:
+            listas.append(("PREFIXO", self.prefixos, True))
+        if self.motoristas is not None:
+            listas.append(("MOTORISTA", self.motoristas, True))
+        return listas
+
+    def verificar(self, colunas) -> Optional[str]:
+        """
+        Confere se o arquivo tem as colunas usadas pelo filtro
+
+        Returns:
+            Coluna de data usada pelo período (None sem período)
+        """
+        for coluna, _, inclusao in self.listas():
+            # Exclusão de uma coluna ausente não remove nada; inclusão não teria o que manter
+            if inclusao and coluna not in colunas:
+                raise ErroEsquema(f"Filtro por {coluna}, mas o arquivo não tem essa coluna")
+        if not self.periodo:
+            return None
+        coluna_data = detectar_coluna_data(colunas)
+        if coluna_data is None:
+            raise ErroEsquema("Filtro por período, mas o arquivo não tem coluna de data reconhecida")
+        return coluna_data
+
+    def dias_permitidos(self, valores: pd.Series) -> pd.Series:
+        """
+        Valores distintos de data que caem no período
+
+        Como em ``consolidar_temporal``, cada valor distinto é interpretado
+        uma vez só, em vez de ``pd.to_datetime`` sobre a coluna inteira.
+        """
+        distintos = pd.Series(pd.unique(valores.dropna()))
+        datas = pd.to_datetime(distintos, errors="coerce").dt.normalize()
+        dentro = datas.notna()
+        if self.data_inicio is not None:
+            dentro &= datas >= self.data_inicio
+        if self.data_fim is not None:
+            dentro &= datas <= self.data_fim
+        return distintos[dentro]
+
+    def mascara(self, df: pd.DataFrame) -> np.ndarray:
+        """Linhas (já normalizadas) que passam no filtro"""
+        coluna_data = self.verificar(df.columns)
+        mascara = np.ones(len(df), dtype=bool)
+        for coluna, valores, inclusao in self.listas():
+            if coluna not in df.columns:
+                continue
+            presentes = df[coluna].isin(valores).to_numpy()
+            mascara &= presentes if inclusao else ~presentes
+        if coluna_data is not None:
+            mascara &= df[coluna_data].isin(self.dias_permitidos(df[coluna_data])).to_numpy()
+        return mascara
+
+    def aplicar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """DataFrame pandas (bloco ou arquivo inteiro) só com as linhas do filtro"""
+        if not self.ativo:
+            return df
+        mascara = self.mascara(df)
+        return df if mascara.all() else df[mascara]
+
+    def chave(self) -> Dict:
+        """Representação estável do filtro, para as impressões digitais das saídas"""
+        return {
+            "data_inicio": self.data_inicio.strftime("%Y-%m-%d") if self.data_inicio is not None else None,
+            "data_fim": self.data_fim.strftime("%Y-%m-%d") if self.data_fim is not None else None,
+            "tipos_incluir": self.tipos_incluir,
+            "tipos_excluir": self.tipos_excluir,
+            "prefixos": self.prefixos,
+            "motoristas": self.motoristas,
+        }
+
+    def descricao(self) -> str:
+        partes = []
+        if self.periodo:
+            inicio = self.data_inicio.strftime("%d/%m/%Y") if self.data_inicio is not None else "…"
+            fim = self.data_fim.strftime("%d/%m/%Y") if self.data_fim is not None else "…"
+            partes.append(f"período {inicio} a {fim}")
+        nomes = {("TIPO", True): "TIPOs", ("TIPO", False): "sem TIPOs",
+                 ("PREFIXO", True): "prefixos", ("MOTORISTA", True): "motoristas"}
+        for coluna, valores, inclusao in self.listas():
+            amostra = ", ".join(sorted(valores)[:5]) + (" …" if len(valores) > 5 else "")
+            partes.append(f"{nomes[coluna, inclusao]} {amostra}")
+        return "; ".join(partes) if partes else "sem filtro"
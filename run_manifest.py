@@ -0,0 +1,240 @@
+"""
+Módulo do manifesto de execução: etapas concluídas, saídas com checksum e retomada
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import PASTA_EXPORTADOS
+
+
+def caminho_temporario(caminho: str) -> str:
+    """
+    Arquivo temporário ao lado do destino, com a mesma extensão
+
+    O nome começa com ponto (o modo observador ignora) e mantém a extensão
+    porque pandas/openpyxl/matplotlib escolhem o formato por ela.
+    """
+    pasta, nome = os.path.split(caminho)
+    raiz, extensao = os.path.splitext(nome)
+    return os.path.join(pasta, f".{raiz}.parcial{extensao}")
+
+
+def publicar(temporario: str, caminho: str):
+    """Troca atômica: o destino ou não existe ou está completo"""
+    os.replace(temporario, caminho)
+
+
+def checksum(caminho: str, bloco: int = 1 << 20) -> str:
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for parte in iter(lambda: arquivo.read(bloco), b""):
+            sha.update(parte)
+    return sha.hexdigest()
+
+
+class ManifestoExecucao:
+    """
+    Classe responsável pelo registro de uma execução sobre um arquivo de origem
+
+    Guarda em JSON (escrita atômica) as etapas concluídas, os fragmentos
+    exportados de cada PA com o SHA-256 de cada arquivo e um checkpoint dos
+    agregados. Se a origem mudar (conteúdo, quando a impressão digital é
+    informada, ou senão tamanho e data de modificação), o manifesto anterior
+    é descartado.
+    """
+
+    def __init__(self, caminho: str, filepath: str, retomar: bool = False, impressao: Optional[str] = None):
+        self.caminho = caminho
+        self.caminho_agregados = f"{os.path.splitext(caminho)[0]}.agregados.pkl"
+        self.lock = threading.Lock()
+
+        if impressao:
+            origem = {"arquivo": os.path.abspath(filepath), "impressao": impressao}
+        else:
+            status = os.stat(filepath)
+            origem = {"arquivo": os.path.abspath(filepath), "tamanho": status.st_size, "mtime": status.st_mtime}
+        self.dados = {"origem": origem, "etapas": {}, "particoes": {}, "pendentes": []}
+        if retomar and os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as arquivo:
+                anterior = json.load(arquivo)
+            if anterior.get("origem") == origem:
+                self.dados = anterior
+                self._limpar_pendentes()
+            else:
+                print("⚠️ Arquivo de origem mudou desde a execução anterior: nada será reaproveitado")
+
+    def _limpar_pendentes(self):
+        """Apaga os temporários das saídas que a execução interrompida não chegou a publicar"""
+        for caminho in self.dados.get("pendentes", []):
+            pasta, nome = os.path.split(caminho)
+            raiz, extensao = os.path.splitext(nome)
+            # Inclui os fragmentos "_parteN" do mesmo arquivo
+            for temporario in glob.glob(os.path.join(pasta, f".{glob.escape(raiz)}*.parcial{extensao}")):
+                os.remove(temporario)
+        self.dados["pendentes"] = []
+
+    def salvar(self):
+        with self.lock:
+            self.dados["atualizado_em"] = datetime.now().isoformat(timespec="seconds")
+            temporario = caminho_temporario(self.caminho)
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                json.dump(self.dados, arquivo, ensure_ascii=False, indent=2)
+            publicar(temporario, self.caminho)
+
+    def concluir_etapa(self, nome: str, **info):
+        with self.lock:
+            self.dados["etapas"][nome] = {"concluida_em": datetime.now().isoformat(timespec="seconds"), **info}
+        self.salvar()
+
+    def etapa(self, nome: str) -> Optional[Dict]:
+        return self.dados["etapas"].get(nome)
+
+    def iniciar_saida(self, caminho: str):
+        """Anota uma saída em gravação, para a retomada limpar o temporário se ela não terminar"""
+        with self.lock:
+            self.dados.setdefault("pendentes", []).append(caminho)
+        self.salvar()
+
+    def registrar_particao(self, pa: str, fragmentos: List[Dict], impressao: Optional[str] = None):
+        """Marca o PA como exportado, com o checksum de cada arquivo gravado e a impressão do PA"""
+        arquivos = {fragmento["arquivo"] for fragmento in fragmentos}
+        somas = {arquivo: checksum(arquivo) for arquivo in arquivos}
+        with self.lock:
+            self.dados["pendentes"] = [caminho for caminho in self.dados.get("pendentes", [])
+                                       if caminho not in arquivos]
+            self.dados["particoes"][pa] = {
+                "fragmentos": [{**fragmento, "sha256": somas[fragmento["arquivo"]]} for fragmento in fragmentos],
+                "linhas": sum(fragmento["linhas"] for fragmento in fragmentos),
+                "impressao": impressao,
+            }
+        self.salvar()
+
+    def registrar_fragmentos(self, fragmentos: List[Dict], impressao: Optional[str] = None):
+        """Registra fragmentos de várias partições (ex.: workbook único), agrupados por partição"""
+        por_particao: Dict[str, List[Dict]] = {}
+        for fragmento in fragmentos:
+            por_particao.setdefault(fragmento["particao"], []).append(fragmento)
+        for particao, grupo in por_particao.items():
+            self.registrar_particao(particao, grupo, impressao)
+
+    def particao_valida(self, pa: str, impressao: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Fragmentos do PA se todos os arquivos ainda existem com o mesmo conteúdo
+        e, com ``impressao``, se foram gerados com a mesma configuração e código
+        """
+        registro = self.dados["particoes"].get(pa)
+        if not registro:
+            return None
+        if impressao is not None and registro.get("impressao") != impressao:
+            return None
+        somas = {}
+        for fragmento in registro["fragmentos"]:
+            arquivo = fragmento["arquivo"]
+            if arquivo not in somas:
+                somas[arquivo] = checksum(arquivo) if os.path.exists(arquivo) else None
+            if somas[arquivo] != fragmento["sha256"]:
+                return None
+        return [{chave: valor for chave, valor in fragmento.items() if chave != "sha256"}
+                for fragmento in registro["fragmentos"]]
+
+    def particoes_validas(self, impressoes: Optional[Dict[str, str]] = None) -> Dict[str, List[Dict]]:
+        validas = {}
+        for pa in self.dados["particoes"]:
+            if impressoes is not None and pa not in impressoes:
+                continue  # PA que saiu da configuração
+            fragmentos = self.particao_valida(pa, impressoes[pa] if impressoes is not None else None)
+            if fragmentos:
+                validas[pa] = fragmentos
+        return validas
+
+    def salvar_agregados(self, agregados: Optional[dict]):
+        if agregados is None:
+            return
+        temporario = caminho_temporario(self.caminho_agregados)
+        with open(temporario, "wb") as arquivo:
+            pickle.dump(agregados, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        publicar(temporario, self.caminho_agregados)
+        self.concluir_etapa("agregados", sha256=checksum(self.caminho_agregados))
+
+    def carregar_agregados(self) -> Optional[dict]:
+        etapa = self.etapa("agregados")
+        if not etapa or not os.path.exists(self.caminho_agregados):
+            return None
+        if checksum(self.caminho_agregados) != etapa["sha256"]:
+            return None
+        with open(self.caminho_agregados, "rb") as arquivo:
+            return pickle.load(arquivo)
+
+    def resultado_concluido(self, impressao: Optional[str] = None):
+        """
+        Resultado de uma execução já concluída, se todas as saídas conferem
+        (e, com ``impressao``, se a execução registrada teve a mesma)
+
+        Returns:
+            ResultadoProcessamento montado do manifesto ou None se algo falta
+        """
+        from resultado import ResultadoProcessamento
+
+        etapa = self.etapa("exportacao")
+        if not etapa or (impressao is not None and etapa.get("impressao") != impressao):
+            return None
+        validas = self.particoes_validas()
+        if any(particao not in validas for particao in etapa["particoes"]):
+            return None
+        agregados = self.carregar_agregados()
+        if agregados is None:
+            return None
+
+        fragmentos = [fragmento for particao in etapa["particoes"] for fragmento in validas[particao]]
+        arquivos = list(dict.fromkeys(fragmento["arquivo"] for fragmento in fragmentos))
+        estatisticas = {**etapa.get("estatisticas", {}), "retomado": True}
+        return ResultadoProcessamento(arquivos, agregados, estatisticas, fragmentos)
+
+
+def abrir_manifesto(filepath: str, retomar: bool = False, impressao: Optional[str] = None) -> ManifestoExecucao:
+    """
+    Manifesto da execução sobre ``filepath``, na pasta de exportados
+
+    Sem ``retomar`` a execução começa do zero; com ``retomar`` o registro
+    anterior é reaproveitado e os temporários que ela deixou são apagados.
+    ``impressao`` (conteúdo do arquivo) identifica a origem no lugar de
+    tamanho e data de modificação.
+    """
+    pasta_exportados = os.path.join(os.path.dirname(filepath), PASTA_EXPORTADOS)
+    os.makedirs(pasta_exportados, exist_ok=True)
+    nome = os.path.basename(filepath).replace(".", "_")
+    return ManifestoExecucao(os.path.join(pasta_exportados, f"execucao_{nome}.json"), filepath, retomar, impressao)
+
+
+def retomar_execucao(filepath: str, pasta_saida: Optional[str] = None, forcar: bool = False,
+                     filtro=None) -> Optional[str]:
+    """
+    Retoma uma execução interrompida: PAs já exportados (com checksum e
+    impressão conferidos) não são regravados e o relatório só é refeito se
+    faltar ou se os agregados mudaram. ``forcar`` refaz tudo; ``filtro``
+    (padrão: o da configuração) faz parte da impressão.
+
+    Returns:
+        Caminho do relatório ou None se o processamento não gerou arquivos
+    """
+    # Imports tardios: o manifesto é usado pelo próprio processamento
+    from data_processor import DataProcessor
+    from chart_generator import ChartGenerator
+    from preflight import ErroEsquema
+
+    try:
+        resultado = DataProcessor().processar_arquivo(filepath, retomar=True, forcar=forcar, filtro=filtro)
+    except ErroEsquema as e:
+        print(f"❌ Arquivo não processado: {e}")
+        return None
+    if not resultado:
+        return None
+    return ChartGenerator().gerar_graficos(resultado, agregados=resultado.agregados,
+                                           pasta_saida=pasta_saida, abrir=False, forcar=forcar)
@@ -0,0 +1,363 @@
+"""
+Modo serviço: expõe o pipeline DataProcessor + ChartGenerator via HTTP local
+
+Endpoints:
+    POST /jobs?nome=arquivo.csv      envia o CSV (corpo bruto, gravado em disco em streaming)
+    GET  /jobs/<id>                  status do job em JSON
+    GET  /jobs/<id>/arquivos/<nome>  download de um arquivo de PA ou do relatório
+    DELETE /jobs/<id>                descarta um job concluído (ou com erro) e seus arquivos
+    GET  /saude                      workers, fila e capacidade
+
+Jobs concluídos ou com erro expiram após ``SERVICO_EXPIRACAO_JOBS`` segundos.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse, parse_qs
+
+from config import (SERVICO_HOST, SERVICO_PORTA, SERVICO_WORKERS, SERVICO_FILA_MAXIMA,
+                    SERVICO_PASTA_JOBS, SERVICO_TAMANHO_BLOCO, SERVICO_EXPIRACAO_JOBS)
+
+# Estado de cada processo worker (criado uma vez pelo initializer)
+_processor = None
+_chart_generator = None
+
+
+def aquecer_worker():
+    """Importa pandas/matplotlib e instancia o pipeline uma vez por worker"""
+    global _processor, _chart_generator
+    from data_processor import DataProcessor
+    from chart_generator import ChartGenerator
+
+    _processor = DataProcessor()
+    _chart_generator = ChartGenerator()
+
+
+def executar_job(caminho_csv: str, pasta_job: str, filtro=None) -> Dict:
+    """Roda o pipeline completo em um worker e devolve os arquivos gerados"""
+    arquivos = _processor.processar_arquivo(caminho_csv, filtro=filtro)
+    if not arquivos:
+        raise RuntimeError("Nenhum arquivo foi gerado")
+
+    relatorio = _chart_generator.gerar_graficos(
+        arquivos,
+        agregados=getattr(arquivos, "agregados", None),
+        pasta_saida=pasta_job,
+        abrir=False
+    )
+    return {"arquivos": list(arquivos), "relatorio": relatorio}
+
+
+class GerenciadorJobs:
+    """Classe responsável pela fila de jobs, pelo pool de workers e pela contrapressão"""
+
+    def __init__(self, pasta_base: str, workers: int = SERVICO_WORKERS,
+                 fila_maxima: int = SERVICO_FILA_MAXIMA, expiracao: float = SERVICO_EXPIRACAO_JOBS,
+                 criar_filtro: Optional[Callable] = None):
+        self.pasta_base = pasta_base
+        # Filtro da execução montado a cada job ("últimos N dias" anda junto com o serviço no ar)
+        self.criar_filtro = criar_filtro
+        os.makedirs(pasta_base, exist_ok=True)
+
+        self.workers = workers
+        self.pool = self._criar_pool()
+        # Dispara os workers já na subida para que os imports pesados não caiam no primeiro job
+        for future in [self.pool.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+        self.fila_maxima = fila_maxima
+        self.expiracao = expiracao
+        self.vagas = threading.BoundedSemaphore(fila_maxima)
+        self.jobs: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self.lock_pool = threading.Lock()
+
+    def _criar_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=aquecer_worker)
+
+    def _recriar_pool(self, quebrado: ProcessPoolExecutor):
+        """
+        Troca o pool depois que um worker morreu (o ProcessPoolExecutor fica
+        quebrado para sempre); só o primeiro a perceber troca
+        """
+        with self.lock_pool:
+            if self.pool is not quebrado:
+                return
+            print("⚠️ Worker do serviço encerrado de forma inesperada: recriando o pool")
+            self.pool = self._criar_pool()
+        quebrado.shutdown(wait=False, cancel_futures=True)
+
+    def reservar_vaga(self) -> bool:
+        """Reserva uma vaga na fila sem bloquear; False significa fila cheia"""
+        return self.vagas.acquire(blocking=False)
+
+    def liberar_vaga(self):
+        self.vagas.release()
+
+    def criar_job(self, nome_arquivo: str) -> Dict:
+        job_id = uuid.uuid4().hex
+        pasta_job = os.path.join(self.pasta_base, job_id)
+        os.makedirs(pasta_job)
+        job = {
+            "id": job_id,
+            "status": "recebendo",
+            "arquivo": nome_arquivo,
+            "pasta": pasta_job,
+            "criado_em": datetime.now().isoformat(timespec="seconds"),
+            "arquivos": {},
+            "erro": None,
+            "future": None,
+            "finalizado_em": None,
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+        return job
+
+    def descartar_job(self, job: Dict):
+        with self.lock:
+            self.jobs.pop(job["id"], None)
+        shutil.rmtree(job["pasta"], ignore_errors=True)
+
+    def remover_job(self, job_id: str) -> Optional[bool]:
+        """Descarta um job finalizado; None se não existe, False se ainda está em andamento"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job["finalizado_em"] is None:
+                return False
+        self.descartar_job(job)
+        return True
+
+    def expirar_jobs(self):
+        """Descarta (registro e pasta) os jobs finalizados há mais de ``expiracao`` segundos"""
+        limite = time.monotonic() - self.expiracao
+        with self.lock:
+            expirados = [job for job in self.jobs.values()
+                         if job["finalizado_em"] is not None and job["finalizado_em"] < limite]
+        for job in expirados:
+            self.descartar_job(job)
+
+    def enfileirar(self, job: Dict, caminho_csv: str):
+        job["status"] = "na_fila"
+        pool = self.pool
+        try:
+            filtro = self.criar_filtro() if self.criar_filtro else None
+            try:
+                future = pool.submit(executar_job, caminho_csv, job["pasta"], filtro)
+            except BrokenProcessPool:
+                self._recriar_pool(pool)
+                pool = self.pool
+                future = pool.submit(executar_job, caminho_csv, job["pasta"], filtro)
+        except Exception as e:
+            with self.lock:
+                job["erro"] = f"Falha ao enfileirar: {e}"
+                job["status"] = "erro"
+                job["finalizado_em"] = time.monotonic()
+            self.liberar_vaga()
+            return
+        job["future"] = future
+        future.add_done_callback(lambda f, job=job, pool=pool: self._finalizar(job, f, pool))
+
+    def _finalizar(self, job: Dict, future, pool: ProcessPoolExecutor):
+        try:
+            resultado = future.result()
+            arquivos = list(resultado["arquivos"])
+            if resultado["relatorio"]:
+                arquivos.append(resultado["relatorio"])
+            with self.lock:
+                job["arquivos"] = {os.path.basename(caminho): caminho for caminho in arquivos}
+                job["status"] = "concluido"
+        except BrokenProcessPool:
+            # O worker morreu (ex.: sem memória): falha só este job e o próximo vai para um pool novo
+            with self.lock:
+                job["erro"] = "Worker encerrado durante o processamento"
+                job["status"] = "erro"
+            self._recriar_pool(pool)
+        except Exception as e:
+            with self.lock:
+                job["erro"] = str(e)
+                job["status"] = "erro"
+        finally:
+            with self.lock:
+                job["finalizado_em"] = time.monotonic()
+            self.liberar_vaga()
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            status = job["status"]
+            if status == "na_fila" and job["future"] is not None and job["future"].running():
+                status = "processando"
+            return {
+                "id": job["id"],
+                "status": status,
+                "arquivo": job["arquivo"],
+                "criado_em": job["criado_em"],
+                "arquivos": sorted(job["arquivos"]),
+                "erro": job["erro"],
+            }
+
+    def caminho_arquivo(self, job_id: str, nome: str) -> Optional[str]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return job["arquivos"].get(nome) if job else None
+
+    def saude(self) -> Dict:
+        with self.lock:
+            pendentes = sum(1 for job in self.jobs.values()
+                            if job["status"] in ("recebendo", "na_fila"))
+        return {"workers": self.workers, "fila_maxima": self.fila_maxima, "pendentes": pendentes}
+
+    def encerrar(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def manter(self, parar: threading.Event):
+        """Laço de limpeza dos jobs expirados (thread daemon do serviço)"""
+        while not parar.wait(min(self.expiracao, 60)):
+            self.expirar_jobs()
+
+
+class ServicoHandler(BaseHTTPRequestHandler):
+    """Handler HTTP do modo serviço"""
+
+    gerenciador: GerenciadorJobs = None
+    server_version = "ProcessadorAlertas/2.0"
+
+    def _responder_json(self, codigo: int, dados: Dict, cabecalhos: Optional[Dict] = None):
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        for chave, valor in (cabecalhos or {}).items():
+            self.send_header(chave, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            self._responder_json(404, {"erro": "Rota não encontrada"})
+            return
+
+        tamanho = self.headers.get("Content-Length")
+        if tamanho is None:
+            self._responder_json(411, {"erro": "Content-Length obrigatório"})
+            return
+
+        # Contrapressão: recusa antes de ler o corpo quando a fila está cheia
+        if not self.gerenciador.reservar_vaga():
+            self.close_connection = True
+            self._responder_json(503, {"erro": "Fila cheia, tente novamente"}, {"Retry-After": "30"})
+            return
+
+        nome = parse_qs(url.query).get("nome", [self.headers.get("X-Filename", "upload.csv")])[0]
+        nome = os.path.basename(nome) or "upload.csv"
+        job = self.gerenciador.criar_job(nome)
+        caminho_csv = os.path.join(job["pasta"], nome)
+
+        try:
+            restante = int(tamanho)
+            with open(caminho_csv, "wb") as destino:
+                while restante > 0:
+                    bloco = self.rfile.read(min(SERVICO_TAMANHO_BLOCO, restante))
+                    if not bloco:
+                        raise ConnectionError("Upload interrompido")
+                    destino.write(bloco)
+                    restante -= len(bloco)
+        except Exception as e:
+            self.gerenciador.descartar_job(job)
+            self.gerenciador.liberar_vaga()
+            self.close_connection = True
+            print(f"⚠️ Erro no upload de {nome}: {e}")
+            return
+
+        self.gerenciador.enfileirar(job, caminho_csv)
+        print(f"📥 Job {job['id']} recebido: {nome}")
+        self._responder_json(202, {"id": job["id"], "status": "na_fila"},
+                             {"Location": f"/jobs/{job['id']}"})
+
+    def do_GET(self):
+        partes = [parte for parte in urlparse(self.path).path.split("/") if parte]
+
+        if partes == ["saude"]:
+            self._responder_json(200, self.gerenciador.saude())
+            return
+
+        if len(partes) == 2 and partes[0] == "jobs":
+            status = self.gerenciador.status(partes[1])
+            if status is None:
+                self._responder_json(404, {"erro": "Job não encontrado"})
+            else:
+                self._responder_json(200, status)
+            return
+
+        if len(partes) == 4 and partes[0] == "jobs" and partes[2] == "arquivos":
+            caminho = self.gerenciador.caminho_arquivo(partes[1], partes[3])
+            if caminho is None or not os.path.exists(caminho):
+                self._responder_json(404, {"erro": "Arquivo não encontrado"})
+                return
+            self._enviar_arquivo(caminho)
+            return
+
+        self._responder_json(404, {"erro": "Rota não encontrada"})
+
+    def do_DELETE(self):
+        partes = [parte for parte in urlparse(self.path).path.split("/") if parte]
+        if len(partes) != 2 or partes[0] != "jobs":
+            self._responder_json(404, {"erro": "Rota não encontrada"})
+            return
+
+        removido = self.gerenciador.remover_job(partes[1])
+        if removido is None:
+            self._responder_json(404, {"erro": "Job não encontrado"})
+        elif not removido:
+            self._responder_json(409, {"erro": "Job ainda em andamento"})
+        else:
+            self._responder_json(200, {"id": partes[1], "status": "removido"})
+
+    def _enviar_arquivo(self, caminho: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(os.path.getsize(caminho)))
+        self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(caminho)}"')
+        self.end_headers()
+        with open(caminho, "rb") as origem:
+            shutil.copyfileobj(origem, self.wfile, SERVICO_TAMANHO_BLOCO)
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} {format % args}")
+
+
+def iniciar_servico(host: str = SERVICO_HOST, porta: int = SERVICO_PORTA,
+                    workers: int = SERVICO_WORKERS, pasta_base: Optional[str] = None,
+                    criar_filtro: Optional[Callable] = None):
+    """Sobe o serviço HTTP local e bloqueia até Ctrl+C (``criar_filtro`` monta o filtro de cada job)"""
+    pasta_base = pasta_base or os.path.abspath(SERVICO_PASTA_JOBS)
+    gerenciador = GerenciadorJobs(pasta_base, workers=workers, criar_filtro=criar_filtro)
+    ServicoHandler.gerenciador = gerenciador
+
+    parar = threading.Event()
+    limpeza = threading.Thread(target=gerenciador.manter, args=(parar,), name="expiracao_jobs", daemon=True)
+    limpeza.start()
+
+    servidor = ThreadingHTTPServer((host, porta), ServicoHandler)
+    print(f"🚀 Serviço em http://{host}:{porta} ({workers} workers, fila máx. {gerenciador.fila_maxima})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("🛑 Encerrando serviço...")
+    finally:
+        parar.set()
+        servidor.server_close()
+        gerenciador.encerrar()
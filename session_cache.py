@@ -0,0 +1,194 @@
+"""
+Módulo do cache da sessão: dataset lido e agregados dos últimos arquivos, com limite de memória
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from config import PREFIXOS, TIPOS_DESCONSIDERAR, CACHE_SESSAO_LIMITE_MB
+from backends import obter_backend
+from anomaly_detector import anotar_anomalias
+
+
+def tamanho_em_memoria(valor) -> int:
+    """Bytes ocupados por um DataFrame (pandas ou Polars) ou por um dict de agregados"""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, dict):
+        return sum(tamanho_em_memoria(item) for item in valor.values())
+    estimativa = getattr(valor, "estimated_size", None)  # Polars
+    return int(estimativa()) if callable(estimativa) else 0
+
+
+def filtrar_agregados(agregados: dict, tipos_excluir: Iterable[str]) -> dict:
+    """
+    Remove TIPOs direto dos agregados (quando o dataset não está no cache)
+
+    Tabelas com TIPO são filtradas; o temporal é refeito do cubo diário, se
+    houver. O esboço do ranking não separa por TIPO e sai (o ranking volta a
+    ser o exato, sobre as contagens filtradas); o mapa horário não tem TIPO e
+    continua com todos os alertas.
+    """
+    tipos_excluir = set(tipos_excluir)
+    filtrados = {}
+    for nome, valor in agregados.items():
+        if nome == "ranking":
+            continue
+        if isinstance(valor, pd.DataFrame) and "TIPO" in valor.columns:
+            valor = valor[~valor["TIPO"].isin(tipos_excluir)].reset_index(drop=True)
+        filtrados[nome] = valor
+    diario = filtrados.get("diario")
+    if diario is not None and {"PA", "DATA"} <= set(diario.columns):
+        filtrados["temporal"] = diario.groupby(["PA", "DATA"], observed=True)["QUANTIDADE"].sum().reset_index()
+    return filtrados
+
+
+class EntradaSessao:
+    """Dataset (se coube no limite) e resultado do processamento de um arquivo"""
+
+    def __init__(self, filepath: str, identidade: tuple):
+        self.filepath = filepath
+        self.identidade = identidade
+        self.dados = None
+        self.backend: Optional[str] = None
+        self.resultado = None
+
+    @property
+    def tamanho(self) -> int:
+        agregados = getattr(self.resultado, "agregados", None) or {}
+        return tamanho_em_memoria(self.dados) + tamanho_em_memoria(agregados)
+
+
+class CacheSessao:
+    """
+    Classe responsável pelo cache em memória dos arquivos processados na sessão da interface
+
+    Guarda, por arquivo, o dataset já lido, normalizado e deduplicado (só no
+    modo em memória: no pipeline ele nunca existe inteiro) e o resultado com
+    os agregados. Acima de ``limite_mb`` os arquivos usados há mais tempo
+    saem primeiro (LRU); um dataset que sozinho passa do limite não é
+    guardado, mas os agregados dele (pequenos) sim. Um arquivo alterado em
+    disco (tamanho ou data) deixa de valer.
+    """
+
+    def __init__(self, limite_mb: float = CACHE_SESSAO_LIMITE_MB):
+        self.limite_bytes = int(limite_mb * 2**20)
+        self._entradas: "OrderedDict[str, EntradaSessao]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _identidade(filepath: str) -> tuple:
+        status = os.stat(filepath)
+        return status.st_size, status.st_mtime_ns
+
+    def _entrada(self, filepath: str) -> EntradaSessao:
+        chave = os.path.abspath(filepath)
+        identidade = self._identidade(filepath)
+        entrada = self._entradas.get(chave)
+        if entrada is None or entrada.identidade != identidade:
+            entrada = EntradaSessao(chave, identidade)
+            self._entradas[chave] = entrada
+        self._entradas.move_to_end(chave)
+        return entrada
+
+    def _ajustar(self, atual: EntradaSessao):
+        """Descarta os menos recentes até caber no limite (a entrada atual fica, no máximo sem o dataset)"""
+        total = sum(entrada.tamanho for entrada in self._entradas.values())
+        for chave in list(self._entradas):
+            if total <= self.limite_bytes:
+                return
+            if chave == atual.filepath:
+                continue
+            total -= self._entradas.pop(chave).tamanho
+            print(f"🧺 Cache da sessão: {os.path.basename(chave)} descartado (limite de memória)")
+        if total > self.limite_bytes and atual.dados is not None:
+            print(f"🧺 Cache da sessão: dataset de {os.path.basename(atual.filepath)} maior que o limite, "
+                  f"só os agregados ficam")
+            atual.dados = None
+
+    def guardar_dados(self, filepath: str, dados, backend: str):
+        with self._lock:
+            entrada = self._entrada(filepath)
+            entrada.dados = dados
+            entrada.backend = backend
+            self._ajustar(entrada)
+
+    def guardar_resultado(self, filepath: str, resultado):
+        if not resultado or getattr(resultado, "agregados", None) is None:
+            return
+        with self._lock:
+            entrada = self._entrada(filepath)
+            entrada.resultado = resultado
+            self._ajustar(entrada)
+
+    def obter(self, filepath: str) -> Optional[EntradaSessao]:
+        """Entrada do arquivo (marcada como a mais recente) ou None se não está no cache ou mudou"""
+        with self._lock:
+            chave = os.path.abspath(filepath)
+            entrada = self._entradas.get(chave)
+            if entrada is None or entrada.resultado is None:
+                return None
+            try:
+                if entrada.identidade != self._identidade(filepath):
+                    del self._entradas[chave]
+                    return None
+            except OSError:
+                del self._entradas[chave]
+                return None
+            self._entradas.move_to_end(chave)
+            return entrada
+
+    def arquivos(self) -> List[str]:
+        """Arquivos com resultado no cache, do mais recente para o mais antigo"""
+        with self._lock:
+            return [chave for chave, entrada in reversed(self._entradas.items()) if entrada.resultado is not None]
+
+    def tipos(self, filepath: str) -> List[str]:
+        """TIPOs presentes nos agregados do arquivo (para escolher quais excluir)"""
+        entrada = self.obter(filepath)
+        if entrada is None:
+            return []
+        contagens = entrada.resultado.agregados["contagens"]
+        if "TIPO" not in contagens.columns:
+            return []
+        tipos = contagens["TIPO"].dropna().astype(str).unique()
+        return sorted(tipo for tipo in tipos if tipo not in TIPOS_DESCONSIDERAR)
+
+    def reagregar(self, filepath: str, tipos_excluir: Iterable[str] = ()) -> Optional[dict]:
+        """
+        Agregados do arquivo sem os TIPOs indicados, sem reler o arquivo
+
+        Com o dataset no cache os agregados são recalculados por completo
+        (partição por PA e agregação do backend); sem ele, as tabelas dos
+        agregados são filtradas (ver ``filtrar_agregados``).
+
+        Returns:
+            Agregados no formato de ``backends`` ou None se o arquivo saiu do cache
+        """
+        entrada = self.obter(filepath)
+        if entrada is None:
+            return None
+        agregados = entrada.resultado.agregados
+        tipos_excluir = set(tipos_excluir)
+        if not tipos_excluir:
+            return agregados
+
+        if entrada.dados is not None:
+            backend = obter_backend(entrada.backend)
+            particoes = [backend.excluir_tipos(backend.filtrar_por_prefixo(entrada.dados, prefixos, pa), tipos_excluir)
+                         for pa, prefixos in PREFIXOS.items()]
+            particoes = [particao for particao in particoes if len(particao)]
+            if not particoes:
+                return None
+            novos = backend.agregar(particoes)
+            # Pontos críticos já estão por TIPO: basta filtrar
+            if agregados.get("hotspots") is not None:
+                hotspots = agregados["hotspots"]
+                novos["hotspots"] = hotspots[~hotspots["TIPO"].isin(tipos_excluir)].reset_index(drop=True)
+        else:
+            novos = filtrar_agregados(agregados, tipos_excluir)
+        return anotar_anomalias(novos)
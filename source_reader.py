@@ -0,0 +1,183 @@
+"""
+Módulo para abrir exportações compactadas (gzip, bz2, xz, zstd e zip) em streaming
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zipfile
+
+try:
+    import zstandard
+except ImportError:  # Suporte a .zst é opcional
+    zstandard = None
+
+
+EXTENSOES_COMPACTADAS = (".gz", ".bz2", ".xz", ".zst", ".zip")
+TIPOS_ARQUIVO_SUPORTADOS = [
+    ("Exportações de alertas", "*.csv *.csv.gz *.csv.bz2 *.csv.xz *.csv.zst *.zip"),
+    ("Arquivos CSV", "*.csv"),
+    ("Todos os arquivos", "*.*"),
+]
+
+
+def e_compactado(filepath: str) -> bool:
+    return filepath.lower().endswith(EXTENSOES_COMPACTADAS)
+
+
+class _ZipConcatenado(io.RawIOBase):
+    """
+    Lê os CSVs de um zip como um único fluxo, na ordem dos nomes
+
+    O cabeçalho dos membros seguintes ao primeiro é descartado (e conferido
+    contra o primeiro), então um zip com vários arquivos vira um só dataset.
+    Quebras de linha CRLF viram LF: membros exportados em sistemas diferentes
+    misturam os dois, e leitores que detectam o dialeto uma vez só (o DuckDB,
+    sobre o temporário descompactado) rejeitam o fluxo misturado.
+    """
+
+    def __init__(self, bruto):
+        self._zip = zipfile.ZipFile(bruto)
+        nomes = sorted(info.filename for info in self._zip.infolist() if not info.is_dir())
+        csvs = [nome for nome in nomes if nome.lower().endswith(".csv")]
+        self._membros = csvs or nomes
+        if not self._membros:
+            raise ValueError("Arquivo zip sem membros para processar")
+
+        self._indice = -1
+        self._atual = None
+        self._cabecalho = None
+        self._lendo_cabecalho = b""
+        self._pular_cabecalho = False
+        self._pendente = b""
+        self._separador = b""
+        self._ultimo_byte = b"\n"
+        self._proximo_membro()
+
+    def readable(self):
+        return True
+
+    def _proximo_membro(self):
+        if self._atual is not None:
+            self._atual.close()
+        self._indice += 1
+        if self._indice >= len(self._membros):
+            self._atual = None
+            return
+        self._atual = self._zip.open(self._membros[self._indice])
+        self._pular_cabecalho = self._indice > 0
+        self._lendo_cabecalho = b""
+        # Garante quebra de linha entre o fim de um membro e o início do próximo
+        self._separador = b"" if self._ultimo_byte in (b"\n", b"") else b"\n"
+
+    def readinto(self, buffer) -> int:
+        if self._separador:
+            buffer[:1] = self._separador
+            self._separador = b""
+            self._ultimo_byte = b"\n"
+            return 1
+
+        while self._atual is not None:
+            if self._pendente:
+                dados, self._pendente = self._pendente, b""
+            else:
+                dados = self._atual.read(len(buffer))
+                if not dados:
+                    self._proximo_membro()
+                    continue
+                # "\r" no fim do bloco pode ser metade de um CRLF: completa antes de normalizar
+                while dados.endswith(b"\r"):
+                    extra = self._atual.read(1)
+                    if not extra:
+                        break
+                    dados += extra
+                dados = dados.replace(b"\r\n", b"\n")
+
+            if self._indice == 0 and self._cabecalho is None:
+                self._lendo_cabecalho += dados
+                fim = self._lendo_cabecalho.find(b"\n")
+                if fim >= 0 or len(self._lendo_cabecalho) > 1 << 16:
+                    self._cabecalho = self._lendo_cabecalho[:fim].rstrip(b"\r")
+                    self._lendo_cabecalho = b""
+            elif self._pular_cabecalho:
+                self._lendo_cabecalho += dados
+                fim = self._lendo_cabecalho.find(b"\n")
+                if fim < 0:
+                    continue
+                cabecalho = self._lendo_cabecalho[:fim].rstrip(b"\r")
+                if cabecalho != self._cabecalho:
+                    raise ValueError(f"Cabeçalho diferente no membro {self._membros[self._indice]} do zip")
+                dados = self._lendo_cabecalho[fim + 1:]
+                self._lendo_cabecalho = b""
+                self._pular_cabecalho = False
+                if not dados:
+                    continue
+
+            tamanho = min(len(dados), len(buffer))
+            buffer[:tamanho] = dados[:tamanho]
+            self._pendente = dados[tamanho:] + self._pendente
+            self._ultimo_byte = dados[tamanho - 1:tamanho]
+            return tamanho
+        return 0
+
+    def close(self):
+        if self._atual is not None:
+            self._atual.close()
+            self._atual = None
+        self._zip.close()
+        super().close()
+
+
+class FonteDados:
+    """
+    Fonte de dados aberta em streaming, descompactando conforme a leitura
+
+    ``stream`` entrega os bytes do CSV já descompactados (sem extrair nada para
+    disco) e ``progresso()`` mede o quanto do arquivo em disco já foi consumido.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.tamanho = os.path.getsize(filepath) or 1
+        self.bruto = open(filepath, "rb")
+        try:
+            self.stream = self._descompactar(filepath.lower())
+        except Exception:
+            self.bruto.close()
+            raise
+
+    def _descompactar(self, nome: str):
+        if nome.endswith(".gz"):
+            return gzip.GzipFile(fileobj=self.bruto)
+        if nome.endswith(".bz2"):
+            return bz2.BZ2File(self.bruto)
+        if nome.endswith(".xz"):
+            return lzma.LZMAFile(self.bruto)
+        if nome.endswith(".zst"):
+            if zstandard is None:
+                raise ImportError("Arquivos .zst requerem o pacote zstandard instalado")
+            return zstandard.ZstdDecompressor().stream_reader(self.bruto, read_across_frames=True)
+        if nome.endswith(".zip"):
+            return io.BufferedReader(_ZipConcatenado(self.bruto), buffer_size=1 << 20)
+        return self.bruto
+
+    def progresso(self) -> float:
+        return min(self.bruto.tell() / self.tamanho, 1.0)
+
+    def close(self):
+        if self.stream is not self.bruto:
+            self.stream.close()
+        self.bruto.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def abrir_fonte(filepath: str) -> FonteDados:
+    """Abre CSV simples ou compactado como fluxo de bytes descompactados"""
+    return FonteDados(filepath)
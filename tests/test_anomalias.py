@@ -0,0 +1,65 @@
+"""
+Detecção de anomalias: picos plantados, corte da tabela e total sem corte
+
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+from bench_anomalias import gerar_diario
+
+from anomaly_detector import DetectorAnomalias, anotar_anomalias, matriz_entidade_dia
+
+
+def _diario_com_pico(dia_pico: int = 50) -> pd.DataFrame:
+    dias = pd.date_range("2024-01-01", periods=80, freq="D")
+    linhas = [("MOTORISTA A", dia, 2) for dia in dias] + [("MOTORISTA B", dia, 3) for dia in dias]
+    diario = pd.DataFrame(linhas, columns=["MOTORISTA", "DATA", "QUANTIDADE"])
+    diario.loc[(diario["MOTORISTA"] == "MOTORISTA A") & (diario["DATA"] == dias[dia_pico]), "QUANTIDADE"] = 30
+    return diario
+
+
+def test_matriz_entidade_dia_preenche_dias_sem_alerta():
+    diario = pd.DataFrame({"MOTORISTA": ["A", "A", "B"],
+                           "DATA": pd.to_datetime(["2024-01-01", "2024-01-04", "2024-01-02"]),
+                           "QUANTIDADE": [1, 2, 5]})
+    entidades, dias, matriz = matriz_entidade_dia(diario, "MOTORISTA")
+    assert list(entidades) == ["A", "B"]
+    assert len(dias) == 4
+    np.testing.assert_array_equal(matriz, [[1, 0, 0, 2], [0, 5, 0, 0]])
+
+
+@pytest.mark.parametrize("metodo", ["zscore", "ewma"])
+def test_pico_plantado_e_o_unico_marcado(metodo):
+    anomalias = DetectorAnomalias(metodo=metodo).detectar(_diario_com_pico(), ["MOTORISTA"])
+    assert len(anomalias) == 1
+    assert anomalias.loc[0, "ENTIDADE"] == "MOTORISTA A"
+    assert anomalias.loc[0, "DATA"] == pd.Timestamp("2024-02-20")
+    assert anomalias.loc[0, "QUANTIDADE"] == 30
+
+
+def test_pico_sem_historico_minimo_nao_e_marcado():
+    detector = DetectorAnomalias(historico_minimo=60)
+    assert detector.detectar(_diario_com_pico(dia_pico=50), ["MOTORISTA"]).empty
+
+
+def test_tabela_cortada_guarda_o_total(capsys):
+    diario = gerar_diario(500, 120)
+    detector = DetectorAnomalias()
+    anomalias = detector.detectar(diario, ["MOTORISTA"], top=10)
+    assert len(anomalias) == 10
+    assert detector.total_marcados > 10
+    assert anomalias["ESCORE"].is_monotonic_decreasing
+
+    anotar_anomalias({"diario": diario})
+    saida = capsys.readouterr().out
+    assert "limitada" in saida
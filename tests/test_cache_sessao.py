@@ -0,0 +1,132 @@
+"""
+Cache da sessão: ordem de descarte (LRU), limite de memória e reagregação sem TIPOs igual a uma execução nova
+
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+from dados_sinteticos import gerar_csv
+
+from config import CACHE_SESSAO_LIMITE_MB
+from data_processor import DataProcessor
+from resultado import ResultadoProcessamento
+from run_filters import FiltroExecucao
+from session_cache import CacheSessao, tamanho_em_memoria
+
+MB = 2**20
+OPCOES = {"modo": "memoria", "deduplicar": False, "backend": "pandas"}
+
+
+def _arquivo(tmp_path, nome):
+    caminho = tmp_path / nome
+    caminho.write_text(nome)
+    return str(caminho)
+
+
+def _resultado(megabytes):
+    """Resultado cujos agregados ocupam ~``megabytes`` MB"""
+    contagens = pd.DataFrame({"QUANTIDADE": range(int(megabytes * MB) // 8)}, dtype="int64")
+    return ResultadoProcessamento(["saida.xlsx"], {"contagens": contagens})
+
+
+def test_limite_padrao_vem_da_configuracao():
+    assert CacheSessao().limite_bytes == CACHE_SESSAO_LIMITE_MB * MB
+
+
+def test_descarta_o_usado_ha_mais_tempo(tmp_path):
+    cache = CacheSessao(limite_mb=2.5)
+    a, b, c = (_arquivo(tmp_path, nome) for nome in ("a.csv", "b.csv", "c.csv"))
+    cache.guardar_resultado(a, _resultado(1))
+    cache.guardar_resultado(b, _resultado(1))
+    assert cache.arquivos() == [os.path.abspath(b), os.path.abspath(a)]
+
+    # Consultar "a" o torna o mais recente: quem sai é "b"
+    assert cache.obter(a) is not None
+    cache.guardar_resultado(c, _resultado(1))
+    assert cache.arquivos() == [os.path.abspath(c), os.path.abspath(a)]
+    assert cache.obter(b) is None
+
+
+def test_dataset_maior_que_o_limite_fica_so_com_os_agregados(tmp_path):
+    cache = CacheSessao(limite_mb=2)
+    a, b = _arquivo(tmp_path, "a.csv"), _arquivo(tmp_path, "b.csv")
+    cache.guardar_resultado(a, _resultado(0.5))
+    dados = pd.DataFrame({"PREFIXO": range(3 * MB // 8)}, dtype="int64")
+    cache.guardar_dados(b, dados, "pandas")
+    cache.guardar_resultado(b, _resultado(0.5))
+
+    # O dataset grande expulsou "a" e, sozinho acima do limite, também foi descartado
+    entrada = cache.obter(b)
+    assert entrada.dados is None
+    assert entrada.resultado is not None
+    assert cache.arquivos() == [os.path.abspath(b)]
+    assert tamanho_em_memoria(entrada.resultado.agregados) <= cache.limite_bytes
+
+    # Dataset que cabe fica
+    cache.guardar_dados(b, dados.head(MB // 8), "pandas")
+    assert cache.obter(b).dados is not None
+    assert entrada.tamanho <= cache.limite_bytes
+
+
+def test_arquivo_alterado_deixa_de_valer(tmp_path):
+    cache = CacheSessao(limite_mb=10)
+    a = _arquivo(tmp_path, "a.csv")
+    cache.guardar_resultado(a, _resultado(0.1))
+    with open(a, "a") as arquivo:
+        arquivo.write("mais uma linha")
+    assert cache.obter(a) is None
+    assert cache.arquivos() == []
+
+
+@pytest.fixture(scope="module")
+def processado(tmp_path_factory):
+    """Arquivo processado uma vez com o cache e os agregados de uma execução nova sem CELULAR e FADIGA"""
+    pasta = tmp_path_factory.mktemp("dados")
+    arquivo = gerar_csv(str(pasta / "alertas.csv"), 6_000)
+    cache = CacheSessao(limite_mb=512)
+    assert DataProcessor().processar_arquivo(arquivo, sessao=cache, **OPCOES)
+    fresco = DataProcessor().processar_arquivo(arquivo, filtro=FiltroExecucao(tipos_excluir="CELULAR,FADIGA"),
+                                               **OPCOES)
+    return arquivo, cache, fresco.agregados
+
+
+def _comparar(obtido, esperado, nomes):
+    for nome in nomes:
+        ordem = [coluna for coluna in esperado[nome].columns if coluna != "QUANTIDADE"]
+        pd.testing.assert_frame_equal(
+            obtido[nome].sort_values(ordem).reset_index(drop=True),
+            esperado[nome].sort_values(ordem).reset_index(drop=True),
+            check_dtype=False, check_categorical=False, obj=nome)
+
+
+def test_reagregar_com_dataset_igual_a_execucao_nova(processado):
+    arquivo, cache, esperado = processado
+    assert cache.obter(arquivo).dados is not None
+    assert {"CELULAR", "FADIGA"} <= set(cache.tipos(arquivo))
+
+    obtido = cache.reagregar(arquivo, {"CELULAR", "FADIGA"})
+    _comparar(obtido, esperado, ["contagens", "diario", "temporal"])
+    assert not {"CELULAR", "FADIGA"} & set(obtido["contagens"]["TIPO"])
+    # Sem exclusão volta o resultado guardado
+    assert cache.reagregar(arquivo) is cache.obter(arquivo).resultado.agregados
+
+
+def test_reagregar_so_com_os_agregados_igual_a_execucao_nova(processado):
+    arquivo, cache, esperado = processado
+    entrada = cache.obter(arquivo)
+    dados, entrada.dados = entrada.dados, None
+    try:
+        obtido = cache.reagregar(arquivo, ["CELULAR", "FADIGA"])
+    finally:
+        entrada.dados = dados
+    _comparar(obtido, esperado, ["contagens", "diario", "temporal"])
+    assert "ranking" not in obtido
@@ -0,0 +1,120 @@
+"""
+Deduplicação: índice em níveis ordenados, chave com a coluna de data e índice persistido
+
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import ENCODING_CSV
+from deduplicator import Deduplicador, _IndiceHashes, criar_deduplicador
+
+
+def _alertas(prefixos, datas=None):
+    datas = datas or ["01/03/2024 08:00"] * len(prefixos)
+    return pd.DataFrame({"PREFIXO": prefixos, "TIPO": "FADIGA", "DATA_OCORRENCIA": datas, "MOTORISTA": "JOAO"})
+
+
+def test_indice_funde_niveis_e_encontra_todos_os_hashes():
+    rng = np.random.default_rng(3)
+    indice = _IndiceHashes()
+    inseridos = []
+    for tamanho in (500, 300, 200, 100, 50, 1000, 7):
+        bloco = rng.integers(0, 2 ** 63, tamanho, dtype=np.uint64)
+        indice.adicionar(bloco)
+        inseridos.append(bloco)
+        # Níveis fundidos: cada nível é mais que o dobro do seguinte
+        assert all(len(a) > 2 * len(b) for a, b in zip(indice.niveis, indice.niveis[1:]))
+        assert all(np.all(np.diff(nivel.astype(np.float64)) >= 0) for nivel in indice.niveis)
+    todos = np.concatenate(inseridos)
+    assert indice.contem(todos).all()
+    ausentes = rng.integers(0, 2 ** 63, 1000, dtype=np.uint64)
+    ausentes = ausentes[~np.isin(ausentes, todos)]
+    assert not indice.contem(ausentes).any()
+    compactado = indice.compactar()
+    assert len(indice.niveis) == 1
+    assert np.array_equal(compactado, np.unique(todos))
+
+
+def test_indice_vazio_nao_contem_nada():
+    indice = _IndiceHashes(np.empty(0, dtype=np.uint64))
+    assert len(indice) == 0
+    assert not indice.contem(np.array([1, 2], dtype=np.uint64)).any()
+    indice.adicionar(np.empty(0, dtype=np.uint64))
+    assert len(indice.compactar()) == 0
+
+
+def test_chave_usa_a_coluna_de_data_detectada():
+    deduplicador = Deduplicador()
+    assert deduplicador.colunas_chave(["PREFIXO", "TIPO", "DATA_OCORRENCIA", "MOTORISTA", "PA"]) == \
+        ["PREFIXO", "TIPO", "DATA_OCORRENCIA", "MOTORISTA"]
+    # Sem nenhuma coluna da chave nada é descartado
+    assert Deduplicador(colunas=["INEXISTENTE"]).filtrar(_alertas(["A", "A"])).all()
+
+
+def test_repetidos_no_bloco_e_entre_blocos_sao_descartados():
+    deduplicador = Deduplicador()
+    primeiro = deduplicador.filtrar(_alertas(["A", "B", "A", "C"]))
+    assert primeiro.tolist() == [True, True, False, True]
+    segundo = deduplicador.aplicar(_alertas(["C", "D", "B", "D"], ["01/03/2024 08:00"] * 3 + ["02/03/2024 08:00"]))
+    # "D" em outro dia é outro alerta
+    assert segundo["PREFIXO"].tolist() == ["D", "D"]
+    assert deduplicador.removidos == 3
+
+
+def test_nulos_e_tipos_diferentes_geram_a_mesma_chave():
+    deduplicador = Deduplicador(colunas=["PREFIXO", "MOTORISTA"])
+    bloco = pd.DataFrame({"PREFIXO": ["10", 10, None], "MOTORISTA": [None, np.nan, None]})
+    assert deduplicador.filtrar(bloco).tolist() == [True, False, True]
+
+
+def _csv(pasta, nome, prefixos):
+    caminho = os.path.join(pasta, nome)
+    _alertas(prefixos).to_csv(caminho, sep=";", index=False, encoding=ENCODING_CSV)
+    return caminho
+
+
+def test_indice_persistido_descarta_o_que_outra_entrada_ja_exportou(tmp_path):
+    primeira = _csv(tmp_path, "semana1.csv", ["A", "B"])
+    segunda = _csv(tmp_path, "semana2.csv", ["B", "C"])
+
+    deduplicador = criar_deduplicador(primeira, entre_execucoes=True)
+    assert deduplicador.filtrar(_alertas(["A", "B"])).all()
+    deduplicador.salvar()
+    assert os.path.exists(deduplicador.caminho_indice)
+
+    deduplicador = criar_deduplicador(segunda, entre_execucoes=True)
+    assert deduplicador.filtrar(_alertas(["B", "C"])).tolist() == [False, True]
+    deduplicador.salvar()
+
+    with np.load(deduplicador.caminho_indice) as salvo:
+        assert len(salvo["hashes"]) == len(salvo["origens"]) == 3
+        assert len(np.unique(salvo["origens"])) == 2
+
+
+def test_reprocessar_a_mesma_entrada_nao_descarta_as_proprias_linhas(tmp_path):
+    primeira = _csv(tmp_path, "semana1.csv", ["A", "B"])
+    segunda = _csv(tmp_path, "semana2.csv", ["B", "C"])
+    for arquivo, prefixos in ((primeira, ["A", "B"]), (segunda, ["B", "C"])):
+        deduplicador = criar_deduplicador(arquivo, entre_execucoes=True)
+        deduplicador.filtrar(_alertas(prefixos))
+        deduplicador.salvar()
+
+    # Refazer (--forcar) a segunda semana: "B" continua vindo da primeira, "C" é dela mesma
+    for _ in range(2):
+        deduplicador = criar_deduplicador(segunda, entre_execucoes=True)
+        assert deduplicador.filtrar(_alertas(["B", "C"])).tolist() == [False, True]
+        deduplicador.salvar()
+    # ... e a primeira inteira de novo, sem perder nada
+    deduplicador = criar_deduplicador(primeira, entre_execucoes=True)
+    assert deduplicador.filtrar(_alertas(["A", "B"])).all()
+    deduplicador.salvar()
+
+    with np.load(deduplicador.caminho_indice) as salvo:
+        assert len(salvo["hashes"]) == 3
@@ -0,0 +1,111 @@
+"""
+Escritor em streaming: larguras das colunas, cabeçalho e fragmentação em abas ou arquivos
+
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_formatter import ExcelFormatter
+from excel_writer import StreamingExcelWriter
+
+
+def _larguras(caminho):
+    ws = load_workbook(caminho).active
+    return {letra: dimensao.width for letra, dimensao in ws.column_dimensions.items()}
+
+
+def test_particao_inteira_tem_as_larguras_do_excel_formatter(tmp_path):
+    # O valor mais longo de cada coluna só aparece no fim da partição
+    df = pd.DataFrame({
+        "PREFIXO": ["10"] * 999 + ["PREFIXO MUITO COMPRIDO"],
+        "TIPO": ["FADIGA"] * 500 + ["DISTRAÇÃO AO VOLANTE PROLONGADA"] + ["FADIGA"] * 499,
+        "X": [None] * 1000,
+    })
+    referencia = os.path.join(tmp_path, "referencia.xlsx")
+    df.to_excel(referencia, index=False)
+    assert ExcelFormatter().formatar_arquivo(referencia)
+
+    caminho = os.path.join(tmp_path, "streaming.xlsx")
+    escritor = StreamingExcelWriter(caminho)
+    escritor.escrever(df, particao="PA1")
+    escritor.fechar()
+
+    assert _larguras(caminho) == _larguras(referencia)
+    ws = load_workbook(caminho).active
+    assert [cell.font.bold for cell in ws[1]] == [True, True, True]
+    assert ws.max_row == len(df) + 1
+
+
+def _blocos(total, tamanho):
+    for inicio in range(0, total, tamanho):
+        yield pd.DataFrame({"PREFIXO": [str(i) for i in range(inicio, min(inicio + tamanho, total))]})
+
+
+def _linhas_por_aba(caminho):
+    wb = load_workbook(caminho, read_only=True)
+    # Escrita em streaming não grava a dimensão da planilha: conta linha a linha
+    linhas = {ws.title: sum(1 for _ in ws.iter_rows(values_only=True)) - 1 for ws in wb.worksheets}
+    wb.close()
+    return linhas
+
+
+def test_fragmentacao_em_abas(tmp_path):
+    caminho = os.path.join(tmp_path, "workbook.xlsx")
+    aba_longa = "PA_COM_UM_NOME_BEM_COMPRIDO_DEMAIS"  # 34 caracteres
+    escritor = StreamingExcelWriter(caminho, limite_linhas=100, fragmentar_em="abas")
+    # Blocos que não batem com o limite: um bloco atravessa a fronteira entre fragmentos
+    for bloco in _blocos(250, 70):
+        escritor.escrever(bloco, aba="PA1")
+        escritor.escrever(bloco.iloc[:40], aba=aba_longa[:31], particao="PA2")
+    escritor.fechar()
+
+    assert escritor.arquivos == [caminho]
+    esperado = {"PA1": 100, "PA1_2": 100, "PA1_3": 50, aba_longa[:31]: 100, aba_longa[:29] + "_2": 60}
+    assert _linhas_por_aba(caminho) == esperado
+    assert all(len(nome) <= 31 for nome in esperado)
+    assert [(f["particao"], f["parte"], f["aba"], f["linhas"]) for f in escritor.manifesto] == [
+        ("PA1", 1, "PA1", 100), ("PA1", 2, "PA1_2", 100), ("PA1", 3, "PA1_3", 50),
+        ("PA2", 1, aba_longa[:31], 100), ("PA2", 2, aba_longa[:29] + "_2", 60),
+    ]
+    assert escritor.linhas == {"PA1": 250, aba_longa[:31]: 160}
+
+    # Nenhuma linha perdida nem repetida entre os fragmentos, e cada um com cabeçalho
+    wb = load_workbook(caminho, read_only=True)
+    valores = [linha[0] for nome in ("PA1", "PA1_2", "PA1_3")
+               for linha in wb[nome].iter_rows(values_only=True)]
+    wb.close()
+    assert [valor for valor in valores if valor != "PREFIXO"] == [str(i) for i in range(250)]
+    assert valores.count("PREFIXO") == 3
+
+
+def test_fragmentacao_em_arquivos(tmp_path):
+    caminho = os.path.join(tmp_path, "veiculos_pa1.xlsx")
+    escritor = StreamingExcelWriter(caminho, limite_linhas=100, fragmentar_em="arquivos")
+    for bloco in _blocos(230, 60):
+        escritor.escrever(bloco, particao="PA1")
+    escritor.fechar()
+
+    partes = [caminho, os.path.join(tmp_path, "veiculos_pa1_parte2.xlsx"),
+              os.path.join(tmp_path, "veiculos_pa1_parte3.xlsx")]
+    assert escritor.arquivos == partes
+    assert [_linhas_por_aba(parte) for parte in partes] == [{"Sheet1": 100}, {"Sheet1": 100}, {"Sheet1": 30}]
+    assert [(f["particao"], f["parte"], f["arquivo"], f["aba"], f["linhas"]) for f in escritor.manifesto] == [
+        ("PA1", 1, partes[0], "Sheet1", 100), ("PA1", 2, partes[1], "Sheet1", 100), ("PA1", 3, partes[2], "Sheet1", 30),
+    ]
+    # Nada de temporário sobrando na pasta
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(parte) for parte in partes)
+
+
+def test_limite_nunca_passa_do_maximo_do_xlsx(tmp_path):
+    escritor = StreamingExcelWriter(os.path.join(tmp_path, "a.xlsx"), limite_linhas=5_000_000)
+    assert escritor.limite_linhas == 1_048_575
+    with pytest.raises(ValueError):
+        StreamingExcelWriter(os.path.join(tmp_path, "b.xlsx"), fragmentar_em="pastas")
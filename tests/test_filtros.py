@@ -0,0 +1,121 @@
+"""
+Filtros da execução: período inclusivo, listas de inclusão/exclusão, esquema e mesma seleção em todos os motores
+
+Uso: python -m pytest tests
+"""
+
+import os
+import pickle
+import sys
+
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+from dados_sinteticos import gerar_csv
+
+from config import PREFIXOS
+from backends import PandasBackend, PolarsBackend, pl
+from duckdb_aggregator import DuckDBAggregator, duckdb
+from preflight import ErroEsquema
+from run_filters import FiltroExecucao
+
+
+def _alertas():
+    return pd.DataFrame({
+        "PREFIXO": ["10", "11", "12", "13", "14"],
+        "TIPO": ["FADIGA", "CELULAR", "FADIGA", "CIGARRO", None],
+        "MOTORISTA": ["ANA", "BIA", "ANA", "CAIO", "BIA"],
+        "DATA": ["2024-03-01 00:00:00", "2024-03-01 23:59:59", "2024-03-02 12:00:00",
+                 "2024-03-03 00:00:00", "texto"],
+    })
+
+
+def _prefixos(filtro):
+    return filtro.aplicar(_alertas())["PREFIXO"].tolist()
+
+
+def test_periodo_inclui_os_dois_extremos_do_dia():
+    assert _prefixos(FiltroExecucao(data_inicio="2024-03-01", data_fim="2024-03-01")) == ["10", "11"]
+    assert _prefixos(FiltroExecucao(data_inicio="2024-03-02")) == ["12", "13"]
+    # Com período, datas não reconhecidas ficam de fora
+    assert _prefixos(FiltroExecucao(data_fim="2024-03-03")) == ["10", "11", "12", "13"]
+    with pytest.raises(ValueError):
+        FiltroExecucao(data_inicio="2024-03-02", data_fim="2024-03-01")
+
+
+def test_ultimos_dias_conta_o_dia_de_hoje():
+    filtro = FiltroExecucao.da_configuracao(ultimos_dias=7)
+    assert filtro.data_inicio == pd.Timestamp.now().normalize() - pd.Timedelta(days=6)
+    # Data informada prevalece sobre os últimos dias
+    assert FiltroExecucao.da_configuracao(ultimos_dias=7, data_inicio="2024-01-01").data_inicio == \
+        pd.Timestamp("2024-01-01")
+
+
+def test_listas_de_inclusao_e_exclusao():
+    assert _prefixos(FiltroExecucao(tipos_incluir="fadiga, CIGARRO")) == ["10", "12", "13"]
+    # Exclusão mantém os TIPOs nulos; inclusão não
+    assert _prefixos(FiltroExecucao(tipos_excluir=["FADIGA"])) == ["11", "13", "14"]
+    assert _prefixos(FiltroExecucao(motoristas="ANA,CAIO", prefixos=["10", "13", "14"])) == ["10", "13"]
+    assert not FiltroExecucao(tipos_excluir="").ativo
+    assert not FiltroExecucao.da_configuracao().ativo
+
+
+def test_colunas_ausentes_levantam_erro_de_esquema():
+    colunas = ["PREFIXO", "TIPO"]
+    with pytest.raises(ErroEsquema, match="MOTORISTA"):
+        FiltroExecucao(motoristas="ANA").verificar(colunas)
+    with pytest.raises(ErroEsquema, match="data"):
+        FiltroExecucao(data_inicio="2024-03-01").verificar(colunas)
+    # Excluir valores de uma coluna ausente não tem o que remover: passa
+    assert FiltroExecucao(tipos_excluir="FADIGA").verificar(["PREFIXO"]) is None
+    assert FiltroExecucao(data_fim="2024-03-01").verificar(["PREFIXO", "DATA"]) == "DATA"
+
+
+def test_filtro_chega_inteiro_aos_workers():
+    # Serviço e observador enviam o filtro aos processos do pool
+    filtro = FiltroExecucao(data_inicio="2024-03-01", tipos_excluir="FADIGA", motoristas="ANA")
+    copia = pickle.loads(pickle.dumps(filtro))
+    assert copia.chave() == filtro.chave()
+    assert _prefixos(copia) == _prefixos(filtro)
+
+
+@pytest.fixture(scope="module")
+def arquivo(tmp_path_factory):
+    return gerar_csv(str(tmp_path_factory.mktemp("dados") / "alertas.csv"), 8_000)
+
+
+@pytest.fixture(scope="module")
+def filtro():
+    return FiltroExecucao(data_inicio="2024-01-15", data_fim="2024-02-10", tipos_excluir="CELULAR")
+
+
+def _contagens_pandas(arquivo, filtro):
+    backend = PandasBackend()
+    dados = backend.carregar(arquivo, filtro)
+    return backend.agregar([backend.filtrar_por_prefixo(dados, prefixos, pa) for pa, prefixos in PREFIXOS.items()])
+
+
+def _totais(agregados):
+    return agregados["temporal"].groupby("DATA")["QUANTIDADE"].sum()
+
+
+@pytest.mark.skipif(duckdb is None, reason="duckdb não instalado")
+def test_reagregacao_duckdb_respeita_o_filtro(arquivo, filtro):
+    esperado = _contagens_pandas(arquivo, filtro)
+    obtido = DuckDBAggregator().agregar_arquivo(arquivo, filtro)
+    pd.testing.assert_series_equal(_totais(esperado), _totais(obtido), check_dtype=False)
+    assert obtido["temporal"]["DATA"].min() == pd.Timestamp("2024-01-15")
+    assert obtido["temporal"]["DATA"].max() == pd.Timestamp("2024-02-10")
+    assert "CELULAR" not in set(obtido["contagens"]["TIPO"])
+
+
+@pytest.mark.skipif(pl is None, reason="polars não instalado")
+def test_polars_respeita_o_filtro(arquivo, filtro):
+    backend = PolarsBackend()
+    dados = backend.carregar(arquivo, filtro)
+    obtido = backend.agregar([backend.filtrar_por_prefixo(dados, prefixos, pa) for pa, prefixos in PREFIXOS.items()])
+    pd.testing.assert_series_equal(_totais(_contagens_pandas(arquivo, filtro)), _totais(obtido), check_dtype=False)
@@ -0,0 +1,126 @@
+"""
+Histórico de contagens diárias: substituição por origem, dias de exportações sobrepostas e janela
+
+Uso: python -m pytest tests
+"""
+
+import os
+import sqlite3
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aggregate_store
+from aggregate_store import ArmazemAgregados, atualizar_historico
+
+
+def _diario(contagens):
+    """Cubo diário a partir de {(dia, motorista): quantidade}, tudo no PA1"""
+    return pd.DataFrame([{"PA": "PA1", "TIPO": "FADIGA", "MOTORISTA": motorista, "PREFIXO": "10",
+                          "DATA": pd.Timestamp(dia), "QUANTIDADE": quantidade}
+                         for (dia, motorista), quantidade in contagens.items()])
+
+
+def _serie(armazem, **kwargs):
+    df = armazem.consultar(["MOTORISTA"], **kwargs)
+    return {(data.strftime("%Y-%m-%d"), motorista): quantidade
+            for motorista, data, quantidade in df.itertuples(index=False)}
+
+
+@pytest.fixture
+def armazem(tmp_path):
+    with ArmazemAgregados(str(tmp_path / "historico.sqlite")) as armazem:
+        yield armazem
+
+
+def test_reprocessar_a_mesma_origem_substitui_as_linhas(armazem):
+    armazem.registrar(_diario({("2024-03-01", "A"): 5, ("2024-03-02", "A"): 1}), "semana1")
+    armazem.registrar(_diario({("2024-03-01", "A"): 5, ("2024-03-02", "A"): 1}), "semana1")
+    assert _serie(armazem) == {("2024-03-01", "A"): 5, ("2024-03-02", "A"): 1}
+    # Contagem menor da mesma origem também vale (ex.: exportação corrigida com o mesmo arquivo)
+    armazem.registrar(_diario({("2024-03-01", "A"): 3, ("2024-03-02", "A"): 1}), "semana1")
+    assert _serie(armazem)[("2024-03-01", "A")] == 3
+
+
+def test_dia_reexportado_por_inteiro_vale_a_exportacao_mais_recente(armazem):
+    armazem.registrar(_diario({("2024-03-01", "A"): 1, ("2024-03-02", "A"): 5, ("2024-03-02", "B"): 3,
+                               ("2024-03-03", "A"): 1}), "antiga")
+    # O dia 2 inteiro de novo: A caiu, B subiu. MAX por chave daria A=5, B=7
+    armazem.registrar(_diario({("2024-03-01", "A"): 1, ("2024-03-02", "A"): 4, ("2024-03-02", "B"): 7,
+                               ("2024-03-03", "A"): 1}), "nova")
+    serie = _serie(armazem)
+    assert (serie[("2024-03-02", "A")], serie[("2024-03-02", "B")]) == (4, 7)
+
+
+def test_dia_cortado_na_borda_nao_substitui_o_dia_inteiro(armazem):
+    armazem.registrar(_diario({("2024-03-01", "A"): 1, ("2024-03-02", "A"): 9, ("2024-03-03", "A"): 1}), "antiga")
+    # A exportação nova começa no meio do dia 2: ali ela tem só parte dos alertas
+    armazem.registrar(_diario({("2024-03-02", "A"): 2, ("2024-03-03", "A"): 6, ("2024-03-04", "A"): 4,
+                               ("2024-03-05", "A"): 1}), "nova")
+    serie = _serie(armazem)
+    assert serie[("2024-03-02", "A")] == 9
+    # Dia 3: na antiga é a borda, na nova é inteiro
+    assert serie[("2024-03-03", "A")] == 6
+    # Dias sem exportação completa: vale a que tem mais alertas no dia
+    assert serie[("2024-03-05", "A")] == 1
+
+
+def test_janela_e_pas(armazem):
+    dias = pd.date_range("2024-01-01", periods=10).strftime("%Y-%m-%d")
+    diario = pd.concat([_diario({(dia, "A"): 1 for dia in dias}),
+                        _diario({(dia, "A"): 2 for dia in dias}).assign(PA="PA2")])
+    armazem.registrar(diario, "arquivo")
+    assert armazem.ultima_data() == "2024-01-10"
+
+    temporal = armazem.consultar_temporal(dias=3)
+    assert temporal["DATA"].dt.strftime("%Y-%m-%d").unique().tolist() == ["2024-01-08", "2024-01-09", "2024-01-10"]
+    temporal = armazem.consultar_temporal(dias=2, fim="2024-01-05", pas=["PA2"])
+    assert temporal[["PA", "QUANTIDADE"]].values.tolist() == [["PA2", 2], ["PA2", 2]]
+    assert temporal["DATA"].max() == pd.Timestamp("2024-01-05")
+    with pytest.raises(ValueError):
+        armazem.consultar(["PLACA"])
+
+
+def test_indices_da_consulta(armazem):
+    indices = {linha[1] for linha in armazem.conexao.execute("PRAGMA index_list(contagens_origem)")}
+    assert {"idx_origem_data", "idx_origem_pa_data"} <= indices
+    plano = " ".join(str(linha) for linha in armazem.conexao.execute(
+        "EXPLAIN QUERY PLAN SELECT SUM(quantidade) FROM contagens_origem WHERE pa = 'PA1' AND data > '2024-01-01'"))
+    assert "idx_origem_pa_data" in plano
+
+
+def test_historico_do_formato_anterior_vira_uma_origem(tmp_path):
+    caminho = str(tmp_path / "historico.sqlite")
+    with sqlite3.connect(caminho) as conexao:
+        conexao.execute("CREATE TABLE contagens_diarias (data TEXT, pa TEXT, tipo TEXT, motorista TEXT, "
+                        "prefixo TEXT, quantidade INTEGER)")
+        conexao.execute("INSERT INTO contagens_diarias VALUES ('2024-03-01', 'PA1', 'FADIGA', 'A', '10', 4)")
+    conexao.close()
+    with ArmazemAgregados(caminho) as armazem:
+        assert _serie(armazem) == {("2024-03-01", "A"): 4}
+
+
+def test_janela_termina_no_ultimo_dia_do_arquivo(tmp_path, monkeypatch):
+    monkeypatch.setattr(aggregate_store, "HISTORICO_ATIVO", True)
+    recente = tmp_path / "recente.csv"
+    antigo = tmp_path / "antigo.csv"
+    recente.write_text("recente")
+    antigo.write_text("antigo")
+
+    def agregados(dias):
+        diario = _diario({(dia, "A"): 1 for dia in dias})
+        return {"contagens": diario[["PA", "TIPO", "MOTORISTA", "QUANTIDADE"]], "diario": diario}
+
+    atualizar_historico(str(recente), agregados(["2024-06-01", "2024-06-02"]), janela_dias=30)
+    resultado = atualizar_historico(str(antigo), agregados(["2024-01-01", "2024-01-02", "2024-01-03"]),
+                                    janela_dias=30)
+    assert resultado["temporal"]["DATA"].max() == pd.Timestamp("2024-01-03")
+    assert len(resultado["temporal"]) == 3
+
+    filtrado = atualizar_historico(str(antigo), agregados(["2024-01-01"]), janela_dias=None, registrar=False)
+    assert "temporal" not in filtrado
+    with ArmazemAgregados(os.path.join(tmp_path, aggregate_store.PASTA_EXPORTADOS, aggregate_store.ARQUIVO_HISTORICO)) as armazem:
+        assert len(armazem.consultar_temporal()) == 5
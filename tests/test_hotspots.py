@@ -0,0 +1,84 @@
+"""
+Pontos críticos: célula de cada coordenada, soma por blocos e coordenadas inválidas
+
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PREFIXOS, TIPOS_DESCONSIDERAR
+from hotspots import AcumuladorHotspots, contar_hotspots, finalizar_hotspots
+
+PREFIXO_PA1 = sorted(PREFIXOS["PA1"])[0]
+PREFIXO_PA2 = sorted(PREFIXOS["PA2"])[0]
+
+
+def _registros(latitudes, longitudes, prefixo=PREFIXO_PA1, tipo="FADIGA"):
+    return pd.DataFrame({"PREFIXO": prefixo, "TIPO": tipo, "LATITUDE": latitudes, "LONGITUDE": longitudes})
+
+
+def test_celula_e_o_piso_da_coordenada_pela_resolucao():
+    contagem = contar_hotspots(_registros([-2.531, -2.539, -2.541, 0.005], [-44.301, -44.309, -44.301, 0.015]),
+                               resolucao=0.01)
+    celulas = {(linha.CELULA_LAT, linha.CELULA_LON): linha.QUANTIDADE for linha in contagem.itertuples()}
+    # Negativos arredondam para baixo: -2.531 e -2.539 caem na mesma célula, -2.541 na de baixo
+    assert celulas == {(-254, -4431): 2, (-255, -4431): 1, (0, 1): 1}
+    assert set(contagem["PA"]) == {"PA1"}
+
+
+def test_coordenadas_invalidas_ficam_de_fora():
+    contagem = contar_hotspots(_registros(
+        [np.nan, 95.0, -2.53, 0.0, "texto", "-2,53"],
+        [-44.3, -44.3, 200.0, 0.0, -44.3, "-44,30"],
+    ))
+    # Só a última linha (vírgula decimal) é válida: NaN, fora do intervalo, (0, 0) e texto saem
+    assert contagem["QUANTIDADE"].sum() == 1
+
+
+def test_prefixos_nao_roteados_e_tipos_desconsiderados_ficam_de_fora():
+    df = pd.concat([
+        _registros([-2.53], [-44.30]),
+        _registros([-2.53], [-44.30], prefixo="XX999"),
+        _registros([-2.53], [-44.30], tipo=sorted(TIPOS_DESCONSIDERAR)[0]),
+        _registros([-2.53], [-44.30], prefixo=PREFIXO_PA2, tipo=None),
+    ], ignore_index=True)
+    contagem = contar_hotspots(df)
+    assert contagem["QUANTIDADE"].sum() == 2
+    assert contagem["TIPO"].isna().sum() == 1
+
+
+def test_sem_coordenadas_nao_ha_contagem():
+    assert contar_hotspots(pd.DataFrame({"PREFIXO": [PREFIXO_PA1], "TIPO": ["FADIGA"]})) is None
+
+
+def test_acumulador_por_blocos_igual_ao_arquivo_inteiro():
+    rng = np.random.default_rng(7)
+    prefixos = sorted(set().union(*PREFIXOS.values()))
+    df = pd.DataFrame({
+        "PREFIXO": rng.choice(prefixos, 5_000),
+        "TIPO": rng.choice(["FADIGA", "CELULAR"], 5_000),
+        "LATITUDE": -2.53 + rng.normal(0, 0.05, 5_000),
+        "LONGITUDE": -44.30 + rng.normal(0, 0.05, 5_000),
+    })
+    acumulador = AcumuladorHotspots()
+    for inicio in range(0, len(df), 700):
+        acumulador.atualizar(contar_hotspots(df.iloc[inicio:inicio + 700]))
+    acumulador.atualizar(None)
+
+    chaves = ["PA", "TIPO", "CELULA_LAT", "CELULA_LON"]
+    esperado = finalizar_hotspots(contar_hotspots(df)).sort_values(chaves, ignore_index=True)
+    obtido = acumulador.resultado().sort_values(chaves, ignore_index=True)
+    pd.testing.assert_frame_equal(esperado, obtido)
+
+
+def test_centro_da_celula():
+    resultado = finalizar_hotspots(contar_hotspots(_registros([-2.531], [-44.309]), resolucao=0.01), resolucao=0.01)
+    assert np.isclose(resultado.loc[0, "LATITUDE"], -2.535)
+    assert np.isclose(resultado.loc[0, "LONGITUDE"], -44.305)
+    assert finalizar_hotspots(None) is None
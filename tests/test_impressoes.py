@@ -0,0 +1,66 @@
+"""
+Impressões digitais das saídas: o que muda a impressão de cada PA, do workbook e da execução
+
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+from dados_sinteticos import gerar_csv
+
+import config
+from fingerprint import ImpressaoExecucao
+from run_filters import FiltroExecucao
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    return gerar_csv(str(tmp_path / "alertas.csv"), 2_000)
+
+
+def _impressao(arquivo, filtro=None):
+    return ImpressaoExecucao(arquivo, "arquivos", False, filtro=filtro)
+
+
+def test_configuracao_de_exportacao_muda_a_impressao_de_todos_os_pas(arquivo, monkeypatch):
+    antes = _impressao(arquivo)
+    monkeypatch.setattr(config, "COLUNAS_REMOVER", [*config.COLUNAS_REMOVER, "VELOCIDADE"])
+    depois = _impressao(arquivo)
+    assert depois.entrada == antes.entrada
+    assert all(depois.particoes[pa] != antes.particoes[pa] for pa in config.PREFIXOS)
+    assert depois.nome_workbook() != antes.nome_workbook()
+    assert depois.execucao != antes.execucao
+
+
+def test_prefixos_de_um_pa_mudam_so_a_impressao_dele(arquivo, monkeypatch):
+    antes = _impressao(arquivo)
+    monkeypatch.setitem(config.PREFIXOS, "PA2", {*config.PREFIXOS["PA2"], "ZZ000"})
+    depois = _impressao(arquivo)
+    assert [pa for pa in config.PREFIXOS if depois.particoes[pa] != antes.particoes[pa]] == ["PA2"]
+    assert depois.workbook != antes.workbook
+
+
+def test_configuracao_dos_agregados_nao_invalida_as_particoes(arquivo, monkeypatch):
+    antes = _impressao(arquivo)
+    monkeypatch.setattr(config, "JANELA_TEMPORAL_DIAS", config.JANELA_TEMPORAL_DIAS + 1)
+    depois = _impressao(arquivo)
+    assert depois.particoes == antes.particoes
+    assert depois.execucao != antes.execucao
+
+
+def test_filtro_e_conteudo_da_entrada_mudam_a_impressao(arquivo):
+    antes = _impressao(arquivo)
+    assert _impressao(arquivo, FiltroExecucao(tipos_excluir="CELULAR")).particoes["PA1"] != antes.particoes["PA1"]
+    # Filtro inativo é o mesmo que nenhum filtro
+    assert _impressao(arquivo, FiltroExecucao()).particoes == antes.particoes
+
+    # Mesmo nome, conteúdo diferente: outra entrada
+    gerar_csv(arquivo, 2_000, seed=7)
+    assert _impressao(arquivo).entrada != antes.entrada
@@ -0,0 +1,147 @@
+"""
+Paridade entre os backends: partições e agregados iguais no pandas, no Polars, no pipeline e no DuckDB
+
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+from dados_sinteticos import gerar_csv, gerar_dataframe
+
+from config import PREFIXOS, ENCODING_CSV
+from backends import AcumuladorParciais, PandasBackend, PolarsBackend, combinar_parciais, pl
+from pipeline import PipelineProcessor
+from duckdb_aggregator import DuckDBAggregator, duckdb
+
+LINHAS = 20_000
+
+requer_polars = pytest.mark.skipif(pl is None, reason="polars não instalado")
+requer_duckdb = pytest.mark.skipif(duckdb is None, reason="duckdb não instalado")
+
+
+def _comparavel(df: pd.DataFrame) -> pd.DataFrame:
+    """Mesmas colunas, texto simples e ordem de linhas estável (categorias/strings Arrow saem da conta)"""
+    df = df[sorted(df.columns)].copy()
+    for coluna in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[coluna]) and not pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            df[coluna] = df[coluna].astype(object).where(df[coluna].notna(), None)
+    return df.sort_values(list(df.columns), na_position="last", ignore_index=True)
+
+
+def _assert_agregados_iguais(esperado: dict, obtido: dict):
+    chaves = {"contagens", "temporal", "diario", "horario"}
+    assert chaves & set(esperado) == chaves & set(obtido)
+    for chave in chaves & set(esperado):
+        pd.testing.assert_frame_equal(_comparavel(esperado[chave]), _comparavel(obtido[chave]),
+                                      check_dtype=False, obj=chave)
+
+
+@pytest.fixture(scope="module")
+def arquivo(tmp_path_factory):
+    return gerar_csv(str(tmp_path_factory.mktemp("dados") / "alertas.csv"), LINHAS)
+
+
+@pytest.fixture(scope="module")
+def particoes_pandas(arquivo):
+    backend = PandasBackend()
+    dados = backend.carregar(arquivo)
+    return {pa: backend.filtrar_por_prefixo(dados, prefixos, pa) for pa, prefixos in PREFIXOS.items()}
+
+
+@requer_polars
+def test_particoes_polars_iguais_ao_pandas(arquivo, particoes_pandas):
+    backend = PolarsBackend()
+    dados = backend.carregar(arquivo)
+    for pa, prefixos in PREFIXOS.items():
+        particao = backend.para_pandas(backend.filtrar_por_prefixo(dados, prefixos, pa))
+        pd.testing.assert_frame_equal(_comparavel(particoes_pandas[pa]), _comparavel(particao),
+                                      check_dtype=False, obj=pa)
+
+
+@requer_polars
+def test_agregados_polars_iguais_ao_pandas(arquivo, particoes_pandas):
+    backend = PolarsBackend()
+    dados = backend.carregar(arquivo)
+    agregados = backend.agregar([backend.filtrar_por_prefixo(dados, prefixos, pa) for pa, prefixos in PREFIXOS.items()])
+    _assert_agregados_iguais(PandasBackend().agregar(list(particoes_pandas.values())), agregados)
+
+
+@requer_polars
+def test_registros_carregados_iguais_nos_dois_backends(arquivo):
+    # O Polars já descarta prefixos não roteados na leitura, mas conta as linhas antes disso
+    pandas, polars = PandasBackend(), PolarsBackend()
+    dados = pandas.carregar(arquivo)
+    polars.carregar(arquivo)
+    assert pandas.registros_carregados == polars.registros_carregados == len(dados) == LINHAS
+
+
+def test_agregados_pipeline_iguais_ao_pandas(arquivo, particoes_pandas):
+    # Blocos pequenos: os agregados parciais de vários blocos precisam somar igual ao arquivo inteiro
+    resultado = PipelineProcessor(tamanho_chunk=3_000).processar_arquivo(arquivo)
+    assert resultado
+    _assert_agregados_iguais(PandasBackend().agregar(list(particoes_pandas.values())), resultado.agregados)
+
+    esperados = {pa: len(particao) for pa, particao in particoes_pandas.items() if len(particao)}
+    linhas = {}
+    for fragmento in resultado.manifesto:
+        linhas[fragmento["particao"]] = linhas.get(fragmento["particao"], 0) + fragmento["linhas"]
+    assert linhas == esperados
+
+
+@requer_duckdb
+def test_agregados_duckdb_iguais_ao_pandas(arquivo, particoes_pandas):
+    agregados = DuckDBAggregator().agregar_arquivo(arquivo)
+    _assert_agregados_iguais(PandasBackend().agregar(list(particoes_pandas.values())), agregados)
+
+
+@pytest.fixture(scope="module")
+def arquivo_sem_data(tmp_path_factory):
+    caminho = str(tmp_path_factory.mktemp("dados") / "alertas_sem_data.csv")
+    gerar_dataframe(5_000).drop(columns="DATA").to_csv(caminho, index=False, sep=";", encoding=ENCODING_CSV)
+    return caminho
+
+
+def _agregados_pandas(arquivo):
+    backend = PandasBackend()
+    dados = backend.carregar(arquivo)
+    return backend.agregar([backend.filtrar_por_prefixo(dados, prefixos, pa) for pa, prefixos in PREFIXOS.items()])
+
+
+def test_temporal_simulado_igual_em_todos_os_motores(arquivo_sem_data, monkeypatch):
+    # Sem DATA a chave de deduplicação repete muito: os motores comparam as mesmas linhas
+    monkeypatch.setattr("duckdb_aggregator.DEDUPLICAR", False)
+    esperado = _agregados_pandas(arquivo_sem_data)
+    assert "horario" not in esperado and "diario" not in esperado
+    assert (esperado["temporal"]["QUANTIDADE"] == 1).all()
+
+    obtidos = [PipelineProcessor(tamanho_chunk=700).processar_arquivo(arquivo_sem_data).agregados]
+    if duckdb is not None:
+        obtidos.append(DuckDBAggregator().agregar_arquivo(arquivo_sem_data))
+    if pl is not None:
+        backend = PolarsBackend()
+        dados = backend.carregar(arquivo_sem_data)
+        obtidos.append(backend.agregar([backend.filtrar_por_prefixo(dados, prefixos, pa)
+                                        for pa, prefixos in PREFIXOS.items()]))
+    for agregados in obtidos:
+        _assert_agregados_iguais(esperado, agregados)
+
+
+@pytest.mark.parametrize("minimo_lote", [1, 10_000])
+def test_acumulador_soma_igual_ao_arquivo_inteiro(particoes_pandas, monkeypatch, minimo_lote):
+    # Lote mínimo 1: o acumulado é somado várias vezes ao longo dos blocos
+    monkeypatch.setattr(AcumuladorParciais, "MINIMO_LOTE", minimo_lote)
+    backend = PandasBackend()
+    acumulador = AcumuladorParciais()
+    for particao in particoes_pandas.values():
+        for inicio in range(0, len(particao), 1_500):
+            acumulador.adicionar(backend.agregar_parcial(particao.iloc[inicio:inicio + 1_500]))
+    _assert_agregados_iguais(backend.agregar(list(particoes_pandas.values())),
+                             combinar_parciais([acumulador.resultado()]))
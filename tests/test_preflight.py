@@ -0,0 +1,101 @@
+"""
+Verificação prévia: esquema, escolha de modo, backend e tamanho de bloco, e o erro de esquema para quem chama
+
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+from dados_sinteticos import gerar_csv
+
+import preflight
+from config import ENCODING_CSV, PASTA_EXPORTADOS
+from data_processor import DataProcessor
+from preflight import ErroEsquema, verificar_arquivo
+from run_filters import FiltroExecucao
+from run_manifest import retomar_execucao
+
+
+@pytest.fixture(scope="module")
+def arquivo(tmp_path_factory):
+    return gerar_csv(str(tmp_path_factory.mktemp("dados") / "alertas.csv"), 20_000)
+
+
+def _csv(tmp_path, texto):
+    caminho = tmp_path / "entrada.csv"
+    caminho.write_text(texto, encoding=ENCODING_CSV)
+    return str(caminho)
+
+
+def test_arquivo_pequeno_fica_em_memoria_com_pandas(arquivo):
+    verificacao = verificar_arquivo(arquivo)
+    assert verificacao["linhas_estimadas"] == 20_000
+    assert verificacao["modo"] == "memoria"
+    assert verificacao["backend"] == "pandas"
+    assert verificacao["motor_relatorio"] is None
+    assert 10_000 <= verificacao["tamanho_chunk"] <= 1_000_000
+    assert verificacao["avisos"] == []
+
+
+@pytest.mark.skipif(preflight.polars is None, reason="polars não instalado")
+def test_arquivo_grande_em_memoria_usa_polars(arquivo, monkeypatch):
+    monkeypatch.setattr(preflight, "PREFLIGHT_LINHAS_POLARS", 10_000)
+    assert verificar_arquivo(arquivo)["backend"] == "polars"
+    # No pipeline a leitura é em blocos do pandas: o backend não muda
+    monkeypatch.setattr(preflight, "memoria_disponivel", lambda: 1 << 20)
+    assert verificar_arquivo(arquivo)["backend"] == "pandas"
+
+
+def test_sem_memoria_vai_para_o_pipeline_com_blocos_menores(arquivo, monkeypatch):
+    folgada = verificar_arquivo(arquivo)
+    monkeypatch.setattr(preflight, "memoria_disponivel", lambda: folgada["memoria_estimada"] // 3)
+    apertada = verificar_arquivo(arquivo)
+    assert apertada["modo"] == "pipeline"
+    assert apertada["tamanho_chunk"] <= folgada["tamanho_chunk"]
+    assert apertada["motor_relatorio"] == ("duckdb" if preflight.duckdb is not None else None)
+
+    # Orçamento minúsculo: o bloco não desce do piso
+    monkeypatch.setattr(preflight, "memoria_disponivel", lambda: 1 << 20)
+    assert verificar_arquivo(arquivo)["tamanho_chunk"] == 10_000
+    # Sem como medir a RAM, fica em memória
+    monkeypatch.setattr(preflight, "memoria_disponivel", lambda: None)
+    assert verificar_arquivo(arquivo)["modo"] == "memoria"
+
+
+def test_problemas_de_esquema(tmp_path):
+    with pytest.raises(ErroEsquema, match="vazio"):
+        verificar_arquivo(_csv(tmp_path, ""))
+    with pytest.raises(ErroEsquema, match="PREFIXO"):
+        verificar_arquivo(_csv(tmp_path, "PLACA;TIPO\nABC;FADIGA\n"))
+    with pytest.raises(ErroEsquema, match="sem registros"):
+        verificar_arquivo(_csv(tmp_path, "PREFIXO;TIPO\n"))
+    avisos = verificar_arquivo(_csv(tmp_path, "PREFIXO;TIPO\n10;FADIGA\n"))["avisos"]
+    assert any("MOTORISTA" in aviso for aviso in avisos)
+    assert any("data" in aviso for aviso in avisos)
+
+
+def test_erro_de_esquema_chega_antes_de_qualquer_saida(tmp_path):
+    caminho = _csv(tmp_path, "PREFIXO;TIPO\n10;FADIGA\n")
+    with pytest.raises(ErroEsquema, match="MOTORISTA"):
+        DataProcessor().processar_arquivo(caminho, filtro=FiltroExecucao(motoristas="ANA"))
+    assert not os.path.exists(os.path.join(tmp_path, PASTA_EXPORTADOS))
+    # A retomada pela linha de comando avisa e sai sem relatório
+    assert retomar_execucao(caminho, filtro=FiltroExecucao(motoristas="ANA")) is None
+
+
+@pytest.mark.skipif(preflight.polars is None, reason="polars não instalado")
+def test_backend_automatico_segue_a_verificacao(tmp_path, monkeypatch, capsys):
+    caminho = gerar_csv(str(tmp_path / "alertas.csv"), 3_000)
+    monkeypatch.setattr(preflight, "PREFLIGHT_LINHAS_POLARS", 1_000)
+    assert DataProcessor().processar_arquivo(caminho, forcar=True)
+    assert "backend polars" in capsys.readouterr().out
+    # Backend escolhido por quem chama prevalece
+    assert DataProcessor(backend="pandas").processar_arquivo(caminho, forcar=True)
+    assert "backend pandas" in capsys.readouterr().out
@@ -0,0 +1,90 @@
+"""
+Ranking de motoristas: ranking exato, limites de erro do esboço Space-Saving e escolha entre os dois
+
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from driver_ranking import EsbocoSpaceSaving, RankingMotoristas, RankingStreaming, ranking_motoristas
+
+
+def _cubo_assimetrico(linhas=200_000, motoristas=5_000, seed=11):
+    """Cubo PA/TIPO/MOTORISTA com motoristas em distribuição de Zipf (poucos concentram os alertas)"""
+    rng = np.random.default_rng(seed)
+    sorteio = np.minimum(rng.zipf(1.3, linhas), motoristas)
+    df = pd.DataFrame({
+        "PA": rng.choice(["PA1", "PA2", "PA3"], linhas),
+        "TIPO": rng.choice(["FADIGA", "CELULAR", "CIGARRO"], linhas),
+        "MOTORISTA": [f"MOTORISTA {i:05d}" for i in sorteio],
+    })
+    return df.groupby(["PA", "TIPO", "MOTORISTA"]).size().reset_index(name="QUANTIDADE")
+
+
+def _blocos(cubo, tamanho=5_000, seed=5):
+    ordem = np.random.default_rng(seed).permutation(len(cubo))
+    for inicio in range(0, len(cubo), tamanho):
+        yield cubo.iloc[ordem[inicio:inicio + tamanho]]
+
+
+def test_esboco_nunca_subestima_e_respeita_o_erro_maximo():
+    cubo = _cubo_assimetrico()
+    reais = cubo.groupby("MOTORISTA")["QUANTIDADE"].sum()
+    esboco = EsbocoSpaceSaving(capacidade=200)
+    for bloco in _blocos(cubo):
+        esboco.atualizar(bloco.groupby("MOTORISTA")["QUANTIDADE"].sum())
+
+    assert esboco.total == int(reais.sum())
+    assert len(esboco.contagens) <= 200
+    excesso = esboco.contagens - reais.loc[esboco.contagens.index]
+    assert (excesso >= 0).all()
+    assert (excesso <= esboco.erros).all()
+    assert esboco.erros.max() <= esboco.erro_maximo
+
+
+def test_motoristas_garantidos_estao_no_top_real():
+    cubo = _cubo_assimetrico()
+    reais = cubo.groupby("MOTORISTA")["QUANTIDADE"].sum()
+    esboco = EsbocoSpaceSaving(capacidade=200)
+    for bloco in _blocos(cubo):
+        esboco.atualizar(bloco.groupby("MOTORISTA")["QUANTIDADE"].sum())
+
+    top = esboco.top(7)
+    top_real = set(reais.nlargest(7).index)
+    assert top["GARANTIDO"].any()
+    assert set(top.loc[top["GARANTIDO"], "MOTORISTA"]) <= top_real
+
+
+def test_streaming_concorda_com_o_exato_em_dados_assimetricos():
+    cubo = _cubo_assimetrico()
+    exato = RankingMotoristas(k=7).calcular(cubo)
+    streaming = RankingStreaming(capacidade=500)
+    for bloco in _blocos(cubo):
+        streaming.atualizar(bloco)
+    estimado = streaming.calcular(k=7)
+
+    assert estimado["global"]["MOTORISTA"].tolist() == exato["global"]["MOTORISTA"].tolist()
+    for nome, coluna in (("por_pa", "PA"), ("por_tipo", "TIPO")):
+        for valor, grupo in exato[nome].groupby(coluna):
+            obtido = estimado[nome][estimado[nome][coluna] == valor]
+            assert obtido["MOTORISTA"].tolist()[:3] == grupo["MOTORISTA"].tolist()[:3]
+
+
+def test_ranking_exato_quando_ha_cubo_de_contagens():
+    cubo = _cubo_assimetrico(linhas=20_000)
+    # Esboço minúsculo, propositalmente errado: com o cubo presente ele é ignorado
+    esboco = RankingStreaming(capacidade=2)
+    for bloco in _blocos(cubo, tamanho=100):
+        esboco.atualizar(bloco)
+    exato = RankingMotoristas(k=7).calcular(cubo)
+
+    ranking = ranking_motoristas({"contagens": cubo, "ranking": esboco}, k=7)
+    pd.testing.assert_frame_equal(ranking["global"], exato["global"])
+    assert "ERRO" in ranking_motoristas({"ranking": esboco}, k=7)["global"].columns
+    assert ranking_motoristas({}, k=7) is None
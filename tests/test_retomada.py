@@ -0,0 +1,123 @@
+"""
+Retomada de execuções: interrupção no meio da exportação e reexportação só do que falta
+
+Uso: python -m pytest tests
+"""
+
+import glob
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+from dados_sinteticos import gerar_csv
+
+import config
+import data_processor
+from data_processor import DataProcessor
+from excel_writer import StreamingExcelWriter
+from fingerprint import ImpressaoExecucao
+from run_manifest import abrir_manifesto, caminho_temporario, checksum
+
+OPCOES = {"modo": "memoria", "modo_exportacao": "arquivos", "deduplicar": False, "backend": "pandas"}
+
+
+class Interrompido(BaseException):
+    """Queda do processo: não é pega pelo tratamento de erro por PA"""
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    return gerar_csv(str(tmp_path / "alertas.csv"), 4_000)
+
+
+def _impressao(arquivo, filtro=None):
+    return ImpressaoExecucao(arquivo, OPCOES["modo_exportacao"], OPCOES["deduplicar"], filtro=filtro)
+
+
+def _gravados(monkeypatch, interromper_em=None):
+    """Troca o escritor do processamento por um que anota cada PA gravado e pode cair no meio"""
+    gravados = []
+
+    class Escritor(StreamingExcelWriter):
+        def fechar(self):
+            if interromper_em is not None and len(gravados) == interromper_em:
+                # Cai entre a gravação do temporário e a publicação
+                for caminho, wb in self._workbooks.items():
+                    wb.save(caminho_temporario(caminho))
+                raise Interrompido()
+            super().fechar()
+            gravados.append(self.caminho)
+
+    monkeypatch.setattr(data_processor, "StreamingExcelWriter", Escritor)
+    return gravados
+
+
+def _interromper(arquivo, monkeypatch, depois_de=2):
+    gravados = _gravados(monkeypatch, interromper_em=depois_de)
+    with pytest.raises(Interrompido):
+        DataProcessor().processar_arquivo(arquivo, **OPCOES)
+    return gravados
+
+
+def test_execucao_interrompida_deixa_so_as_particoes_publicadas(arquivo, monkeypatch):
+    gravados = _interromper(arquivo, monkeypatch)
+    impressao = _impressao(arquivo)
+    manifesto = abrir_manifesto(arquivo, retomar=True, impressao=impressao.entrada)
+
+    validas = manifesto.particoes_validas(impressao.particoes)
+    assert sorted(validas) == ["PA1", "PA2"]
+    assert [fragmento["arquivo"] for pa in ("PA1", "PA2") for fragmento in validas[pa]] == gravados
+    assert manifesto.etapa("exportacao") is None
+    assert manifesto.resultado_concluido(impressao.execucao) is None
+    # A retomada apaga o temporário que a queda deixou
+    assert glob.glob(os.path.join(os.path.dirname(gravados[0]), ".*.parcial.xlsx")) == []
+
+
+def test_retomada_reexporta_so_as_particoes_que_faltam(arquivo, monkeypatch):
+    publicados = _interromper(arquivo, monkeypatch)
+    somas = {caminho: checksum(caminho) for caminho in publicados}
+    datas = {caminho: os.stat(caminho).st_mtime_ns for caminho in publicados}
+
+    gravados = _gravados(monkeypatch)
+    resultado = DataProcessor().processar_arquivo(arquivo, retomar=True, **OPCOES)
+    impressao = _impressao(arquivo)
+    assert [os.path.basename(caminho) for caminho in gravados] == [impressao.nome_particao(pa) for pa in ("PA3", "PA4")]
+    assert sorted(fragmento["particao"] for fragmento in resultado.manifesto) == sorted(config.PREFIXOS)
+    # Os PAs da execução interrompida não foram regravados
+    assert {caminho: checksum(caminho) for caminho in publicados} == somas
+    assert {caminho: os.stat(caminho).st_mtime_ns for caminho in publicados} == datas
+
+    # Execução completa: a próxima retomada reaproveita tudo, agregados inclusive
+    gravados.clear()
+    retomado = DataProcessor().processar_arquivo(arquivo, retomar=True, **OPCOES)
+    assert gravados == []
+    assert retomado.estatisticas["retomado"]
+    assert sorted(retomado) == sorted(resultado)
+
+
+def test_arquivo_exportado_alterado_volta_a_ser_gerado(arquivo, monkeypatch):
+    _interromper(arquivo, monkeypatch)
+    impressao = _impressao(arquivo)
+    alterado = os.path.join(os.path.dirname(arquivo), config.PASTA_EXPORTADOS, impressao.nome_particao("PA2"))
+    with open(alterado, "ab") as saida:
+        saida.write(b"\0")
+
+    gravados = _gravados(monkeypatch)
+    DataProcessor().processar_arquivo(arquivo, retomar=True, **OPCOES)
+    assert [os.path.basename(caminho) for caminho in gravados] == \
+        [impressao.nome_particao(pa) for pa in ("PA2", "PA3", "PA4")]
+
+
+def test_entrada_alterada_descarta_o_manifesto_anterior(arquivo, monkeypatch, capsys):
+    _interromper(arquivo, monkeypatch)
+    gerar_csv(arquivo, 4_000, seed=7)
+
+    gravados = _gravados(monkeypatch)
+    DataProcessor().processar_arquivo(arquivo, retomar=True, **OPCOES)
+    assert "Arquivo de origem mudou" in capsys.readouterr().out
+    assert len(gravados) == len(config.PREFIXOS)
@@ -0,0 +1,119 @@
+"""
+Leitura em streaming: zip com vários membros, cabeçalhos repetidos, CRLF misturado e gzip/zstd
+
+Uso: python -m pytest tests
+"""
+
+import gzip
+import io
+import os
+import sys
+import zipfile
+
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+from dados_sinteticos import gerar_dataframe
+
+from config import ENCODING_CSV, PREFIXOS
+from backends import PandasBackend
+from duckdb_aggregator import DuckDBAggregator, duckdb
+from source_reader import _ZipConcatenado, abrir_fonte, zstandard
+
+
+@pytest.fixture(scope="module")
+def alertas():
+    return gerar_dataframe(3_000)
+
+
+def _texto(df, cabecalho=True, crlf=False):
+    texto = df.to_csv(index=False, sep=";", header=cabecalho, lineterminator="\n")
+    return (texto.replace("\n", "\r\n") if crlf else texto).encode(ENCODING_CSV)
+
+
+def _zip_em_partes(caminho, df, crlf=(False, True, False)):
+    """Um membro por parte, gravados fora de ordem, com um LEIA-ME que não é CSV"""
+    tamanho = -(-len(df) // len(crlf))
+    partes = [df.iloc[i * tamanho:(i + 1) * tamanho] for i in range(len(crlf))]
+    with zipfile.ZipFile(caminho, "w", zipfile.ZIP_DEFLATED) as arquivo:
+        arquivo.writestr("LEIA-ME.txt", "exportação do portal")
+        for indice in reversed(range(len(partes))):
+            dados = _texto(partes[indice], crlf=crlf[indice])
+            # O último membro termina sem quebra de linha
+            arquivo.writestr(f"alertas_{indice}.csv", dados.rstrip(b"\r\n") if indice == len(partes) - 1 else dados)
+    return str(caminho)
+
+
+def _ler(stream):
+    return pd.read_csv(stream, sep=";", encoding=ENCODING_CSV, dtype=str)
+
+
+def test_zip_com_varios_membros_vira_um_so_dataset(tmp_path, alertas):
+    caminho = _zip_em_partes(tmp_path / "alertas.zip", alertas)
+    with abrir_fonte(caminho) as fonte:
+        lido = _ler(fonte.stream)
+    pd.testing.assert_frame_equal(lido, _ler(io.BytesIO(_texto(alertas))))
+
+
+def test_leitura_em_pedacos_pequenos_pula_cabecalhos_e_normaliza_crlf(tmp_path, alertas):
+    # Pedaços de 7 bytes partem cabeçalhos e pares CRLF na fronteira entre leituras
+    caminho = _zip_em_partes(tmp_path / "alertas.zip", alertas.head(40), crlf=(True, False, True))
+    with open(caminho, "rb") as bruto:
+        stream = _ZipConcatenado(bruto)
+        pedacos = []
+        while True:
+            pedaco = stream.read(7)
+            if not pedaco:
+                break
+            pedacos.append(pedaco)
+        stream.close()
+    assert b"".join(pedacos) == _texto(alertas.head(40)).rstrip(b"\n")
+
+
+def test_cabecalho_diferente_entre_membros(tmp_path, alertas):
+    caminho = tmp_path / "alertas.zip"
+    with zipfile.ZipFile(caminho, "w") as arquivo:
+        arquivo.writestr("a.csv", _texto(alertas.head(5)))
+        arquivo.writestr("b.csv", _texto(alertas.head(5).rename(columns={"TIPO": "EVENTO"})))
+    with abrir_fonte(str(caminho)) as fonte, pytest.raises(ValueError, match="b.csv"):
+        fonte.stream.read()
+
+
+@pytest.mark.skipif(duckdb is None, reason="duckdb não instalado")
+def test_duckdb_le_zip_com_crlf_e_lf_misturados(tmp_path, alertas):
+    caminho = _zip_em_partes(tmp_path / "alertas.zip", alertas)
+    plano = tmp_path / "alertas.csv"
+    plano.write_bytes(_texto(alertas))
+
+    backend = PandasBackend()
+    dados = backend.carregar(str(plano))
+    esperado = backend.agregar([backend.filtrar_por_prefixo(dados, prefixos, pa) for pa, prefixos in PREFIXOS.items()])
+    obtido = DuckDBAggregator().agregar_arquivo(caminho)
+    pd.testing.assert_series_equal(esperado["temporal"].groupby("DATA")["QUANTIDADE"].sum(),
+                                   obtido["temporal"].groupby("DATA")["QUANTIDADE"].sum(), check_dtype=False)
+
+
+def test_gzip_com_varios_membros_em_streaming(tmp_path, alertas):
+    # Exportações concatenadas com cat geram um .gz de vários membros
+    caminho = tmp_path / "alertas.csv.gz"
+    caminho.write_bytes(gzip.compress(_texto(alertas.head(1_500)))
+                        + gzip.compress(_texto(alertas.iloc[1_500:], cabecalho=False)))
+    with abrir_fonte(str(caminho)) as fonte:
+        assert fonte.progresso() == 0.0
+        assert fonte.stream.read() == _texto(alertas)
+        assert fonte.progresso() == 1.0
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard não instalado")
+def test_zstd_com_varios_quadros_em_streaming(tmp_path, alertas):
+    compressor = zstandard.ZstdCompressor()
+    caminho = tmp_path / "alertas.csv.zst"
+    caminho.write_bytes(compressor.compress(_texto(alertas.head(1_500)))
+                        + compressor.compress(_texto(alertas.iloc[1_500:], cabecalho=False)))
+    with abrir_fonte(str(caminho)) as fonte:
+        assert fonte.stream.read() == _texto(alertas)
+        assert fonte.progresso() == 1.0
@@ -7,6 +7,7 @@ from typing import Optional, Callable
 from config import WINDOW_TITLE, CTK_THEME, CTK_APPEARANCE, CTK_COLORS, PASTA_EXPORTADOS
 from data_processor import DataProcessor
 from chart_generator import ChartGenerator
+from session_cache import CacheSessao
 
 class UIBase(ctk.CTk):
     def __init__(self):
@@ -23,9 +24,12 @@ class UIBase(ctk.CTk):
         
         self.arquivo_selecionado = None
         self.processando = False
+        self.pular_relatorio = False
         
         self.data_processor = DataProcessor()
         self.chart_generator = ChartGenerator()
+        # Datasets e agregados dos arquivos já processados (refazer relatório sem reler)
+        self.sessao = CacheSessao()
         
     def center_window(self):
         self.update_idletasks()
@@ -5,8 +5,10 @@ from ui_handlers import UIHandlers
 from ui_dialogs import UIDialogs
 
 class ProcessadorUI(UIBase):
-    def __init__(self):
+    def __init__(self, criar_filtro=None):
         super().__init__()
+        # Filtro da execução (linha de comando), montado a cada arquivo; None = o da configuração
+        self.criar_filtro = criar_filtro
         
         self.components = UIComponents(self)
         self.handlers = UIHandlers(self)
@@ -26,6 +28,9 @@ class ProcessadorUI(UIBase):
     def selecionar_arquivo(self):
         self.handlers.selecionar_arquivo()
     
+    def refazer_relatorio(self):
+        self.handlers.refazer_relatorio()
+    
     def processar_arquivo_thread(self, filepath):
         self.handlers.processar_arquivo_thread(filepath)
     
@@ -2,6 +2,10 @@ import customtkinter as ctk
 import os
 import subprocess
 import platform
+import threading
+from PIL import Image
+
+from config import TOP_MOTORISTAS, FORMATO_RELATORIO
 
 class UIDialogs:
     def __init__(self, parent):
@@ -83,6 +87,157 @@ class UIDialogs:
             text_color="#198754"
         )
     
+    def mostrar_previa(self, caminho_imagem: str):
+        imagem = Image.open(caminho_imagem)
+        largura = min(imagem.width, 900)
+        altura = int(imagem.height * largura / imagem.width)
+
+        preview_window = ctk.CTkToplevel(self.parent)
+        preview_window.title("Prévia do Relatório")
+        preview_window.geometry(f"{largura + 40}x{altura + 110}")
+        preview_window.transient(self.parent)
+        preview_window.configure(fg_color="white")
+
+        preview_image = ctk.CTkLabel(
+            preview_window,
+            text="",
+            image=ctk.CTkImage(light_image=imagem, size=(largura, altura))
+        )
+        preview_image.pack(padx=20, pady=(20, 10))
+
+        button_frame = ctk.CTkFrame(preview_window, fg_color="white")
+        button_frame.pack(fill="x", pady=(0, 20))
+
+        def pular():
+            self.parent.pular_relatorio = True
+            self.parent.status_label.configure(
+                text="⏭️ Relatório completo será pulado (arquivos Excel continuam sendo gerados)",
+                text_color="#6c757d"
+            )
+            preview_window.destroy()
+
+        skip_button = ctk.CTkButton(
+            button_frame,
+            text="⏭️ Pular Relatório Completo",
+            command=pular,
+            width=200,
+            fg_color="#6c757d",
+            hover_color="#5c636a"
+        )
+        skip_button.pack(side="left", padx=(20, 10))
+
+        continue_button = ctk.CTkButton(
+            button_frame,
+            text="✅ Continuar",
+            command=preview_window.destroy,
+            width=200,
+            fg_color="#198754",
+            hover_color="#157347"
+        )
+        continue_button.pack(side="right", padx=(10, 20))
+
+    def mostrar_visualizador(self, agregados, gerador=None, titulo=""):
+        # Import tardio: o visualizador carrega o backend Tk do matplotlib
+        from chart_viewer import VisualizadorGraficos
+        VisualizadorGraficos(self.parent, agregados, gerador, titulo)
+
+    def mostrar_opcoes_relatorio(self):
+        arquivos = self.parent.sessao.arquivos()
+        nomes = {os.path.basename(caminho): caminho for caminho in arquivos}
+
+        options_window = ctk.CTkToplevel(self.parent)
+        options_window.title("Refazer Relatório")
+        options_window.geometry("420x520")
+        options_window.resizable(False, False)
+        options_window.transient(self.parent)
+        options_window.grab_set()
+        options_window.configure(fg_color="white")
+
+        options_frame = ctk.CTkFrame(
+            options_window,
+            fg_color="white",
+            border_width=1,
+            border_color="#dee2e6"
+        )
+        options_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        options_title = ctk.CTkLabel(
+            options_frame,
+            text="🔁 Refazer Relatório",
+            font=ctk.CTkFont(size=18, weight="bold"),
+            text_color="#1f538d"
+        )
+        options_title.pack(pady=(15, 10))
+
+        arquivo_var = ctk.StringVar(value=next(iter(nomes)))
+        arquivo_menu = ctk.CTkOptionMenu(options_frame, values=list(nomes), variable=arquivo_var, width=340)
+        arquivo_menu.pack(pady=(0, 10))
+
+        top_frame = ctk.CTkFrame(options_frame, fg_color="white")
+        top_frame.pack(fill="x", padx=20, pady=(0, 10))
+        ctk.CTkLabel(top_frame, text="Top motoristas:", font=ctk.CTkFont(size=12)).pack(side="left")
+        top_var = ctk.StringVar(value=str(TOP_MOTORISTAS))
+        ctk.CTkOptionMenu(top_frame, values=["5", "7", "10", "15", "20"], variable=top_var,
+                          width=80).pack(side="right")
+
+        formato_frame = ctk.CTkFrame(options_frame, fg_color="white")
+        formato_frame.pack(fill="x", padx=20, pady=(0, 10))
+        ctk.CTkLabel(formato_frame, text="Formato:", font=ctk.CTkFont(size=12)).pack(side="left")
+        formato_var = ctk.StringVar(value=FORMATO_RELATORIO)
+        ctk.CTkSegmentedButton(formato_frame, values=["png", "pdf", "ambos"],
+                               variable=formato_var).pack(side="right")
+
+        ctk.CTkLabel(options_frame, text="Excluir tipos de alerta:",
+                     font=ctk.CTkFont(size=12)).pack(anchor="w", padx=20)
+        tipos_frame = ctk.CTkScrollableFrame(options_frame, height=170, fg_color="#f8f9fa")
+        tipos_frame.pack(fill="x", padx=20, pady=(0, 10))
+        tipos_vars = {}
+
+        def carregar_tipos(nome):
+            for widget in tipos_frame.winfo_children():
+                widget.destroy()
+            tipos_vars.clear()
+            for tipo in self.parent.sessao.tipos(nomes[nome]):
+                tipos_vars[tipo] = ctk.BooleanVar(value=False)
+                ctk.CTkCheckBox(tipos_frame, text=tipo, variable=tipos_vars[tipo],
+                                font=ctk.CTkFont(size=11)).pack(anchor="w", pady=2)
+
+        arquivo_menu.configure(command=carregar_tipos)
+        carregar_tipos(arquivo_var.get())
+
+        def gerar():
+            tipos_excluir = {tipo for tipo, var in tipos_vars.items() if var.get()}
+            thread = threading.Thread(
+                target=self.parent.handlers.refazer_relatorio_thread,
+                args=(nomes[arquivo_var.get()], int(top_var.get()), tipos_excluir, formato_var.get())
+            )
+            thread.daemon = True
+            thread.start()
+            options_window.destroy()
+
+        button_frame = ctk.CTkFrame(options_frame, fg_color="white")
+        button_frame.pack(fill="x", pady=(0, 15))
+
+        generate_button = ctk.CTkButton(
+            button_frame,
+            text="🔁 Gerar",
+            command=gerar,
+            width=150,
+            fg_color="#198754",
+            hover_color="#157347"
+        )
+        generate_button.pack(side="left", padx=(20, 10))
+
+        cancel_button = ctk.CTkButton(
+            button_frame,
+            text="Cancelar",
+            command=options_window.destroy,
+            width=150,
+            fg_color="#6c757d",
+            hover_color="#5c636a"
+        )
+        cancel_button.pack(side="right", padx=(10, 20))
+
     def mostrar_erro(self, erro):
         error_window = ctk.CTkToplevel(self.parent)
         error_window.title("Erro no Processamento")
@@ -1,7 +1,14 @@
 from tkinter import filedialog
 import threading
+import tempfile
 import os
 
+from config import MOTOR_RELATORIO, PREVIA_AUTOMATICA, VISUALIZADOR_EMBUTIDO
+from source_reader import TIPOS_ARQUIVO_SUPORTADOS
+from chart_generator import ChartGenerator
+from duckdb_aggregator import DuckDBAggregator
+from run_filters import FiltroExecucao
+
 class UIHandlers:
     def __init__(self, parent):
         self.parent = parent
@@ -12,14 +19,25 @@ class UIHandlers:
             
         filepath = filedialog.askopenfilename(
             title="Selecione o arquivo CSV",
-            filetypes=[("Arquivos CSV", "*.csv"), ("Todos os arquivos", "*.*")]
+            filetypes=TIPOS_ARQUIVO_SUPORTADOS
         )
         
         if filepath:
             self.parent.arquivo_selecionado = filepath
+            self.parent.pular_relatorio = False
             thread = threading.Thread(target=self.processar_arquivo_thread, args=(filepath,))
             thread.daemon = True
             thread.start()
+            
+            if PREVIA_AUTOMATICA:
+                previa = threading.Thread(target=self.gerar_previa_thread, args=(filepath,))
+                previa.daemon = True
+                previa.start()
+    
+    def gerar_previa_thread(self, filepath):
+        caminho = self.parent.chart_generator.gerar_previa(filepath, pasta_saida=tempfile.gettempdir())
+        if caminho and self.parent.processando:
+            self.parent.after(0, lambda: self.parent.dialogs.mostrar_previa(caminho))
     
     def processar_arquivo_thread(self, filepath):
         self.parent.processando = True
@@ -27,23 +45,91 @@ class UIHandlers:
         self.parent.after(0, self.mostrar_progresso)
         
         try:
+            # O mesmo filtro vale para a exportação e para a reagregação do relatório
+            criar_filtro = getattr(self.parent, "criar_filtro", None) or FiltroExecucao.da_configuracao
+            filtro = criar_filtro()
             arquivos_gerados = self.parent.data_processor.processar_arquivo(
                 filepath, 
-                progress_callback=self.atualizar_progresso
+                progress_callback=self.atualizar_progresso,
+                sessao=self.parent.sessao,
+                filtro=filtro
             )
             
-            if arquivos_gerados:
-                self.parent.chart_generator.gerar_graficos(arquivos_gerados)
+            estatisticas = getattr(arquivos_gerados, "estatisticas", None) or {}
+            motor = estatisticas.get("verificacao", {}).get("motor_relatorio") or MOTOR_RELATORIO
+            
+            agregados = getattr(arquivos_gerados, "agregados", None)
+            if arquivos_gerados and VISUALIZADOR_EMBUTIDO and motor == "duckdb":
+                agregados = DuckDBAggregator().agregar_arquivo(filepath, filtro)
+            
+            if self.parent.pular_relatorio:
+                print("⏭️ Relatório completo pulado após a prévia")
+            elif arquivos_gerados and VISUALIZADOR_EMBUTIDO and agregados is not None:
+                # Painéis na tela; o relatório em alta resolução fica para o botão Exportar
+                titulo = os.path.basename(filepath)
+                self.parent.after(0, lambda: self.parent.dialogs.mostrar_visualizador(
+                    agregados, self.parent.chart_generator, titulo
+                ))
+            elif arquivos_gerados and motor == "duckdb":
+                self.parent.chart_generator.gerar_graficos_do_arquivo(filepath, filtro=filtro)
+            elif arquivos_gerados:
+                self.parent.chart_generator.gerar_graficos(arquivos_gerados, agregados=agregados)
             
             self.parent.after(0, lambda: self.parent.dialogs.mostrar_sucesso(arquivos_gerados))
             
         except Exception as e:
-            self.parent.after(0, lambda: self.parent.dialogs.mostrar_erro(str(e)))
+            # ``e`` deixa de existir ao fim do except: a mensagem vai ligada ao callback
+            msg = str(e)
+            self.parent.after(0, lambda msg=msg: self.parent.dialogs.mostrar_erro(msg))
         
         finally:
             self.parent.processando = False
             self.parent.after(2000, self.ocultar_progresso)
     
+    def refazer_relatorio(self):
+        if self.parent.processando or not self.parent.sessao.arquivos():
+            return
+        self.parent.dialogs.mostrar_opcoes_relatorio()
+    
+    def refazer_relatorio_thread(self, filepath, top_motoristas, tipos_excluir, formato):
+        self.parent.processando = True
+        self.parent.after(0, lambda: self.parent.status_label.configure(
+            text="🔁 Refazendo relatório a partir do cache da sessão...",
+            text_color="#0d6efd"
+        ))
+        
+        try:
+            agregados = self.parent.sessao.reagregar(filepath, tipos_excluir)
+            if agregados is None:
+                raise ValueError("O arquivo não está mais no cache da sessão ou não sobrou nenhum alerta")
+            
+            gerador = ChartGenerator(top_motoristas=top_motoristas, formato=formato)
+            if VISUALIZADOR_EMBUTIDO:
+                titulo = os.path.basename(filepath)
+                self.parent.after(0, lambda: self.parent.dialogs.mostrar_visualizador(agregados, gerador, titulo))
+                self.parent.after(0, lambda: self.parent.status_label.configure(
+                    text="✅ Relatório refeito na janela de visualização",
+                    text_color="#198754"
+                ))
+                return
+            
+            relatorio = gerador.gerar_graficos([], agregados=agregados)
+            if relatorio is None:
+                raise ValueError("Não foi possível gerar o relatório")
+            
+            self.parent.after(0, lambda: self.parent.status_label.configure(
+                text=f"✅ Relatório refeito: {os.path.basename(relatorio)}",
+                text_color="#198754"
+            ))
+            
+        except Exception as e:
+            # ``e`` deixa de existir ao fim do except: a mensagem vai ligada ao callback
+            msg = str(e)
+            self.parent.after(0, lambda msg=msg: self.parent.dialogs.mostrar_erro(msg))
+        
+        finally:
+            self.parent.processando = False
+    
     def mostrar_progresso(self):
         self.parent.upload_frame.pack_forget()
         self.parent.progress_frame.pack(fill="x", padx=30, pady=20)
@@ -56,6 +142,7 @@ class UIHandlers:
             width=280,  
             height=50   
         )
+        self.parent.redo_button.configure(state="disabled")
 
         self.parent.status_label.configure(
             text="⚡ Processamento em andamento...",
@@ -77,6 +164,8 @@ class UIHandlers:
             text="💡 Dica: Certifique-se de que seu arquivo CSV contém os dados de alertas",
             text_color="#6c757d"
         )
+        
+        self.parent.redo_button.configure(state="normal" if self.parent.sessao.arquivos() else "disabled")
     
     def atualizar_progresso(self, valor):
         def update():
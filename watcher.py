@@ -0,0 +1,238 @@
+"""
+Modo observador: processa automaticamente as exportações que chegam em pastas monitoradas
+
+Usa inotify no Linux (via ctypes) só para acordar na hora certa; em outros
+sistemas, ou se o inotify falhar, a pasta é varrida a cada intervalo. Em
+ambos os casos um arquivo só é processado depois que tamanho e data de
+modificação ficam estáveis, para não pegar exportações ainda sendo gravadas.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config import (PASTA_EXPORTADOS, OBSERVAR_INTERVALO, OBSERVAR_ESTABILIDADE, OBSERVAR_WORKERS,
+                    OBSERVAR_REGISTRO)
+from service import aquecer_worker, executar_job
+from source_reader import e_compactado
+
+# Eventos de inotify que indicam arquivo novo ou concluído na pasta
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0x00000800
+
+
+def e_exportacao(nome: str) -> bool:
+    """CSV (simples ou compactado) que não seja temporário de editor/cópia"""
+    if nome.startswith((".", "~$")):
+        return False
+    return nome.lower().endswith(".csv") or e_compactado(nome)
+
+
+class _Inotify:
+    """Descritor inotify mínimo: só informa que algo mudou nas pastas observadas"""
+
+    def __init__(self, pastas: List[str]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        for pasta in pastas:
+            if libc.inotify_add_watch(self.fd, os.fsencode(pasta), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch falhou em {pasta}")
+
+    def aguardar(self, timeout: float) -> bool:
+        """Bloqueia até um evento ou o timeout; True se houve evento"""
+        prontos, _, _ = select.select([self.fd], [], [], timeout)
+        if not prontos:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def fechar(self):
+        os.close(self.fd)
+
+
+class RegistroProcessados:
+    """Registro em JSON dos arquivos já tratados, para que um reinício não refaça trabalho"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.lock = threading.Lock()
+        self.entradas: Dict[str, Dict] = {}
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as arquivo:
+                self.entradas = json.load(arquivo)
+
+    @staticmethod
+    def assinatura(caminho: str, status: os.stat_result) -> str:
+        # Mesmo nome com outro conteúdo (tamanho/mtime) é uma exportação nova
+        return f"{os.path.abspath(caminho)}|{status.st_size}|{int(status.st_mtime)}"
+
+    def contem(self, assinatura: str) -> bool:
+        with self.lock:
+            return assinatura in self.entradas
+
+    def registrar(self, assinatura: str, dados: Dict):
+        with self.lock:
+            self.entradas[assinatura] = dados
+            temporario = f"{self.caminho}.tmp"
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                json.dump(self.entradas, arquivo, ensure_ascii=False, indent=2)
+            os.replace(temporario, self.caminho)
+
+
+def caminho_registro_pasta(pasta: str) -> str:
+    """Registro dos processados de uma pasta observada, junto dos exportados dela"""
+    pasta_exportados = os.path.join(os.path.abspath(pasta), PASTA_EXPORTADOS)
+    os.makedirs(pasta_exportados, exist_ok=True)
+    return os.path.join(pasta_exportados, OBSERVAR_REGISTRO)
+
+
+class Observador:
+    """Classe responsável por monitorar pastas e enviar as exportações estáveis ao pool"""
+
+    def __init__(self, pastas: List[str], workers: int = OBSERVAR_WORKERS,
+                 intervalo: float = OBSERVAR_INTERVALO, estabilidade: float = OBSERVAR_ESTABILIDADE,
+                 caminho_registro: Optional[str] = None, criar_filtro: Optional[Callable] = None):
+        self.pastas = [os.path.abspath(pasta) for pasta in pastas]
+        for pasta in self.pastas:
+            if not os.path.isdir(pasta):
+                raise NotADirectoryError(pasta)
+        self.workers = workers
+        # Filtro da execução montado a cada arquivo ("últimos N dias" anda junto com o observador)
+        self.criar_filtro = criar_filtro
+        self.intervalo = intervalo
+        self.estabilidade = estabilidade
+        # Um registro por pasta, na pasta de exportados dela: não depende do diretório de onde o
+        # observador é iniciado (com ``caminho_registro`` todas as pastas dividem um só)
+        if caminho_registro:
+            registro = RegistroProcessados(os.path.abspath(caminho_registro))
+            self.registros = {pasta: registro for pasta in self.pastas}
+        else:
+            self.registros = {pasta: RegistroProcessados(caminho_registro_pasta(pasta)) for pasta in self.pastas}
+
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=aquecer_worker)
+        self.lock = threading.Lock()
+        self.candidatos: Dict[str, tuple] = {}  # caminho -> (tamanho, mtime, visto_estavel_desde)
+        self.em_andamento = set()
+        self.concluidos = 0
+        self.erros = 0
+        self.bytes_processados = 0
+        self.inicio = time.monotonic()
+
+    def _registro(self, caminho: str) -> RegistroProcessados:
+        return self.registros[os.path.dirname(os.path.abspath(caminho))]
+
+    def _varrer(self):
+        """Atualiza os candidatos e envia ao pool os que estão estáveis há tempo suficiente"""
+        agora = time.monotonic()
+        for pasta in self.pastas:
+            registro = self.registros[pasta]
+            for entrada in os.scandir(pasta):
+                if not entrada.is_file() or not e_exportacao(entrada.name):
+                    continue
+                caminho = entrada.path
+                status = entrada.stat()
+                assinatura = registro.assinatura(caminho, status)
+                with self.lock:
+                    if assinatura in self.em_andamento:
+                        continue
+                if registro.contem(assinatura):
+                    self.candidatos.pop(caminho, None)
+                    continue
+
+                anterior = self.candidatos.get(caminho)
+                atual = (status.st_size, status.st_mtime)
+                if anterior is None or anterior[:2] != atual:
+                    self.candidatos[caminho] = (*atual, agora)
+                elif agora - anterior[2] >= self.estabilidade:
+                    del self.candidatos[caminho]
+                    self._enviar(caminho, assinatura, status.st_size)
+
+    def _enviar(self, caminho: str, assinatura: str, tamanho: int):
+        pasta_saida = os.path.join(os.path.dirname(caminho), PASTA_EXPORTADOS, "relatorios",
+                                   os.path.basename(caminho).replace(".", "_"))
+        os.makedirs(pasta_saida, exist_ok=True)
+        with self.lock:
+            self.em_andamento.add(assinatura)
+        filtro = self.criar_filtro() if self.criar_filtro else None
+        future = self.pool.submit(executar_job, caminho, pasta_saida, filtro)
+        future.add_done_callback(
+            lambda f, caminho=caminho, assinatura=assinatura, tamanho=tamanho:
+            self._finalizar(caminho, assinatura, tamanho, f))
+
+    def _finalizar(self, caminho: str, assinatura: str, tamanho: int, future):
+        dados = {"arquivo": caminho, "processado_em": datetime.now().isoformat(timespec="seconds")}
+        try:
+            resultado = future.result()
+            dados.update(status="concluido", arquivos=resultado["arquivos"], relatorio=resultado["relatorio"])
+        except Exception as e:
+            # Falhas também entram no registro: a mesma exportação não é tentada em loop
+            dados.update(status="erro", erro=str(e))
+            print(f"\n❌ Erro ao processar {os.path.basename(caminho)}: {e}")
+
+        self._registro(caminho).registrar(assinatura, dados)
+        with self.lock:
+            self.em_andamento.discard(assinatura)
+            if dados["status"] == "concluido":
+                self.concluidos += 1
+                self.bytes_processados += tamanho
+            else:
+                self.erros += 1
+
+    def linha_status(self) -> str:
+        minutos = max((time.monotonic() - self.inicio) / 60, 1e-9)
+        with self.lock:
+            processando = len(self.em_andamento)
+            concluidos, erros, processados = self.concluidos, self.erros, self.bytes_processados
+        return (f"👀 aguardando: {len(self.candidatos)} | processando: {processando} | "
+                f"concluídos: {concluidos} | erros: {erros} | "
+                f"vazão: {concluidos / minutos:.1f} arq/min, {processados / 2**20 / minutos:.1f} MB/min")
+
+    def executar(self):
+        """Monitora até Ctrl+C"""
+        inotify = None
+        if sys.platform.startswith("linux"):
+            try:
+                inotify = _Inotify(self.pastas)
+            except OSError as e:
+                print(f"⚠️ inotify indisponível ({e}), usando varredura periódica")
+        modo = "inotify" if inotify else f"varredura a cada {self.intervalo}s"
+        print(f"👀 Observando {', '.join(self.pastas)} ({modo}, {self.workers} workers)")
+
+        try:
+            while True:
+                self._varrer()
+                sys.stdout.write("\r" + self.linha_status())
+                sys.stdout.flush()
+                if inotify and not self.candidatos:
+                    # Nada pendente: dorme até o kernel avisar (com teto para atualizar o status)
+                    inotify.aguardar(self.intervalo * 5)
+                else:
+                    time.sleep(self.intervalo)
+        except KeyboardInterrupt:
+            print("\n🛑 Encerrando observador...")
+        finally:
+            if inotify:
+                inotify.fechar()
+            self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iniciar_observador(pastas: List[str], workers: Optional[int] = None, criar_filtro: Optional[Callable] = None):
+    """Sobe o observador nas pastas indicadas e bloqueia até Ctrl+C"""
+    Observador(pastas, workers=workers or OBSERVAR_WORKERS, criar_filtro=criar_filtro).executar()